@@ -0,0 +1,100 @@
+"""
+Load benchmark of `llparse.aio` against a loopback server. Thousands of
+clients connect at once, pipeline a few requests each and wait for a reply
+to every one, while the server answers from the handler of each completed
+request::
+
+    python -m benchmarks.bench_aio
+
+Runs once with parsers from a pool filled upfront and once creating a
+parser for every connection.
+"""
+
+import asyncio
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from llparse import LLParse
+from llparse.aio import ParserPool, protocolFactory
+
+CONNECTIONS = 2000
+REQUESTS = 10
+ROUNDS = 3
+REQUEST = b"GET /index.html HTTP/1.1\r\n\r\n"
+
+
+def build() -> tuple[LLParse, object]:
+    p = LLParse("bench")
+    method = p.node("method")
+    beforeUrl = p.node("before_url")
+    url = p.node("url")
+    http = p.node("http")
+    urlSpan = p.span(p.code.span("on_url"))
+    complete = p.invoke(p.code.match("on_complete"), {0: method}, p.error(7, "complete"))
+
+    onMethod = p.invoke(p.code.value("on_method"), {0: beforeUrl}, p.error(8, "method"))
+
+    method.select({"GET": 1, "POST": 2}, onMethod).otherwise(p.error(5, "Expected method"))
+    beforeUrl.match(" ", beforeUrl).otherwise(urlSpan.start(url))
+    url.peek(" ", urlSpan.end(http)).skipTo(url)
+    http.match(" HTTP/1.1\r\n\r\n", complete).otherwise(p.error(6, "Expected HTTP/1.1"))
+    return p, method
+
+
+def onComplete(protocol, event) -> None:
+    protocol.transport.write(b"OK\n")
+
+
+async def client(port: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(REQUEST * REQUESTS)
+    await reader.readexactly(3 * REQUESTS)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(pool: ParserPool) -> float:
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(
+        protocolFactory(pool, {"on_complete": onComplete}), "127.0.0.1", 0, backlog=4096
+    )
+    port = server.sockets[0].getsockname()[1]
+    best = float("inf")
+    for _ in range(ROUNDS):
+        begin = time.perf_counter()
+        await asyncio.gather(*(client(port) for _ in range(CONNECTIONS)))
+        best = min(best, time.perf_counter() - begin)
+    server.close()
+    await server.wait_closed()
+    return best
+
+
+def main() -> None:
+    if not (shutil.which("cc") or shutil.which("gcc")):
+        sys.exit("No C compiler available")
+
+    # Both ends of every connection live in this process
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, 4 * CONNECTIONS + 64)), hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        p, root = build()
+        module = p.extension("bench_aio").load(root, cacheDir=tmp)
+
+    print(f"{CONNECTIONS} connections x {REQUESTS} requests")
+    print(f"{'parsers':<8}  {'requests/s':>12}  {'connections/s':>14}")
+    for name, pool in (
+        ("pooled", ParserPool(module, size=CONNECTIONS)),
+        ("fresh", ParserPool(module)),
+    ):
+        seconds = asyncio.run(run(pool))
+        print(
+            f"{name:<8}  {CONNECTIONS * REQUESTS / seconds:>12,.0f}  {CONNECTIONS / seconds:>14,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
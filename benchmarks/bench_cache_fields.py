@@ -0,0 +1,68 @@
+"""
+Throughput of keeping fields in locals of `_run` (`cacheFields=True`).
+
+Builds a parser for lines of comma separated numbers that goes through a
+`mulAdd`, `update` or counting invoke on every byte, once with every field
+operation in its own function on `state` and once with the fields cached in
+locals and the operations inlined, then times both at a couple of
+optimization levels::
+
+    python -m benchmarks.bench_cache_fields
+
+Both are compiled with `-DLLPARSE_NO_DIGIT_RUN` so that every digit still
+goes through its invoke.
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+TOTAL = 64 << 20
+# At -Os the field functions stay out of line unless they are inlined by hand
+OPT_LEVELS = ("-O2", "-Os")
+
+# A short repeating pattern keeps the branches predictable so that the field
+# updates are what is left to measure
+LINE = b"123,45678,9,1024\n"
+
+
+def build(cacheFields: bool) -> CompilerResult:
+    p = LLParse("bench")
+    p.property("i64", "value")
+    p.property("i64", "fields")
+    p.property("i64", "lines")
+
+    number = p.node("number")
+    reset = p.invoke(p.code.update("value", 0), number)
+    # `mulAdd` with a base of 1 counts the separators
+    number.select(
+        {str(i): i for i in range(10)},
+        p.invoke(p.code.mulAdd("value", 10), {1: p.error(1, "overflow")}, number),
+    ).select(
+        {",": 1}, p.invoke(p.code.mulAdd("fields", 1), {1: p.error(2, "overflow")}, reset)
+    ).select(
+        {"\n": 1}, p.invoke(p.code.mulAdd("lines", 1), {1: p.error(3, "overflow")}, reset)
+    ).otherwise(p.error(4, "bad"))
+
+    return p.build(number, cacheFields=cacheFields)
+
+
+def main() -> None:
+    results = {"state": build(False), "locals": build(True)}
+    with CDriver() as driver:
+        data = driver.input(LINE * (TOTAL // len(LINE)))
+
+        print(f"{'':>4} {'state MB/s':>11} {'locals MB/s':>12} {'speedup':>8}")
+        for level in OPT_LEVELS:
+            rates = {}
+            for name, res in results.items():
+                binary = driver.compile(f"{name}{level}", res, [level, "-DLLPARSE_NO_DIGIT_RUN"])
+                rates[name] = driver.run(binary, data, repeat=3)
+            print(
+                f"{level:>4} {rates['state']:11.0f} {rates['locals']:12.0f}"
+                f" {rates['locals'] / rates['state']:7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
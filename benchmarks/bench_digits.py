@@ -0,0 +1,65 @@
+"""
+Throughput of the fused digit loop of `mulAdd` selects.
+
+Compiles a parser for newline separated decimal numbers once going
+through the `mulAdd` state after every digit (`-DLLPARSE_NO_DIGIT_RUN`)
+and once with the fused loop, and times both on numbers of increasing
+length::
+
+    python -m benchmarks.bench_digits
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+NUMBER_LENGTHS = (1, 3, 8, 18)
+TOTAL = 64 << 20
+
+CALLBACKS = r"""
+int on_number(bench_t* s, const char* p, const char* endp) {
+  s->value = 0;
+  return 0;
+}
+"""
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    p.property("i64", "value")
+
+    number = p.node("number")
+    done = p.invoke(p.code.match("on_number"), {0: number}, p.error(1, "bad"))
+    number.select(
+        {str(i): i for i in range(10)},
+        p.invoke(p.code.mulAdd("value", 10), {1: p.error(2, "overflow")}, number),
+    ).match("\n", done).otherwise(p.error(3, "bad digit"))
+
+    return p.build(number)
+
+
+def numbers(length: int) -> bytes:
+    line = (b"123456789" * 2)[:length] + b"\n"
+    return line * (TOTAL // len(line))
+
+
+def main() -> None:
+    res = build()
+    with CDriver(CALLBACKS) as driver:
+        binaries = {
+            name: driver.compile(name, res, flags)
+            for name, flags in (("bytes", ["-DLLPARSE_NO_DIGIT_RUN"]), ("fused", []))
+        }
+
+        print(f"{'digits':>6} {'bytes MB/s':>12} {'fused MB/s':>12} {'speedup':>8}")
+        for line in NUMBER_LENGTHS:
+            data = driver.input(numbers(line))
+            rates = {name: driver.run(binary, data) for name, binary in binaries.items()}
+            print(
+                f"{line:>6} {rates['bytes']:12.0f} {rates['fused']:12.0f}"
+                f" {rates['fused'] / rates['bytes']:7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Throughput of parsing many small messages from python, once through
+`LLParse.load` with a python callback for every span and invoke and once
+through the extension module of `LLParse.extension`, which hands the events
+of each `execute` over in one batch::
+
+    python -m benchmarks.bench_extension
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from llparse import LLParse
+
+MESSAGES = 100_000
+MESSAGE = b"GET /index.html HTTP/1.1\r\n\r\n"
+
+
+def build() -> tuple[LLParse, object]:
+    p = LLParse("bench")
+    method = p.node("method")
+    beforeUrl = p.node("before_url")
+    url = p.node("url")
+    http = p.node("http")
+    urlSpan = p.span(p.code.span("on_url"))
+    onMethod = p.invoke(p.code.store("method"), beforeUrl)
+    complete = p.invoke(p.code.match("on_complete"), {0: method}, p.error(7, "complete"))
+    p.property("i8", "method")
+
+    method.select({"GET": 1, "POST": 2, "PUT": 3}, onMethod).otherwise(
+        p.error(5, "Expected method")
+    )
+    beforeUrl.match(" ", beforeUrl).otherwise(urlSpan.start(url))
+    url.peek(" ", urlSpan.end(http)).skipTo(url)
+    http.match(" HTTP/1.1\r\n\r\n", complete).otherwise(p.error(6, "Expected HTTP/1.1"))
+    return p, method
+
+
+def timeLoader(cacheDir: str) -> float:
+    urls = []
+    p, root = build()
+    lib = p.load(
+        root,
+        callbacks={
+            "on_url": lambda parser, data: urls.append(data),
+            "on_complete": lambda parser: None,
+        },
+        cacheDir=cacheDir,
+    )
+    parser = lib.parser()
+    begin = time.perf_counter()
+    for _ in range(MESSAGES):
+        parser.execute(MESSAGE)
+    seconds = time.perf_counter() - begin
+    assert len(urls) == MESSAGES
+    return seconds
+
+
+def timeExtension(cacheDir: str) -> float:
+    urls = []
+    p, root = build()
+    module = p.extension("bench_ext").load(root, cacheDir=cacheDir)
+    onUrl = module.EVENTS["on_url"]
+    parser = module.Parser()
+    begin = time.perf_counter()
+    for _ in range(MESSAGES):
+        parser.execute(MESSAGE)
+        for event, start, end, _ in parser.events():
+            if event == onUrl:
+                urls.append(MESSAGE[start:end])
+    seconds = time.perf_counter() - begin
+    assert len(urls) == MESSAGES
+    return seconds
+
+
+def main() -> None:
+    if not (shutil.which("cc") or shutil.which("gcc")):
+        sys.exit("No C compiler available")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        loader = min(timeLoader(tmp) for _ in range(3))
+        extension = min(timeExtension(tmp) for _ in range(3))
+
+    print(f"{'backend':<10}  {'messages/s':>12}")
+    print(f"{'ctypes':<10}  {MESSAGES / loader:>12,.0f}")
+    print(f"{'extension':<10}  {MESSAGES / extension:>12,.0f}")
+    print(f"speedup: {loader / extension:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
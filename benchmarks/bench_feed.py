@@ -0,0 +1,107 @@
+"""
+Parses a big file of lines with the extension module of
+`LLParse.extension`, once read into memory in one go and once through
+`llparse.feed.parseFile`, and compares their throughput and peak memory::
+
+    python -m benchmarks.bench_feed
+
+Every run happens in a process of its own so that their peak RSS can be
+told apart.
+"""
+
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from llparse import LLParse
+from llparse.feed import parseFile
+
+SIZE = 256 << 20
+
+
+def build() -> tuple[LLParse, object]:
+    p = LLParse("bench")
+    start = p.node("start")
+    line = p.node("line")
+    lineSpan = p.span(p.code.span("on_line"))
+    start.match("\n", start).otherwise(lineSpan.start(line))
+    line.peek("\n", lineSpan.end(start)).skipTo(line)
+    return p, start
+
+
+def peakMemory() -> int:
+    """Peak RSS in KiB. `ru_maxrss` outlives `exec` on linux so it would
+    count whatever the parent process had, `VmHWM` starts over"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(mode: str, path: str, cacheDir: str) -> None:
+    p, root = build()
+    module = p.extension("bench_feed").load(root, cacheDir=cacheDir)
+    parser = module.Parser()
+    lines = 0
+
+    def onWindow(parser, offset, view):
+        nonlocal lines
+        lines += len(memoryview(parser))
+
+    begin = time.perf_counter()
+    if mode == "read":
+        data = Path(path).read_bytes()
+        assert parser.execute(data) == 0
+        onWindow(parser, 0, memoryview(data))
+    else:
+        assert parseFile(parser, path, onWindow=onWindow)[0] == 0
+    seconds = time.perf_counter() - begin
+
+    peak = peakMemory()
+    print(json.dumps({"seconds": seconds, "peak": peak, "lines": lines}))
+
+
+def main() -> None:
+    if len(sys.argv) == 4:
+        return run(*sys.argv[1:])
+    if not (shutil.which("cc") or shutil.which("gcc")):
+        sys.exit("No C compiler available")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "data"
+        line = b"2024-01-01 00:00:00 GET /index.html 200 1234\n"
+        chunk = line * ((1 << 20) // len(line))
+        with open(path, "wb") as f:
+            for _ in range(SIZE // len(chunk)):
+                f.write(chunk)
+
+        print(f"{'mode':<6}  {'MB/s':>8}  {'peak RSS (MiB)':>14}")
+        for mode in ("read", "mmap"):
+            best = None
+            for _ in range(3):
+                res = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_feed", mode, str(path), tmp],
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                )
+                stats = json.loads(res.stdout)
+                if best is None or stats["seconds"] < best["seconds"]:
+                    best = stats
+            size = path.stat().st_size
+            print(
+                f"{mode:<6}  {size / best['seconds'] / 1e6:>8.0f}  {best['peak'] / 1024:>14.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
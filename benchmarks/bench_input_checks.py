@@ -0,0 +1,94 @@
+"""
+Throughput of skipping the `p == endp` check of states entered with input.
+
+Builds a parser for `key=value;` pairs where every token goes through a
+peek, an invoke and a span, once checking for input at the start of every
+state and once letting jumps that still have a byte at `p` come in past the
+check, then times both on a buffer of pairs::
+
+    python -m benchmarks.bench_input_checks
+"""
+
+import random
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.compilator import Compilation
+from llparse.llparse import CompilerResult
+
+TOTAL = 64 << 20
+
+CALLBACKS = r"""
+int on_key(bench_t* s, const char* p, const char* endp) {
+  return 0;
+}
+
+int on_value(bench_t* s, const char* p, const char* endp) {
+  return 0;
+}
+
+int on_pair(bench_t* s, const char* p, const char* endp) {
+  s->pairs++;
+  return 0;
+}
+"""
+
+SAMPLES = [b"a=1;", b"key=2;", b"x=3\n", b"name=1;", b"\n"]
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    p.property("i8", "kind")
+    p.property("i64", "pairs")
+
+    start = p.node("start")
+    key = p.node("key")
+    equals = p.node("equals")
+    value = p.node("value")
+    separator = p.node("separator")
+    keySpan = p.span(p.code.span("on_key"))
+    valueSpan = p.span(p.code.span("on_value"))
+
+    letters = [chr(c) for c in range(ord("a"), ord("z") + 1)]
+    onPair = p.invoke(
+        p.code.match("on_pair"), {0: keySpan.end(equals)}, p.error(1, "on_pair")
+    )
+    onValue = p.invoke(p.code.store("kind"), valueSpan.end(separator))
+
+    start.match("\n", start).peek(letters, keySpan.start(key)).otherwise(
+        p.error(2, "bad key")
+    )
+    key.match(letters, key).peek("=", onPair).otherwise(p.error(3, "bad key"))
+    equals.match("=", valueSpan.start(value)).otherwise(p.error(4, "missing ="))
+    value.select({"1": 1, "2": 2, "3": 3}, onValue).otherwise(p.error(5, "bad value"))
+    separator.match([";", "\n"], start).otherwise(p.error(6, "bad separator"))
+
+    return p.build(start)
+
+
+def main() -> None:
+    results: dict[str, CompilerResult] = {}
+    analyze = Compilation.analyzeInput
+    Compilation.analyzeInput = lambda self, root: None
+    results["checked"] = build()
+    Compilation.analyzeInput = analyze
+    results["skipped"] = build()
+
+    rng = random.Random(1)
+    pairs = rng.choices(SAMPLES, k=TOTAL * len(SAMPLES) // len(b"".join(SAMPLES)))
+    with CDriver(CALLBACKS) as driver:
+        data = driver.input(b"".join(pairs))
+        rates = {
+            name: driver.run(driver.compile(name, res), data, repeat=3)
+            for name, res in results.items()
+        }
+
+        entries = results["skipped"].c.count("goto s_i_")
+        print(f"{'':>8} {'MB/s':>8}")
+        for name in results:
+            print(f"{name:>8} {rates[name]:8.0f}")
+        print(f"{entries} jumps skip the check, {rates['skipped'] / rates['checked']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Throughput of multi-byte `Int` reads on HTTP/2 style frame headers.
+
+Compiles a frame header parser (24 bit length, 8 bit type and flags, 32
+bit stream id) once reading a byte per state (`-DLLPARSE_NO_FUSED_INT`)
+and once with the fused reads, and feeds both headers back to back::
+
+    python -m benchmarks.bench_int
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+TOTAL = 64 << 20
+
+CALLBACKS = r"""
+int on_frame(bench_t* s, const char* p, const char* endp) {
+  return s->type > 9;
+}
+"""
+
+# 24 bit length, type, flags and stream id, of types 0 to 9
+FRAMES = b"".join(bytes([0, 0, 0, type, 0x4, 0, 0, 0, 1]) for type in range(10))
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    p.property("i32", "length")
+    p.property("i8", "type")
+    p.property("i8", "flags")
+    p.property("i32", "stream")
+
+    start = p.node("start")
+    length = p.uintBE("length", 3)
+    type = p.uintBE("type", 1)
+    flags = p.uintBE("flags", 1)
+    stream = p.uintBE("stream", 4)
+    frame = p.invoke(p.code.match("on_frame"), {0: start}, p.error(1, "bad frame"))
+
+    start.otherwise(length)
+    length.skipTo(type)
+    type.skipTo(flags)
+    flags.skipTo(stream)
+    stream.skipTo(frame)
+
+    return p.build(start)
+
+
+def main() -> None:
+    res = build()
+    with CDriver(CALLBACKS) as driver:
+        data = driver.input(FRAMES * (TOTAL // len(FRAMES)))
+        rates = {}
+        for name, flags in (("bytes", ["-DLLPARSE_NO_FUSED_INT"]), ("fused", [])):
+            rates[name] = driver.run(driver.compile(name, res, flags), data)
+
+        print(f"{'bytes MB/s':>12} {'fused MB/s':>12} {'speedup':>8}")
+        print(
+            f"{rates['bytes']:12.0f} {rates['fused']:12.0f}"
+            f" {rates['fused'] / rates['bytes']:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of running a parser in python with `LLParse.interpret`, once
+with the states that loop on themselves skipping ahead and sequences and
+integers read in one go, and once going through every byte one by one::
+
+    python -m benchmarks.bench_interpreter
+"""
+
+import time
+
+from llparse import LLParse
+
+REQUESTS = 2_000
+REQUEST = (
+    b"GET /static/assets/images/2024/some/long/path/to/a/picture.png?size=large HTTP/1.1\r\n"
+    b"Host: www.example.com\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+    b"Accept-Language: en-US,en;q=0.5\r\n"
+    b"Connection: keep-alive\r\n"
+    b"\r\n"
+)
+
+
+def build() -> tuple[LLParse, object]:
+    p = LLParse("bench")
+    p.property("i8", "method")
+    method = p.node("method")
+    beforeUrl = p.node("before_url")
+    url = p.node("url")
+    http = p.node("http")
+    headerStart = p.node("header_start")
+    name = p.node("name")
+    beforeValue = p.node("before_value")
+    value = p.node("value")
+    lineEnd = p.node("line_end")
+    urlSpan = p.span(p.code.span("on_url"))
+    nameSpan = p.span(p.code.span("on_header_field"))
+    valueSpan = p.span(p.code.span("on_header_value"))
+    complete = p.invoke(p.code.match("on_complete"), {0: method}, p.error(7, "complete"))
+
+    method.select({"GET": 1, "POST": 2, "PUT": 3}, p.invoke(p.code.store("method"), beforeUrl)).otherwise(
+        p.error(1, "Expected method")
+    )
+    beforeUrl.match(" ", beforeUrl).otherwise(urlSpan.start(url))
+    url.peek(" ", urlSpan.end(http)).skipTo(url)
+    http.match(" HTTP/1.1\r\n", headerStart).otherwise(p.error(2, "Expected HTTP/1.1"))
+
+    token = [chr(c) for c in range(0x21, 0x7F) if c != ord(":")]
+    headerStart.match("\r\n", complete).otherwise(nameSpan.start(name))
+    name.match(token, name).peek(":", nameSpan.end(beforeValue)).otherwise(
+        p.error(3, "Invalid header name")
+    )
+    beforeValue.match([":", " "], beforeValue).otherwise(valueSpan.start(value))
+    value.peek("\r", valueSpan.end(lineEnd)).skipTo(value)
+    lineEnd.match("\r\n", headerStart).otherwise(p.error(4, "Expected CRLF"))
+    return p, method
+
+
+def timeInterpreter(data: bytes, skipAhead: bool) -> float:
+    requests = []
+    p, root = build()
+    parser = p.interpret(
+        root, callbacks={"on_complete": lambda parser: requests.append(1)}, skipAhead=skipAhead
+    ).parser()
+    begin = time.perf_counter()
+    assert parser.execute(data) == 0
+    seconds = time.perf_counter() - begin
+    assert len(requests) == REQUESTS
+    return seconds
+
+
+def main() -> None:
+    data = REQUEST * REQUESTS
+    perByte = min(timeInterpreter(data, False) for _ in range(3))
+    skipAhead = min(timeInterpreter(data, True) for _ in range(3))
+
+    size = len(data) / 1e6
+    print(f"{'interpreter':<12}  {'MB/s':>8}")
+    print(f"{'per byte':<12}  {size / perByte:>8.2f}")
+    print(f"{'skip ahead':<12}  {size / skipAhead:>8.2f}")
+    print(f"speedup: {perByte / skipAhead:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of the lattice work done by the loop checker.
+
+Runs the legacy `propagate`/`visit` passes on large generated graphs, once
+with the integer backed `Lattice` and once with the previous list-of-words
+implementation reproduced below::
+
+    python -m benchmarks.bench_lattice
+"""
+
+import sys
+import time
+
+from llparse.pybuilder import Builder
+from llparse.pybuilder import loopchecker
+
+SIZES = (1000, 4000, 16000)
+ROUNDS = 5
+
+WORD_SIZE = 32
+SIZE = 256 // WORD_SIZE
+
+
+class WordLattice:
+    """The former `Lattice`, eight 32-bit words in a Python list"""
+
+    def __init__(self, value) -> None:
+        self.words = [-1 if value == "any" else 0 for _ in range(SIZE)]
+        if isinstance(value, (list, bytes)):
+            for single in value:
+                self.words[single // WORD_SIZE] |= 1 << (single % WORD_SIZE)
+
+    def __iter__(self):
+        for i in range(256):
+            if self.check(i):
+                yield i
+
+    def check(self, bit: int):
+        return self.words[bit // WORD_SIZE] & (1 << (bit % WORD_SIZE)) != 0
+
+    def union(self, other):
+        result = WordLattice("empty")
+        for i in range(SIZE):
+            result.words[i] = self.words[i] | other.words[i]
+        return result
+
+    def intersect(self, other):
+        result = WordLattice("empty")
+        for i in range(SIZE):
+            result.words[i] = self.words[i] & other.words[i]
+        return result
+
+    def subtract(self, other):
+        result = WordLattice("empty")
+        for i in range(SIZE):
+            result.words[i] = self.words[i] & (~other.words[i])
+        return result
+
+    def isEqual(self, other):
+        if self.toJSON() == other.toJSON():
+            return True
+        return self.words == other.words
+
+    def toJSON(self):
+        if all(w == 0 for w in self.words):
+            return "empty"
+        if all(w == -1 for w in self.words):
+            return "any"
+        return list(self)
+
+
+def build_graph(size: int):
+    """A wide tree of peeks, each leading through a chain of invokes"""
+    b = Builder()
+    error = b.error(1, "error")
+    root = b.node("root")
+    branches = 200
+    depth = max(1, size // (branches * 2))
+    for key in range(branches):
+        node = b.node(f"branch_{key}")
+        root.peek(key + 32, node)
+        for level in range(depth):
+            target = b.node(f"leaf_{key}_{level}")
+            code = b.code.match(f"on_{key}_{level}")
+            node.otherwise(b.invoke(code, {0: target}, error))
+            node = target
+        node.match("x", root).otherwise(error)
+    root.otherwise(error)
+    return root
+
+
+def run(root, lattice_type) -> float:
+    loopchecker.Lattice = lattice_type
+    loopchecker.EMPTY_VALUE = lattice_type("empty")
+    loopchecker.ANY_VALUE = lattice_type("any")
+
+    lc = loopchecker.LoopChecker(legacy=True)
+    nodes = loopchecker.Reachability().build(root)
+    begin = time.perf_counter()
+    for _ in range(ROUNDS):
+        lc.terminatedCache.clear()
+        lc.clear(nodes)
+        lc.lattice[root] = loopchecker.ANY_VALUE
+        changed = {root}
+        while changed:
+            _next = set()
+            for node in changed:
+                lc.propagate(node, _next)
+            changed = _next
+        lc.visit(root, [])
+    return (time.perf_counter() - begin) / ROUNDS
+
+
+def main() -> None:
+    sys.setrecursionlimit(100000)
+    original = (loopchecker.Lattice, loopchecker.EMPTY_VALUE, loopchecker.ANY_VALUE)
+    print(f"{'nodes':>8} {'int (ms)':>10} {'words (ms)':>11} {'speedup':>8}")
+    try:
+        for size in SIZES:
+            root = build_graph(size)
+            fast = run(root, original[0])
+            slow = run(root, WordLattice)
+            print(f"{size:>8} {fast * 1e3:10.2f} {slow * 1e3:11.2f} {slow / fast:7.1f}x")
+    finally:
+        loopchecker.Lattice, loopchecker.EMPTY_VALUE, loopchecker.ANY_VALUE = original
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time it takes `LLParse.load` to hand out a parser with a cold and a warm
+build cache, the warm one only hashes the source and loads the shared
+object that is already there::
+
+    python -m benchmarks.bench_loader
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from llparse import LLParse
+
+RUNS = 5
+
+
+def build_grammar(size: int) -> tuple[LLParse, object]:
+    p = LLParse("bench")
+    p.property("i32", "count")
+    error = p.error(1, "error")
+    keys = [p.node(f"key_{i}") for i in range(size)]
+    for i, key in enumerate(keys):
+        value = p.node(f"value_{i}")
+        invoke = p.invoke(p.code.match(f"on_field_{i}"), {0: value}, error)
+        key.match(f"field{i}:", invoke).otherwise(error)
+        value.match(" ", value).skipTo(keys[(i + 1) % len(keys)])
+    return p, keys[0]
+
+
+def main() -> None:
+    if not (shutil.which("cc") or shutil.which("gcc")):
+        sys.exit("No C compiler available")
+
+    print(f"{'fields':>8}  {'cold (ms)':>10}  {'warm (ms)':>10}  {'speedup':>8}")
+    for size in (10, 100, 400):
+        cold = warm = float("inf")
+        for _ in range(RUNS):
+            with tempfile.TemporaryDirectory() as tmp:
+                p, root = build_grammar(size)
+                begin = time.perf_counter()
+                p.load(root, cacheDir=tmp)
+                cold = min(cold, time.perf_counter() - begin)
+
+                p, root = build_grammar(size)
+                begin = time.perf_counter()
+                lib = p.load(root, cacheDir=tmp)
+                warm = min(warm, time.perf_counter() - begin)
+                assert lib.cached
+        print(
+            f"{size:>8}  {cold * 1e3:>10.1f}  {warm * 1e3:>10.1f}  {cold / warm:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
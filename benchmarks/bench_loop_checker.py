@@ -0,0 +1,50 @@
+"""
+Scaling benchmark for the loop checker.
+
+Builds keyword-style grammars of increasing size and times the SCC engine
+against the legacy per-node fixpoint::
+
+    python -m benchmarks.bench_loop_checker
+"""
+
+import sys
+import time
+
+from llparse.pybuilder import Builder, LoopChecker
+
+SIZES = (250, 500, 1000, 2000, 4000, 8000)
+LEGACY_LIMIT = 1000
+
+
+def build_grammar(size: int):
+    b = Builder()
+    error = b.error(1, "error")
+    keys = [b.node(f"key_{i}") for i in range(size // 4)]
+    for i, key in enumerate(keys):
+        name = b.node(f"name_{i}")
+        value = b.node(f"value_{i}")
+        invoke = b.invoke(b.code.match(f"on_field_{i}"), {0: value}, error)
+        key.match(f"field{i}:", name).otherwise(error)
+        name.peek(" ", invoke).otherwise(error)
+        value.match(" ", value).skipTo(keys[(i + 1) % len(keys)])
+    return keys[0]
+
+
+def timeit(root, legacy: bool) -> float:
+    begin = time.perf_counter()
+    LoopChecker(legacy=legacy).check(root)
+    return time.perf_counter() - begin
+
+
+def main() -> None:
+    sys.setrecursionlimit(100000)
+    print(f"{'keys':>8} {'scc (s)':>10} {'us/key':>9} {'legacy (s)':>11}")
+    for size in SIZES:
+        root = build_grammar(size)
+        scc = timeit(root, False)
+        legacy = f"{timeit(root, True):11.3f}" if size <= LEGACY_LIMIT else f"{'-':>11}"
+        print(f"{size:>8} {scc:10.4f} {scc / size * 1e6:9.2f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Throughput of the whole-sequence fast path of `llparse_match_sequence_*`.
+
+Compiles a parser for request lines and header names, once with the byte
+at a time matcher only (`-DLLPARSE_NO_FAST_MATCH`) and once with the fast
+path, and times both on the same requests::
+
+    python -m benchmarks.bench_match_sequence
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+TOTAL = 64 << 20
+
+REQUEST = (
+    b"GET /index.html HTTP/1.1\r\n"
+    b"Host: example.com\r\n"
+    b"User-Agent: bench\r\n"
+    b"Accept-Encoding: gzip\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: keep-alive\r\n"
+    b"\r\n"
+)
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    start = p.node("start")
+    url = p.node("url")
+    protocol = p.node("protocol")
+    header = p.node("header")
+    value = p.node("value")
+    error = p.error(1, "bad")
+
+    start.match(["GET ", "POST ", "OPTIONS "], url).otherwise(error)
+    url.match(" ", protocol).skipTo(url)
+    protocol.match("HTTP/1.1\r\n", header).otherwise(error)
+    header.match("\r\n", start).transform(p.transform.toLower()).match(
+        [
+            "host:",
+            "user-agent:",
+            "accept-encoding:",
+            "content-length:",
+            "connection:",
+        ],
+        value,
+    ).otherwise(error)
+    value.match("\n", header).skipTo(value)
+
+    return p.build(start)
+
+
+def main() -> None:
+    res = build()
+    with CDriver() as driver:
+        data = driver.input(REQUEST * (TOTAL // len(REQUEST)))
+        rates = {}
+        for name, flags in (("bytes", ["-DLLPARSE_NO_FAST_MATCH"]), ("fast", [])):
+            rates[name] = driver.run(driver.compile(name, res, flags), data)
+
+        print(f"{'bytes MB/s':>12} {'fast MB/s':>12} {'speedup':>8}")
+        print(
+            f"{rates['bytes']:12.0f} {rates['fast']:12.0f}"
+            f" {rates['fast'] / rates['bytes']:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of resuming the parser when input arrives in small chunks.
+
+Compiles the same request parser with the default `switch` dispatch and
+with `computedGoto=True`, and feeds both the same requests a few bytes
+at a time::
+
+    python -m benchmarks.bench_resume
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+CHUNKS = (1, 4, 16, 64)
+TOTAL = 16 << 20
+
+REQUEST = (
+    b"GET /index.html HTTP/1.1\r\n"
+    b"Host: example.com\r\n"
+    b"User-Agent: bench\r\n"
+    b"\r\n"
+)
+
+
+def build(computedGoto: bool) -> CompilerResult:
+    p = LLParse("bench")
+    start = p.node("start")
+    url = p.node("url")
+    protocol = p.node("protocol")
+    header = p.node("header")
+    value = p.node("value")
+    error = p.error(1, "bad")
+
+    start.match(["GET ", "POST "], url).otherwise(error)
+    url.match(" ", protocol).skipTo(url)
+    protocol.match("HTTP/1.1\r\n", header).otherwise(error)
+    header.match("\r\n", start).transform(p.transform.toLower()).match(
+        ["host:", "user-agent:"], value
+    ).otherwise(error)
+    value.match("\n", header).skipTo(value)
+
+    return p.build(start, computedGoto=computedGoto)
+
+
+def main() -> None:
+    with CDriver() as driver:
+        data = driver.input(REQUEST * (TOTAL // len(REQUEST)))
+        binaries = {
+            name: driver.compile(name, build(computedGoto))
+            for name, computedGoto in (("switch", False), ("goto", True))
+        }
+
+        print(f"{'chunk':>6} {'switch MB/s':>12} {'goto MB/s':>12} {'speedup':>8}")
+        for chunk in CHUNKS:
+            rates = {name: driver.run(binary, data, chunk) for name, binary in binaries.items()}
+            print(
+                f"{chunk:>6} {rates['switch']:12.0f} {rates['goto']:12.0f}"
+                f" {rates['goto'] / rates['switch']:7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Code size and throughput of lowering `Single` switches into range compares.
+
+Builds a tokenizer for words, numbers and quoted strings once with every
+key as its own `case` and once with contiguous runs of keys going to the
+same state lowered into range compares, then prints the size of the
+`.text` section of both objects and times both on a buffer of tokens::
+
+    python -m benchmarks.bench_single_ranges
+"""
+
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse, compilator
+from llparse.llparse import CompilerResult
+
+TOTAL = 64 << 20
+
+CALLBACKS = r"""
+int on_token(bench_t* s, const char* p, const char* endp) {
+  s->tokens++;
+  return 0;
+}
+"""
+
+SAMPLES = [
+    b"word ", b"mixed_case ", b"123 ", b"4.5e10 ", b"x ", b'"quoted string" ',
+    b"0x1f ", b"under_score ", b'"" ', b"\n",
+]
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    p.property("i64", "tokens")
+
+    start = p.node("start")
+    word = p.node("word")
+    number = p.node("number")
+    string = p.node("string")
+    token = p.span(p.code.span("on_token"))
+
+    lower = [chr(c) for c in range(ord("a"), ord("z") + 1)]
+    digits = [chr(c) for c in range(ord("0"), ord("9") + 1)]
+    # Printable ASCII without the quote itself
+    quoted = [chr(c) for c in range(0x20, 0x7F) if c != ord('"')]
+
+    start.match([" ", "\n"], start).peek(lower, token.start(word)).peek(
+        digits, token.start(number)
+    ).match('"', token.start(string)).otherwise(p.error(1, "bad start"))
+    word.match(lower + ["_"], word).peek(
+        [" ", "\n"], token.end(start)
+    ).otherwise(p.error(2, "bad word"))
+    number.match(digits + [".", "e", "x", "a", "b", "c", "d", "f"], number).peek(
+        [" ", "\n"], token.end(start)
+    ).otherwise(p.error(3, "bad number"))
+    string.match(quoted, string).match('"', token.end(start)).otherwise(
+        p.error(4, "bad string")
+    )
+
+    return p.build(start)
+
+
+def textSize(cc: str, source: Path, include: str) -> int:
+    obj = source.with_suffix(".o")
+    subprocess.run([cc, "-O2", "-c", "-I", include, "-o", str(obj), str(source)], check=True)
+    size = shutil.which("size")
+    if size is None:
+        return obj.stat().st_size
+    res = subprocess.run([size, "-A", str(obj)], capture_output=True, check=True, text=True)
+    for line in res.stdout.splitlines():
+        parts = line.split()
+        if parts and parts[0] == ".text":
+            return int(parts[1])
+    return obj.stat().st_size
+
+
+def main() -> None:
+    cost = compilator.RANGE_COST
+    results: dict[str, CompilerResult] = {}
+    # A range that costs more than any switch keeps every key as a `case`
+    compilator.RANGE_COST = 1 << 16
+    results["cases"] = build()
+    compilator.RANGE_COST = cost
+    results["ranges"] = build()
+
+    rng = random.Random(1)
+    tokens = rng.choices(SAMPLES, k=TOTAL * len(SAMPLES) // len(b"".join(SAMPLES)))
+    with CDriver(CALLBACKS) as driver:
+        data = driver.input(b"".join(tokens))
+        sizes = {}
+        rates = {}
+        for name, res in results.items():
+            binary = driver.compile(name, res)
+            sizes[name] = textSize(driver.cc, binary.parent / "bench.c", str(binary.parent))
+            rates[name] = driver.run(binary, data, repeat=3)
+
+        print(f"{'':>8} {'.text bytes':>12} {'MB/s':>8}")
+        for name in results:
+            print(f"{name:>8} {sizes[name]:12d} {rates[name]:8.0f}")
+        print(
+            f"{'ranges':>8} {sizes['ranges'] / sizes['cases']:11.2f}x"
+            f" {rates['ranges'] / rates['cases']:7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
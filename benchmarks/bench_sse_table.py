@@ -0,0 +1,59 @@
+"""
+Throughput of the SWAR and SSE4.2 skip-aheads of self-looping table lookups.
+
+Compiles a header-value style parser three times, plain byte at a time with
+`-DLLPARSE_NO_SWAR`, with the default SWAR path and with `-msse4.2`, and
+times them on lines of increasing length::
+
+    python -m benchmarks.bench_sse_table
+"""
+
+from benchmarks.cdriver import CDriver
+from llparse import LLParse
+from llparse.llparse import CompilerResult
+
+LINE_LENGTHS = (8, 32, 128, 1024)
+TOTAL = 64 << 20
+
+CALLBACKS = "int on_value(bench_t* s, const char* p, const char* endp) { return 0; }"
+
+
+def build() -> CompilerResult:
+    p = LLParse("bench")
+    start = p.node("start")
+    value = p.node("value")
+    eol = p.node("eol")
+    span = p.span(p.code.span("on_value"))
+
+    start.match("\n", start).otherwise(span.start(value))
+    value.match([chr(c) for c in range(0x20, 0x7F)], value).otherwise(span.end(eol))
+    eol.match("\n", start).otherwise(p.error(1, "bad"))
+
+    return p.build(start)
+
+
+def lines(length: int) -> bytes:
+    letters = bytes(range(ord("a"), ord("z") + 1))
+    line = (letters * (length // len(letters) + 1))[:length] + b"\n"
+    return line * (TOTAL // len(line))
+
+
+def main() -> None:
+    res = build()
+    with CDriver(CALLBACKS) as driver:
+        variants = (
+            ("scalar", ["-DLLPARSE_NO_SWAR"]),
+            ("swar", []),
+            ("sse4.2", ["-msse4.2"]),
+        )
+        binaries = {name: driver.compile(name, res, flags) for name, flags in variants}
+
+        print(f"{'line':>6}" + "".join(f" {name + ' MB/s':>12}" for name in binaries))
+        for line in LINE_LENGTHS:
+            data = driver.input(lines(line))
+            rates = [driver.run(binary, data) for binary in binaries.values()]
+            print(f"{line:>6}" + "".join(f" {rate:12.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
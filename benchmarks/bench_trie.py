@@ -0,0 +1,51 @@
+"""
+Benchmark for building match tries out of large keyword sets::
+
+    python -m benchmarks.bench_trie
+"""
+
+import random
+import time
+import tracemalloc
+
+from llparse.pybuilder import Builder
+from llparse.trie import Trie
+
+SIZES = (10_000, 100_000)
+ALPHABET = "abcdefghijklmnopqrstuvwxyz-_"
+
+
+def keywords(size: int) -> list[str]:
+    rng = random.Random(size)
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 24))))
+    return sorted(words)
+
+
+def build_edges(size: int):
+    b = Builder()
+    node = b.node("keywords")
+    node.select({word: i for i, word in enumerate(keywords(size))}, b.node("done"))
+    return list(node)
+
+
+def main() -> None:
+    print(f"{'keywords':>9} {'time (ms)':>10} {'peak (MB)':>10}")
+    for size in SIZES:
+        edges = build_edges(size)
+
+        begin = time.perf_counter()
+        Trie("keywords").build(edges)
+        elapsed = time.perf_counter() - begin
+
+        tracemalloc.start()
+        Trie("keywords").build(edges)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{size:>9} {elapsed * 1e3:10.1f} {peak / 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compiling and timing of the benchmarks that run generated parsers natively.
+Benchmarks build their grammar as `bench`, generate their input and leave
+the rest to `CDriver`::
+
+    callbacks = "int on_value(bench_t* s, const char* p, const char* endp) { return 0; }"
+    with CDriver(callbacks) as driver:
+        data = driver.input(b"a line\\n" * 100_000)
+        binary = driver.compile("plain", p.build(start), ["-DLLPARSE_NO_SWAR"])
+        print(driver.run(binary, data), "MB/s")
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+
+from llparse.llparse import CompilerResult
+
+DRIVER = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include "bench.h"
+
+{callbacks}
+
+int main(int argc, char** argv) {{
+  FILE* f = fopen(argv[1], "rb");
+  size_t chunk = (size_t) atol(argv[2]);
+  size_t len;
+  char* buf;
+  bench_t s;
+  struct timespec begin, end;
+
+  fseek(f, 0, SEEK_END);
+  len = (size_t) ftell(f);
+  fseek(f, 0, SEEK_SET);
+  buf = malloc(len);
+  if (fread(buf, 1, len, f) != len) {{
+    return 2;
+  }}
+  fclose(f);
+  if (chunk == 0) {{
+    chunk = len;
+  }}
+
+  bench_init(&s);
+  clock_gettime(CLOCK_MONOTONIC, &begin);
+  for (size_t off = 0; off < len; off += chunk) {{
+    size_t n = len - off < chunk ? len - off : chunk;
+    if (bench_execute(&s, buf + off, buf + off + n) != 0) {{
+      return 1;
+    }}
+  }}
+  clock_gettime(CLOCK_MONOTONIC, &end);
+
+  double seconds = (end.tv_sec - begin.tv_sec) + (end.tv_nsec - begin.tv_nsec) / 1e9;
+  printf("%f\n", len / seconds / 1e6);
+  return 0;
+}}
+"""
+
+
+class CDriver:
+    """Compiles parsers together with `DRIVER` in a temporary directory and
+    times how fast they get through an input file. Exits if there is no C
+    compiler.
+
+    :param callbacks: C definitions of the callbacks the parsers call
+    """
+
+    def __init__(self, callbacks: str = "") -> None:
+        cc = shutil.which("cc") or shutil.which("gcc")
+        if cc is None:
+            sys.exit("No C compiler available")
+        self.cc = cc
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+        (self.dir / "driver.c").write_text(DRIVER.format(callbacks=callbacks))
+
+    def __enter__(self) -> "CDriver":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._tmp.cleanup()
+
+    def input(self, data: bytes, name: str = "input") -> Path:
+        """Writes `data` to a file for `run`"""
+        path = self.dir / name
+        path.write_bytes(data)
+        return path
+
+    def compile(self, name: str, res: CompilerResult, flags: Sequence[str] = ()) -> Path:
+        """Compiles `res` at `-O2`, or whatever `flags` override it with,
+        into its own directory and returns the binary"""
+        out = self.dir / name
+        out.mkdir()
+        (out / "bench.c").write_text(res.c)
+        (out / "bench.h").write_text(res.header)
+        binary = out / "bench"
+        subprocess.run(
+            [self.cc, "-O2", *flags, "-I", str(out), "-o", str(binary),
+             str(self.dir / "driver.c"), str(out / "bench.c")],
+            check=True,
+        )
+        return binary
+
+    def run(self, binary: Path, input: Path, chunk: int = 0, repeat: int = 1) -> float:
+        """MB/s of the best of `repeat` runs of `binary` over `input`, fed
+        `chunk` bytes at a time or all at once"""
+        return max(
+            float(subprocess.run(
+                [str(binary), str(input), str(chunk)], capture_output=True, check=True, text=True
+            ).stdout)
+            for _ in range(repeat)
+        )
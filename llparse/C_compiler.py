@@ -1,16 +1,30 @@
 from .compilator import Compilation, ICompilerOptions, Node
-from .constants import ARG_STATE, ARG_POS, ARG_ENDPOS, VAR_MATCH, STATE_ERROR
+from .constants import (
+    ARG_STATE,
+    ARG_POS,
+    ARG_ENDPOS,
+    VAR_MATCH,
+    STATE_ERROR,
+    LABEL_SUSPEND,
+)
 from .frontend import IFrontendResult
+from .profiler import PhaseStats
 
 
 class CCompiler:
     """The Final HeadPeice where the Main C-Code gets compiled to..."""
 
-    def __init__(self, header: str | None = None, debug: str | None = None) -> None:
+    def __init__(
+        self,
+        header: str | None = None,
+        debug: str | None = None,
+        computedGoto: bool = False,
+        cacheFields: bool = False,
+    ) -> None:
         # NOTE Unlike in typescript llparse Containers are not Required since I'm using a different methoad to translate those parts...
-        self.options = ICompilerOptions(debug, header)
+        self.options = ICompilerOptions(debug, header, computedGoto, cacheFields)
 
-    def compile(self, info: IFrontendResult):
+    def compile(self, info: IFrontendResult, stats: PhaseStats | None = None):
         compilation = Compilation(
             info.prefix,
             info.properties,
@@ -52,6 +66,19 @@ class CCompiler:
         out.append(" #define UNREACHABLE __builtin_unreachable()")
         out.append("#endif  /* _MSC_VER */")
 
+        if self.options.computedGoto:
+            # `_current` holds the address of the label to resume at, other
+            # compilers keep dispatching through the switch in `_run`
+            out.append("")
+            out.append(
+                "#if defined(__GNUC__) && !defined(LLPARSE_NO_COMPUTED_GOTO)"
+            )
+            out.append(" #define LLPARSE_COMPUTED_GOTO")
+            out.append(" #define LLPARSE_RESUME(state) ((void*) &&state)")
+            out.append("#else  /* !__GNUC__ */")
+            out.append(" #define LLPARSE_RESUME(state) ((void*) (intptr_t) state)")
+            out.append("#endif  /* __GNUC__ */")
+
         out.append("")
         out.append(
             f'#include "{self.options.header if self.options.header else info.prefix}.h"'
@@ -65,6 +92,8 @@ class CCompiler:
         # otherwise we will have nothing
         # but mess which is not what we want - Vizonex
         compilation.reserveSpans(info.spans)
+        compilation.analyzeInput(info.root)
+        compilation.cacheFields(info.root)
 
         rootState: Node = compilation.unwrapNode(info.root)
         rootName = rootState.build(compilation)
@@ -74,18 +103,49 @@ class CCompiler:
 
         out.append(f"int {info.prefix}_init({info.prefix}_t* {ARG_STATE}) " + "{")
         out.append(f"  memset({ARG_STATE}, 0, sizeof(*{ARG_STATE}));")
-        out.append(f"  {ARG_STATE}->_current = (void*) (intptr_t) {rootName};")
+        if self.options.computedGoto:
+            # There is no label address to take outside of `_run`, NULL
+            # stands for the root there
+            out.append("#ifdef LLPARSE_COMPUTED_GOTO")
+            out.append(f"  {ARG_STATE}->_current = NULL;")
+            out.append("#else  /* !LLPARSE_COMPUTED_GOTO */")
+            out.append(f"  {ARG_STATE}->_current = (void*) (intptr_t) {rootName};")
+            out.append("#endif  /* LLPARSE_COMPUTED_GOTO */")
+        else:
+            out.append(f"  {ARG_STATE}->_current = (void*) (intptr_t) {rootName};")
         out.append("  return 0;")
         out.append("}")
         out.append("")
 
         # TODO (Vizonex) Make llparse_state_t's Name Optional and alterable incase mixed with
         # llhttp or another parser
-        out.append(f"static llparse_state_t {info.prefix}__run(")
+        # With computed gotos `_run` can't be inlined into `_execute`, so it
+        # does the work of `_execute` after the state machine stops instead
+        computedGoto = self.options.computedGoto
+        if computedGoto:
+            # GCC takes the label addresses stored in `_current` for pointers
+            # to locals of `_run`, they are only ever jumped to from `_run`
+            out.append(
+                "#if defined(LLPARSE_COMPUTED_GOTO) && !defined(__clang__) && __GNUC__ >= 12"
+            )
+            out.append(" #pragma GCC diagnostic push")
+            out.append(' #pragma GCC diagnostic ignored "-Wdangling-pointer"')
+            out.append("#endif")
+        out.append(
+            f"static {'int' if computedGoto else 'llparse_state_t'} {info.prefix}__run("
+        )
         out.append(f"    {info.prefix}_t* {ARG_STATE},")
         out.append(f"    const unsigned char* {ARG_POS},")
         out.append(f"    const unsigned char* {ARG_ENDPOS}) " + "{")
         out.append(f"  int {VAR_MATCH};")
+        tmp = []
+        compilation.declareFields(tmp)
+        compilation.indent(out, tmp, "  ")
+        if computedGoto:
+            current = compilation.currentField()
+            out.append("#ifdef LLPARSE_COMPUTED_GOTO")
+            out.append(f"  goto *({current} != NULL ? {current} : &&{rootName});")
+            out.append("#endif  /* LLPARSE_COMPUTED_GOTO */")
         out.append(
             "  switch ((llparse_state_t) (intptr_t) "
             + f"{compilation.currentField()}) "
@@ -108,7 +168,20 @@ class CCompiler:
         compilation.buildInternalStates(tmp)
         compilation.indent(out, tmp, "  ")
 
+        if computedGoto:
+            out.append(f"{LABEL_SUSPEND}:")
+            tmp = []
+            self.executeSpans(compilation, info, tmp)
+            compilation.indent(out, tmp, "  ")
+            out.append("  return 0;")
+
         out.append("}")
+        if computedGoto:
+            out.append(
+                "#if defined(LLPARSE_COMPUTED_GOTO) && !defined(__clang__) && __GNUC__ >= 12"
+            )
+            out.append(" #pragma GCC diagnostic pop")
+            out.append("#endif")
         out.append("")
 
         out.append(
@@ -116,8 +189,9 @@ class CCompiler:
             + f"const char* {ARG_POS}, const char* {ARG_ENDPOS}) "
             + "{"
         )
-        out.append("  llparse_state_t next;")
-        out.append("")
+        if not computedGoto:
+            out.append("  llparse_state_t next;")
+            out.append("")
 
         out.append("  /* check lingering errors */")
         out.append(f"  if ({compilation.errorField()} != 0) " + "{")
@@ -133,19 +207,30 @@ class CCompiler:
             f"(const unsigned char*) {compilation.posArg()}",
             f"(const unsigned char*) {compilation.endPosArg()}",
         ]
-        out.append(f"  next = {info.prefix}__run({(', ').join(args)});")
-        out.append(f"  if (next == {STATE_ERROR}) " + "{")
-        out.append(f"    return {compilation.errorField()};")
-        out.append("  }")
-        out.append(f"  {compilation.currentField()} = (void*) (intptr_t) next;")
-        out.append("")
+        if computedGoto:
+            out.append(f"  return {info.prefix}__run({(', ').join(args)});")
+            out.append("}")
+        else:
+            out.append(f"  next = {info.prefix}__run({(', ').join(args)});")
+            out.append(f"  if (next == {STATE_ERROR}) " + "{")
+            out.append(f"    return {compilation.errorField()};")
+            out.append("  }")
+            out.append(f"  {compilation.currentField()} = (void*) (intptr_t) next;")
+            out.append("")
 
-        tmp = []
-        self.executeSpans(compilation, info, tmp)
-        compilation.indent(out, tmp, "  ")
+            tmp = []
+            self.executeSpans(compilation, info, tmp)
+            compilation.indent(out, tmp, "  ")
 
-        out.append("  return 0;")
-        out.append("}")
+            out.append("  return 0;")
+            out.append("}")
+
+        if stats is not None:
+            stats.counts["states"] = len(compilation.state_dict)
+            stats.counts["resumption"] = len(
+                compilation.resumption_targets & compilation.state_dict.keys()
+            )
+            stats.counts["blobs"] = len(compilation.blobs)
 
         # JOIN ALL OF THEM!
         return "\n".join(out)
@@ -191,7 +276,7 @@ class CCompiler:
             # TODO (Vizonex): Deduplicate when indutny updates his side so we can all make our changes accordingly...
             out.append("  if (error != 0) {")
             out.append(f"    {ctx.errorField()} = error;")
-            out.append(f"    {ctx.errorPosField()} = {ctx.endPosArg()};")
+            out.append(f"    {ctx.errorPosField()} = (const char*) {ctx.endPosArg()};")
             out.append("    return error;")
             out.append("  }")
             out.append("}")
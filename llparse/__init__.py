@@ -7,6 +7,7 @@ A Pythonic version of the typescript llparse library.
 
 from .dot import Dot
 from .llparse import LLParse
+from .pybuilder.graph import GraphIndex
 
 __version__ = "0.3.1"
-__all__ = ("Dot", "LLParse")
+__all__ = ("Dot", "GraphIndex", "LLParse")
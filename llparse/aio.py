@@ -0,0 +1,409 @@
+"""
+asyncio adapters for the parsers of `llparse.extension`. Every connection
+gets a parser from a `ParserPool` and the events of what it receives are
+handed, in order, to handlers that may be coroutines:
+
+```python
+module = p.extension("http").load(method)
+
+async def on_url(protocol, event):
+    await store(event.data.tobytes())
+
+pool = ParserPool(module, size=1024)
+server = await loop.create_server(protocolFactory(pool, {"on_url": on_url}), port=8080)
+```
+
+or with streams:
+
+```python
+async with StreamParser(pool, reader) as stream:
+    async for event in stream:
+        if isinstance(event, Paused):
+            ...
+            stream.resume()
+```
+
+When the parser reaches one of its pauses (`module.PAUSES`) reading stops
+until the application acknowledges it with `resume()`, what was received
+after the pause is fed to the parser then. Reading also stops while the
+handlers fall behind by more than `highWater` events.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from types import ModuleType
+from typing import Any, NamedTuple
+
+from .errors import Error
+
+# Handlers run for the `Paused` markers of a connection
+PAUSE = "pause"
+
+DEFAULT_HIGH_WATER = 4096
+DEFAULT_POOL_SIZE = 64
+DEFAULT_CHUNK = 1 << 16
+
+
+class Event(NamedTuple):
+    name: str
+    """Name of the callback the parser ran into"""
+    data: memoryview
+    """What the span covered in the data received, empty for matches and values"""
+    value: int
+    """Value of value callbacks, 0 otherwise"""
+
+
+class Paused(NamedTuple):
+    code: int
+    reason: str | None
+
+
+class ParseError(Error):
+    """The parser ran into one of its errors, `events` are the ones that
+    came before it in the same data"""
+
+    def __init__(
+        self, code: int, reason: str | None, offset: int | None, events: list[Event]
+    ) -> None:
+        super().__init__(f"Parser error {code}: {reason}")
+        self.code = code
+        self.reason = reason
+        self.offset = offset
+        self.events = events
+
+
+class ParserPool:
+    """Keeps the parsers of an extension module around between connections
+    so that opening and closing them doesn't allocate new parsers.
+
+    :param module: Extension module built by `LLParse.extension`
+    :param size: Parsers to create upfront
+    :param maxSize: Most parsers kept around once released, never less than
+        `size` and `DEFAULT_POOL_SIZE` if not given
+    :param capacity: Events each parser has room for before growing its buffer
+    """
+
+    __slots__ = ("module", "maxSize", "capacity", "_free")
+
+    def __init__(
+        self,
+        module: ModuleType,
+        size: int = 0,
+        maxSize: int | None = None,
+        capacity: int | None = None,
+    ) -> None:
+        self.module = module
+        self.maxSize = max(size, DEFAULT_POOL_SIZE if maxSize is None else maxSize)
+        self.capacity = capacity
+        self._free = [self._create() for _ in range(size)]
+
+    def _create(self) -> Any:
+        if self.capacity is None:
+            return self.module.Parser()
+        return self.module.Parser(capacity=self.capacity)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> Any:
+        """A parser at its start, only created when the pool ran out"""
+        return self._free.pop() if self._free else self._create()
+
+    def release(self, parser: Any) -> None:
+        """Resets `parser` and keeps it for `acquire` if there is room"""
+        if len(self._free) < self.maxSize:
+            parser.init()
+            self._free.append(parser)
+
+
+class Feeder:
+    """Runs one connection's data through its parser and turns the batch of
+    each `execute` into `Event`s. Once the parser pauses, data is kept until
+    `resume`"""
+
+    __slots__ = ("parser", "names", "pauses", "paused", "pending")
+
+    def __init__(self, module: ModuleType, parser: Any) -> None:
+        self.parser = parser
+        self.names = [""] * len(module.EVENTS)
+        for name, id in module.EVENTS.items():
+            self.names[id] = name
+        self.pauses: frozenset[int] = module.PAUSES
+        self.paused: Paused | None = None
+        self.pending: deque[memoryview] = deque()
+
+    def feed(self, data: bytes | memoryview) -> list[Event]:
+        """The events of `data`, raises `ParseError` if it can't be parsed"""
+        view = memoryview(data)
+        if self.paused is not None:
+            self.pending.append(view)
+            return []
+        return self._execute(view)
+
+    def resume(self) -> list[Event]:
+        """Acknowledges the pause and parses what was received since, it may
+        pause again"""
+        if self.paused is None:
+            return []
+        self.parser.resume()
+        self.paused = None
+
+        events: list[Event] = []
+        try:
+            while self.pending and self.paused is None:
+                events.extend(self._execute(self.pending.popleft()))
+        except ParseError as e:
+            e.events[:0] = events
+            raise
+        return events
+
+    def _execute(self, view: memoryview) -> list[Event]:
+        parser = self.parser
+        err = parser.execute(view)
+        names = self.names
+        events = [
+            Event(names[event], view[start:end], value)
+            for event, start, end, value in parser.events()
+        ]
+        if err == 0:
+            return events
+
+        offset = parser.error_offset
+        if err not in self.pauses:
+            raise ParseError(err, parser.reason, offset, events)
+        self.paused = Paused(err, parser.reason)
+        self.pending.appendleft(view[offset:])
+        return events
+
+
+Handler = Callable[[Any, Any], Awaitable[None] | None]
+
+
+class ParserProtocol(asyncio.Protocol):
+    """Parses everything a connection receives and runs the handler of
+    every event, by name, one after the other. Handlers are called as
+    `handler(protocol, event)` and may be coroutines, a handler for `PAUSE`
+    gets the `Paused` markers. Connections without one resume right away.
+
+    Subclasses can override `parseError` and `handlerError`, which close
+    the connection by default.
+    """
+
+    def __init__(
+        self,
+        pool: ParserPool,
+        handlers: dict[str, Handler],
+        highWater: int = DEFAULT_HIGH_WATER,
+        lowWater: int | None = None,
+    ) -> None:
+        self.pool = pool
+        self.handlers = handlers
+        self.highWater = highWater
+        self.lowWater = highWater // 4 if lowWater is None else lowWater
+        self.transport: asyncio.Transport | None = None
+        self.feeder: Feeder | None = None
+        self._queue: deque[Event | Paused | None] = deque()
+        self._ready = asyncio.Event()
+        self._reading = True
+        self._task: asyncio.Task | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self.feeder = Feeder(self.pool.module, self.pool.acquire())
+        self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def data_received(self, data: bytes) -> None:
+        if self.feeder is None:
+            return
+        paused = self.feeder.paused
+        try:
+            events = self.feeder.feed(data)
+        except ParseError as e:
+            self._push(e.events, False)
+            self.parseError(e)
+            return
+        # Data received while paused waits for `resume`
+        self._push(events, paused is None)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        # The handlers still get what was received before
+        self._queue.append(None)
+        self._ready.set()
+
+    def resume(self) -> None:
+        """Acknowledges a pause, the parser goes on with what was received since"""
+        if self.feeder is None or self.feeder.paused is None:
+            return
+        try:
+            events = self.feeder.resume()
+        except ParseError as e:
+            self._push(e.events, False)
+            self.parseError(e)
+            return
+        self._push(events, True)
+
+    def parseError(self, error: ParseError) -> None:
+        assert self.transport is not None
+        self.transport.close()
+
+    def handlerError(self, error: BaseException) -> None:
+        assert self.transport is not None
+        self.transport.close()
+        asyncio.get_running_loop().call_exception_handler(
+            {"message": "Unhandled exception in a parser handler", "exception": error, "protocol": self}
+        )
+
+    def _push(self, events: list[Event], running: bool) -> None:
+        """Queues `events` and the pause they ended in if the parser was running"""
+        assert self.feeder is not None
+        self._queue.extend(events)
+        if running and self.feeder.paused is not None:
+            self._queue.append(self.feeder.paused)
+        if self._queue:
+            self._ready.set()
+        self._flow()
+
+    def _flow(self) -> None:
+        """Pauses reading while paused or behind on events, resumes it otherwise"""
+        assert self.transport is not None
+        if self.feeder is None or self.transport.is_closing():
+            return
+        paused = self.feeder.paused is not None
+        if self._reading and (paused or len(self._queue) > self.highWater):
+            self._reading = False
+            self.transport.pause_reading()
+        elif not self._reading and not paused and len(self._queue) <= self.lowWater:
+            self._reading = True
+            self.transport.resume_reading()
+
+    async def _dispatch(self) -> None:
+        queue = self._queue
+        try:
+            while True:
+                if not queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                item = queue.popleft()
+                if item is None:
+                    return
+
+                if isinstance(item, Paused):
+                    handler = self.handlers.get(PAUSE)
+                    if handler is None:
+                        self.resume()
+                        continue
+                else:
+                    handler = self.handlers.get(item.name)
+                    if handler is None:
+                        continue
+
+                try:
+                    res = handler(self, item)
+                    if inspect.isawaitable(res):
+                        await res
+                except Exception as e:
+                    self.handlerError(e)
+                    return
+
+                if not self._reading:
+                    self._flow()
+        finally:
+            assert self.feeder is not None
+            queue.clear()
+            self.pool.release(self.feeder.parser)
+            self.feeder = None
+
+
+def protocolFactory(
+    pool: ParserPool,
+    handlers: dict[str, Handler],
+    protocol: type[ParserProtocol] = ParserProtocol,
+    **options: Any,
+) -> Callable[[], ParserProtocol]:
+    """A protocol factory for `loop.create_server` or `loop.create_connection`
+    whose connections share `pool` and `handlers`"""
+    return lambda: protocol(pool, handlers, **options)
+
+
+class StreamParser:
+    """Parses what `reader` receives and yields its `Event`s and `Paused`
+    markers. After a `Paused` marker nothing is read until `resume()` is
+    called, leaving it to the reader's limit to stop the transport.
+
+    The parser goes back to `pool` once the stream ends or fails, or with
+    `aclose()` (or leaving `async with`) when iteration stops early. A stream
+    left by `break` can be iterated again to go on where it stopped, events
+    that were parsed but not yet yielded are kept for it.
+    """
+
+    __slots__ = ("pool", "reader", "chunk", "feeder", "_pending", "_resumed", "_closed")
+
+    def __init__(self, pool: ParserPool, reader: asyncio.StreamReader, chunk: int = DEFAULT_CHUNK) -> None:
+        self.pool = pool
+        self.reader = reader
+        self.chunk = chunk
+        self.feeder = Feeder(pool.module, pool.acquire())
+        # Parsed but not yet yielded, a `ParseError` is raised once it is reached
+        self._pending: deque[Event | Paused | ParseError] = deque()
+        self._resumed = asyncio.Event()
+        self._closed = False
+
+    def resume(self) -> None:
+        """Acknowledges a pause"""
+        self._resumed.set()
+
+    async def aclose(self) -> None:
+        """Gives the parser back to the pool, only the first call does"""
+        self._close()
+
+    async def __aenter__(self) -> StreamParser:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    def _close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.pool.release(self.feeder.parser)
+
+    async def __aiter__(self) -> AsyncIterator[Event | Paused]:
+        if self._closed:
+            raise Error("The stream is closed")
+        feeder = self.feeder
+        pending = self._pending
+        while True:
+            while pending:
+                item = pending.popleft()
+                if isinstance(item, ParseError):
+                    self._close()
+                    raise item
+                yield item
+
+            if feeder.paused is not None:
+                await self._resumed.wait()
+                self._queue(feeder.resume)
+            else:
+                data = await self.reader.read(self.chunk)
+                if not data:
+                    self._close()
+                    return
+                self._queue(feeder.feed, data)
+
+    def _queue(self, step: Callable[..., list[Event]], *args: Any) -> None:
+        # The events before an error are still yielded, the error comes after them
+        try:
+            self._pending.extend(step(*args))
+        except ParseError as e:
+            self._pending.extend(e.events)
+            self._pending.append(e)
+            return
+        if self.feeder.paused is not None:
+            self._resumed.clear()
+            self._pending.append(self.feeder.paused)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Generic, TypeVar
 
@@ -11,6 +12,9 @@ from .constants import (
     SIGNED_TYPES,
     STATE_ERROR,
     STATE_PREFIX,
+    INPUT_PREFIX,
+    FIELD_PREFIX,
+    LABEL_SUSPEND,
     ARG_STATE,
     UNSIGNED_LIMITS,
     LABEL_PREFIX,
@@ -20,6 +24,8 @@ from .constants import (
     BLOB_PREFIX,
 )
 from .frontend import IWrap, WrappedNode, _frontend
+from .enumerator import Enumerator
+from .pyfront.availability import InputAvailability
 
 # NOTE Unfortunately You cant Just import from different files as that would trigger a Circular import
 # So this file a little bit bigger than what I hoped for but was my only solution - Vizonex
@@ -32,24 +38,52 @@ class Transform(ABC):
     @abstractmethod
     def build(self, ctx: "Compilation", value: str) -> None: ...
 
+    @abstractmethod
+    def buildWord(self, value: str, width: int) -> str:
+        """Applies the transform to every byte of `value`, an unsigned
+        integer variable `width` bits wide, at once"""
+
+
+def wordConstant(byte: int, width: int) -> str:
+    """`byte` repeated in every lane of a `width` bits wide C constant"""
+    word = int.from_bytes(bytes((byte,)) * (width // 8), "little")
+    return f"0x{word:0{width // 4}x}{'ULL' if width == 64 else 'U'}"
+
 
 @dataclass(slots=True)
 class ID(Transform):
     def build(self, ctx: "Compilation", value: str):
         return value
 
+    def buildWord(self, value: str, width: int) -> str:
+        return value
+
 
 @dataclass(slots=True)
 class ToLowerUnsafe(Transform):
     def build(self, ctx: "Compilation", value: str):
         return f"(({value})| 0x20)"
 
+    def buildWord(self, value: str, width: int) -> str:
+        return f"({value} | {wordConstant(0x20, width)})"
+
 
 @dataclass(slots=True)
 class ToLower(Transform):
     def build(self, ctx: "Compilation", value: str):
         return f"(({value}) >= 'A' && ({value}) <= 'Z' ? ({value} | 0x20) : ({value}))"
 
+    def buildWord(self, value: str, width: int) -> str:
+        # The high bit of a lane ends up set only for 'A' <= byte <= 'Z',
+        # shifting it down by two turns it into that lane's 0x20
+        ascii = f"({value} & {wordConstant(0x7F, width)})"
+        upper = (
+            f"((({ascii} + {wordConstant(0x80 - ord('A'), width)}) ^ "
+            f"({ascii} + {wordConstant(0x80 - ord('Z') - 1, width)})) & "
+            f"~{value} & {wordConstant(0x80, width)})"
+        )
+        return f"({value} | ({upper} >> 2))"
+
 
 @dataclass(slots=True)
 class MatchSequence:
@@ -73,7 +107,40 @@ class MatchSequence:
     def getName(self):
         return f"llparse_match_sequence_{self.transform.ref.name}"
 
+    def getCompareName(self):
+        return f"llparse_compare_sequence_{self.transform.ref.name}"
+
+    def buildCompare(self, ctx: "Compilation", out: list[str]):
+        """Compares a whole sequence against input that is known to be long
+        enough, a word at a time with the transform applied to every lane"""
+        out.append(f"static inline int {self.getCompareName()}(")
+        out.append("    const unsigned char* p, const unsigned char* seq,")
+        out.append("    uint32_t seq_len) {")
+        for width in (64, 32):
+            out.append(f"  for (; seq_len >= {width // 8}; p += {width // 8}, "
+                       f"seq += {width // 8}, seq_len -= {width // 8}) {{")
+            out.append(f"    uint{width}_t word;")
+            out.append(f"    uint{width}_t expected;")
+            out.append("")
+            out.append(f"    memcpy(&word, p, {width // 8});")
+            out.append(f"    memcpy(&expected, seq, {width // 8});")
+            out.append(f"    if ({self.transform.buildWord('word', width)} != expected) {{")
+            out.append("      return 0;")
+            out.append("    }")
+            out.append("  }")
+        out.append("  for (; seq_len != 0; p++, seq++, seq_len--) {")
+        out.append(f"    if ({self.transform.build(ctx, '*p')} != *seq) {{")
+        out.append("      return 0;")
+        out.append("    }")
+        out.append("  }")
+        out.append("  return 1;")
+        out.append("}")
+
     def build(self, ctx: "Compilation", out: list[str]):
+        out.append("#ifndef LLPARSE_NO_FAST_MATCH")
+        self.buildCompare(ctx, out)
+        out.append("#endif  /* LLPARSE_NO_FAST_MATCH */")
+        out.append("")
         out.append(f"static llparse_match_t {self.getName()}(")
         out.append(f"    {ctx.prefix}_t* s, const unsigned char* p,")
         out.append("    const unsigned char* endp,")
@@ -143,6 +210,10 @@ class Field(Code):
         self.ref = ref
 
     def build(self, ctx: "Compilation", out: list[str]):
+        if self.ref.field in ctx.cachedFields:
+            self.buildCached(ctx, out)
+            return
+
         out.append(f"int {self.ref.name} (")
         out.append(f"  {ctx.prefix}_t* {ctx.stateArg()},")
         out.append(f"  const unsigned char* {ctx.posArg()},")
@@ -161,7 +232,18 @@ class Field(Code):
     def doBuild(self, ctx: "Compilation", out: list[str]):
         return
 
+    def buildCached(self, ctx: "Compilation", out: list[str]):
+        """Declares whatever `expression` needs when the field is kept in a
+        local of `_run`, most operations are plain expressions on it"""
+        return
+
+    def expression(self, ctx: "Compilation") -> str:
+        """The operation inlined on the local holding the field"""
+        raise NotImplementedError
+
     def field(self, ctx: "Compilation"):
+        if self.ref.field in ctx.cachedFields:
+            return ctx.stateField(self.ref.field)
         return f"{ctx.stateArg()}->{self.ref.field}"
 
 
@@ -170,7 +252,11 @@ class And(Field):
         self.ref = ref
 
     def doBuild(self, ctx: "Compilation", out: list[str]):
-        out.append(f"{self.field(ctx)} &= {self.ref.value}")
+        out.append(f"{self.field(ctx)} &= {self.ref.value};")
+        out.append("return 0;")
+
+    def expression(self, ctx: "Compilation") -> str:
+        return f"({self.field(ctx)} &= {self.ref.value}, 0)"
 
 
 class IsEqual(Field):
@@ -180,6 +266,9 @@ class IsEqual(Field):
     def doBuild(self, ctx: "Compilation", out: list[str]):
         out.append(f"return {self.field(ctx)} == {self.ref.value};")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return f"{self.field(ctx)} == {self.ref.value}"
+
 
 class Load(Field):
     def __init__(self, ref: _frontend.code.Load):
@@ -188,6 +277,9 @@ class Load(Field):
     def doBuild(self, ctx: "Compilation", out: list[str]):
         out.append(f"return {self.field(ctx)};")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return self.field(ctx)
+
 
 # BIG ONE
 
@@ -196,18 +288,36 @@ class MulAdd(Field):
     def __init__(self, ref: _frontend.code.MulAdd):
         self.ref = ref
 
+    def buildCached(self, ctx: "Compilation", out: list[str]):
+        # Too much for an expression, a `static inline` function on a
+        # pointer to the local still ends up inlined into `_run`
+        ty = ctx.cachedFields[self.ref.field]
+        out.append(f"static inline int {self.ref.name} (")
+        out.append(f"    {ty}* value,")
+        out.append(f"    int {ctx.matchVar()}) " + "{")
+        tmp: list[str] = []
+        self.doBuild(ctx, tmp)
+        ctx.indent(out, tmp, "  ")
+        out.append("}")
+
+    def expression(self, ctx: "Compilation") -> str:
+        return f"{self.ref.name}(&{self.field(ctx)}, {ctx.matchVar()})"
+
     def doBuild(self, ctx: "Compilation", out: list[str]):
         options = self.ref.options
         ty = ctx.getFieldType(self.ref.field)
 
-        field = self.field(ctx)
+        if self.ref.field in ctx.cachedFields:
+            field = "(*value)"
+        else:
+            field = self.field(ctx)
 
         if options.signed:
             if not SIGNED_TYPES.get(ty):
                 raise AssertionError(f'Unexpected mulAdd type "{ty}"')
 
             targetTy = SIGNED_TYPES[ty]
-            out.append(f"{targetTy}* field = ({targetTy}*) &{field}")
+            out.append(f"{targetTy}* field = ({targetTy}*) &{field};")
             field = "(*field)"
 
         _match = ctx.matchVar()
@@ -264,6 +374,9 @@ class Or(Field):
         out.append(f"{self.field(ctx)} |= {self.ref.value};")
         out.append("return 0;")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return f"({self.field(ctx)} |= {self.ref.value}, 0)"
+
 
 class Store(Field):
     def __init__(self, ref: _frontend.code.Store):
@@ -273,6 +386,9 @@ class Store(Field):
         out.append(f"{self.field(ctx)} = {ctx.matchVar()};")
         out.append("return 0;")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return f"({self.field(ctx)} = {ctx.matchVar()}, 0)"
+
 
 class Test(Field):
     def __init__(self, ref: _frontend.code.Test):
@@ -282,6 +398,10 @@ class Test(Field):
         value = self.ref.value
         out.append(f"return ({self.field(ctx)} & {value}) == {value};")
 
+    def expression(self, ctx: "Compilation") -> str:
+        value = self.ref.value
+        return f"({self.field(ctx)} & {value}) == {value}"
+
 
 class Update(Field):
     def __init__(self, ref: _frontend.code.Update):
@@ -291,6 +411,9 @@ class Update(Field):
         out.append(f"{self.field(ctx)} = {self.ref.value};")
         out.append("return 0;")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return f"({self.field(ctx)} = {self.ref.value}, 0)"
+
 
 class Operator(Field):
     def __init__(self, ref: _frontend.code.Operator):
@@ -299,6 +422,9 @@ class Operator(Field):
     def doBuild(self, ctx: "Compilation", out: list[str]):
         out.append(f"return {self.field(ctx)} {self.ref.op} {self.ref.value};")
 
+    def expression(self, ctx: "Compilation") -> str:
+        return f"{self.field(ctx)} {self.ref.op} {self.ref.value}"
+
 
 @dataclass
 class INodeEdge:
@@ -307,6 +433,37 @@ class INodeEdge:
     value: int | None = None
 
 
+# SWAR (SIMD within a register) tests 8 input bytes at once. Every byte is
+# split into its high bit and its low 7 bits, adding `128 - n` to the low bits
+# of every byte sets their high bit exactly when they are >= n without ever
+# carrying into the next byte.
+SWAR_WORD = 8
+MAX_SWAR_TERMS = 6
+SWAR_HIGH = 0x8080808080808080
+SWAR_LOW = 0x7F7F7F7F7F7F7F7F
+SWAR_ONES = 0x0101010101010101
+
+
+def swarTerms(keys: list[int]) -> list[tuple[int, int, bool]]:
+    """Splits a byte class into `(lo, hi, high)` terms, each matching the
+    bytes with the given high bit whose low 7 bits are in `lo <= x < hi`"""
+    terms: list[tuple[int, int, bool]] = []
+    first: int | None = None
+    last: int | None = None
+    for key in sorted(set(keys)) + [None]:
+        if key is not None and last is not None and key == last + 1:
+            last = key
+            continue
+
+        if first is not None and last is not None:
+            if first < 0x80:
+                terms.append((first, min(last, 0x7F) + 1, False))
+            if last >= 0x80:
+                terms.append((max(first, 0x80) - 0x80, last - 0x80 + 1, True))
+        first = last = key
+    return terms
+
+
 class Node:
     __slots__ = ("ref", "cachedDecl", "priv_compilation")
 
@@ -315,29 +472,32 @@ class Node:
         self.cachedDecel: str | None = None
         self.priv_compilation: Compilation | None = None
 
+    @property
+    def stateName(self) -> str:
+        return STATE_PREFIX + self.ref.id.name
+
     def build(self, compilation: "Compilation"):
         if self.cachedDecel:
             return self.cachedDecel
+        # States are emitted by the compilation's worklist instead of
+        # recursing into every target that we jump to.
+        return compilation.buildStates(self)
 
-        res = STATE_PREFIX + self.ref.id.name
+    def start(self, compilation: "Compilation") -> list[str]:
+        """Reserves the state's name and builds its body, any targets it
+        jumps to are queued onto the compilation rather than built here"""
         # cached Decel Prevents Recursion errors....
-        self.cachedDecel = res
+        self.cachedDecel = self.stateName
         self.priv_compilation = compilation
 
         out: list[str] = []
-        # if "update_key" in res:
-        #     print(res)
-        #     print([*self.ref.Slots])
         compilation.debug(
             out,
             f'Entering node \\"{self.ref.id.originalName}\\" (\\"{self.ref.id.name}\\")',
         )
 
         self.doBuild(out)
-
-        compilation.addState(res, out)
-
-        return res
+        return out
 
     @property
     def compilation(self):
@@ -355,9 +515,67 @@ class Node:
         self.compilation.indent(out, tmp, "  ")
         out.append("}")
 
+        # Jumps that already have a byte at `p` come in past the check,
+        # resuming still goes through it
+        if ctx.input and ctx.input.enteredWithInput(self.ref):
+            out.append(f"{LABEL_PREFIX}{INPUT_PREFIX}{self.ref.id.name}:")
+
     def pause(self, out: list[str]):
+        ctx = self.compilation
+        ctx.storeFields(out)
+        if ctx.options.computedGoto:
+            # Only `_run` can take the address of its labels, so it stores
+            # the state itself and finishes up in place of `_execute`
+            out.append(f"{ctx.currentField()} = {ctx.resumeAddress(self.cachedDecel)};")
+            out.append(f"goto {LABEL_SUSPEND};")
+            return
         out.append(f"return {self.cachedDecel};")
 
+    def buildSWAR(self, out: list[str], keys: list[int]) -> bool:
+        """Skips ahead 8 bytes at a time while all of them are in `keys`,
+        the bytes on which this node loops back to itself"""
+        ctx = self.compilation
+
+        terms = swarTerms(keys)
+        if not terms or len(terms) > MAX_SWAR_TERMS:
+            return False
+
+        def ge(n: int) -> str:
+            # High bit of every byte whose low bits are >= n
+            if n == 0x80:
+                return "ascii"
+            return f"(ascii + 0x{(0x80 - n) * SWAR_ONES:016x}ULL)"
+
+        checks: list[str] = []
+        for lo, hi, high in terms:
+            check = f"({ge(lo)} ^ {ge(hi)})" if lo else f"~{ge(hi)}"
+            checks.append(f"({check} & {'high' if high else 'low'})")
+
+        out.append("#ifndef LLPARSE_NO_SWAR")
+        out.append(f"if ({ctx.endPosArg()} - {ctx.posArg()} >= {SWAR_WORD}) " + "{")
+        out.append("  uint64_t word;")
+        out.append("  uint64_t ascii;")
+        out.append("  uint64_t high;")
+        out.append("  uint64_t low;")
+        out.append("")
+        out.append(f"  memcpy(&word, {ctx.posArg()}, {SWAR_WORD});")
+        out.append(f"  ascii = word & 0x{SWAR_LOW:016x}ULL;")
+        out.append(f"  high = word & 0x{SWAR_HIGH:016x}ULL;")
+        out.append(f"  low = high ^ 0x{SWAR_HIGH:016x}ULL;")
+        out.append("")
+        out.append("  /* Skip all 8 bytes if every one of them is in the class */")
+        out.append(f"  if (({checks[0]}")
+        for check in checks[1:]:
+            out[-1] += " |"
+            out.append(f"       {check}")
+        out[-1] += f") == 0x{SWAR_HIGH:016x}ULL) " + "{"
+        out.append(f"    {ctx.posArg()} += {SWAR_WORD};")
+        out.append(f"    goto {LABEL_PREFIX}{self.cachedDecel};")
+        out.append("  }")
+        out.append("}")
+        out.append("#endif  /* LLPARSE_NO_SWAR */")
+        return True
+
     # The problem with the INode Implementation is that It is creating newer and newer values
     # that cannot be matched so Writing out all the arguments was a must to prevent a deadly recursion
     def tailTo(
@@ -366,18 +584,12 @@ class Node:
         node: IWrap[_frontend.node.Node],
         noAdvance: bool,
         value: int | None = None,
+        moved: bool = False,
     ):
+        """Jumps to `node`, `moved` tells that `p` was already moved by
+        hand and may have reached `endp` even though `noAdvance` is set"""
         ctx = self.compilation
-        target = ctx.unwrapNode(node).build(ctx)
-
-        # IF we have already built our target do not continue to build more of them!
-        # if not isinstance(t,str):
-        # target = t.build(ctx)
-        # else:
-        # Since we have the target already built let us not forget to use the name once more...
-        # target = t
-        if not target.startswith(STATE_PREFIX):
-            target = STATE_PREFIX + target
+        target = ctx.reserveState(ctx.unwrapNode(node))
 
         if not noAdvance:
             out.append(f"{ctx.posArg()}++;")
@@ -385,7 +597,10 @@ class Node:
         if isinstance(value, int):
             out.append(f"{ctx.matchVar()} = {value};")
 
-        out.append(f"goto {LABEL_PREFIX}{target};")
+        if not moved and ctx.skipsCheck(self.ref, noAdvance, node.ref):
+            out.append(f"goto {LABEL_PREFIX}{INPUT_PREFIX}{node.ref.id.name};")
+        else:
+            out.append(f"goto {LABEL_PREFIX}{target};")
 
     def doBuild(self, out: list[str]):
         raise NotImplementedError
@@ -470,7 +685,7 @@ class Error(Node):
         out.append(
             f"{self.compilation.currentField()} = (void*)(intptr_t) {STATE_ERROR};"
         )
-        out.append(f"return {STATE_ERROR};")
+        self.compilation.returnError(out)
 
 
 class Invoke(Node):
@@ -503,7 +718,18 @@ class Invoke(Node):
         if signature == "value":
             args.append(ctx.matchVar())
 
-        out.append(f"switch ({codeDecl}({', '.join(args)})) " + "{")
+        if isinstance(code, Field) and code.ref.field in ctx.cachedFields:
+            out.append(f"switch ({code.expression(ctx)}) " + "{")
+        elif ctx.cachedFields:
+            # The callback sees and may change the fields in `state`
+            out.append("int err;")
+            out.append("")
+            ctx.storeFields(out)
+            out.append(f"err = {codeDecl}({', '.join(args)});")
+            ctx.loadFields(out)
+            out.append("switch (err) {")
+        else:
+            out.append(f"switch ({codeDecl}({', '.join(args)})) " + "{")
         tmp: str
 
         for edge in self.ref.edges():
@@ -528,11 +754,9 @@ class Pause(Error):
         self.storeError(out)
 
         assert self.ref.otherwise
-        otherwise = ctx.unwrapNode(self.ref.otherwise.node)
-        out.append(
-            f"{ctx.currentField()} = (void*) (intptr_t) {otherwise.cachedDecel or ('s_n_' + otherwise.ref.id.name)};"
-        )
-        out.append(f"return {STATE_ERROR};")
+        otherwise = ctx.deferState(ctx.unwrapNode(self.ref.otherwise.node))
+        out.append(f"{ctx.currentField()} = {ctx.resumeAddress(otherwise)};")
+        ctx.returnError(out)
 
 
 class Sequence(Node):
@@ -550,12 +774,41 @@ class Sequence(Node):
         self.prologue(out)
 
         matchSequence = ctx.getMatchSequence(self.ref.transform)
+        select = (
+            self.ref.select.encode("utf-8")
+            if isinstance(self.ref.select, str)
+            else self.ref.select
+        )
+        blob = ctx.blob(select)
+
+        # Compare the whole sequence at once when it is fully buffered, the
+        # byte loop below is only needed to resume across chunks and to find
+        # where a mismatch happened
+        out.append("#ifndef LLPARSE_NO_FAST_MATCH")
+        out.append(
+            f"if ({ctx.indexField()} == 0 && {ctx.endPosArg()} - {ctx.posArg()} >= {len(select)} &&"
+        )
+        out.append(
+            f"    {ctx.getCompareSequence(self.ref.transform)}({ctx.posArg()}, {blob}, {len(select)})) {{"
+        )
+        out.append(f"  {ctx.posArg()} += {len(select)};")
+        tmp = []
+        self.tailTo(
+            tmp,
+            noAdvance=True,
+            node=self.ref.Edge.node,
+            value=self.ref.Edge.value,
+            moved=True,
+        )
+        ctx.indent(out, tmp, "  ")
+        out.append("}")
+        out.append("#endif  /* LLPARSE_NO_FAST_MATCH */")
 
         out.append(
             f"match_seq = {matchSequence}({ctx.stateArg()}, "
             + f"{ctx.posArg()},"
-            + f"{ctx.endPosArg()}, {ctx.blob(self.ref.select.decode('utf-8')) if isinstance(self.ref.select, str) else ctx.blob(self.ref.select)}, "
-            + f"{len(self.ref.select)});"
+            + f"{ctx.endPosArg()}, {blob}, "
+            + f"{len(select)});"
         )
         out.append("p = match_seq.current;")
 
@@ -582,22 +835,207 @@ class Sequence(Node):
         out.append("}")
 
 
+# Cost model of lowering `Single` switches into range compares: a `case` is
+# about one compare and branch, a range about two (subtract and compare)
+CASE_COST = 1
+RANGE_COST = 2
+MAX_RANGES = 4
+
+
+def keyRanges(keys: list[int]) -> list[tuple[int, int]]:
+    """Splits `keys` into runs of consecutive values, `(first, last)`"""
+    ranges: list[tuple[int, int]] = []
+    for key in sorted(keys):
+        if ranges and ranges[-1][1] == key - 1:
+            ranges[-1] = (ranges[-1][0], key)
+        else:
+            ranges.append((key, key))
+    return ranges
+
+
+def rangeCheck(value: str, lo: int, hi: int) -> str:
+    if lo == hi:
+        return f"{value} == {lo}"
+    if lo == 0:
+        return f"{value} <= {hi}"
+    if hi == MAX_CHAR:
+        return f"{value} >= {lo}"
+    return f"(unsigned char) ({value} - {lo}) <= {hi - lo}"
+
+
 class Single(Node):
     def __init__(self, ref: _frontend.node.Single) -> None:
         self.ref = ref
         super().__init__(ref)
 
+    def lowerRanges(self) -> list[tuple[list[_frontend.node.ISingleEdge], list[tuple[int, int]]]]:
+        """Picks the groups of edges that are cheaper to test as ranges of
+        keys than as `case`s, largest group first.
+
+        Edges with the same target, `noAdvance` and value form a group. A
+        group is lowered when its keys cost more as cases (`CASE_COST` each)
+        than its contiguous runs do as range compares (`RANGE_COST` each).
+        """
+        groups: dict[tuple[int, bool, int | None], list[_frontend.node.ISingleEdge]] = {}
+        for e in self.ref.edges:
+            groups.setdefault((id(e.node.ref), e.noAdvance, e.value), []).append(e)
+
+        lowered = []
+        for edges in groups.values():
+            ranges = keyRanges([e.key for e in edges])
+            if len(ranges) > MAX_RANGES:
+                continue
+            if len(edges) * CASE_COST > len(ranges) * RANGE_COST:
+                lowered.append((edges, ranges))
+        lowered.sort(key=lambda group: -len(group[0]))
+        return lowered
+
+    def digitRun(self):
+        """Returns the `Invoke` of an unsigned `mulAdd` if every edge with a
+        value leads to it and it comes back here, e.g.
+        `n.select(DIGITS, p.invoke(p.code.mulAdd(...), {1: error}, n))`"""
+        edges = [e for e in self.ref.edges if e.value is not None]
+        if not edges:
+            return None
+
+        invoke = edges[0].node.ref
+        if not isinstance(invoke, _frontend.node.Invoke):
+            return None
+        code = invoke.code.ref
+        if not isinstance(code, _frontend.code.MulAdd) or code.options.signed:
+            return None
+        if not invoke.otherwise or invoke.otherwise.node.ref is not self.ref:
+            return None
+        if not invoke.otherwise.noAdvance:
+            return None
+        # `mulAdd` only ever returns 0 or 1
+        codes = {edge.code for edge in invoke.edges()}
+        if codes != {1}:
+            return None
+
+        for e in edges:
+            if e.node.ref is not invoke or e.noAdvance or not 0 <= e.value < 0xFF:
+                return None
+        return invoke
+
+    def buildDigitRun(self, out: list[str]) -> bool:
+        """Accumulates a whole run of digits in one loop instead of going
+        through the `mulAdd` state after every one of them. The field lives
+        in a local while the loop runs, overflows leave it and `p` exactly
+        as the state by state path would."""
+        ctx = self.compilation
+        invoke = self.digitRun()
+        if invoke is None:
+            return False
+
+        code = invoke.code.ref
+        options = code.options
+        ty = ctx.getFieldType(code.field)
+        if ty not in UNSIGNED_LIMITS:
+            return False
+        _, _max = UNSIGNED_LIMITS[ty]
+        field = ctx.stateField(code.field)
+        overflow = invoke.edges()[0].node
+
+        digits = {e.key: e.value for e in self.ref.edges if e.value is not None}
+        first = min(digits)
+        transform = ctx.unwrapTransform(self.ref.transform)
+        current = transform.build(ctx, f"*{ctx.posArg()}")
+        if all(digits.get(first + i) == i for i in range(len(digits))):
+            lookup = f"(unsigned int) {current} - {first}"
+            bound = len(digits) - 1
+        else:
+            table = bytearray([0xFF] * (MAX_CHAR + 1))
+            for key, value in digits.items():
+                table[key] = value
+            lookup = f"{ctx.blob(bytes(table))}[(uint8_t) {current}]"
+            bound = 0xFE
+
+        def fail(stored: str) -> list[str]:
+            tmp = [f"{field} = {stored};", f"{ctx.matchVar()} = digit;"]
+            self.tailTo(tmp, overflow, False, None)
+            return tmp
+
+        out.append("#ifndef LLPARSE_NO_DIGIT_RUN")
+        out.append("{")
+        out.append(f"  uint{FIELD_BITS[ty]}_t value;")
+        out.append("  unsigned int digit;")
+        out.append("")
+        out.append(f"  value = {field};")
+        out.append("  for (;;) {")
+        out.append(f"    digit = {lookup};")
+        out.append(f"    if (digit > {bound}) " + "{")
+        out.append("      break;")
+        out.append("    }")
+        out.append(f"    if (value > {_max} / {options.base}) " + "{")
+        ctx.indent(out, fail("value"), "      ")
+        out.append("    }")
+        out.append(f"    if (value * {options.base} > {_max} - digit) " + "{")
+        ctx.indent(out, fail(f"value * {options.base}"), "      ")
+        out.append("    }")
+        out.append(f"    value = value * {options.base} + digit;")
+        if options.max:
+            out.append(f"    if (value > {options.max}) " + "{")
+            ctx.indent(out, fail("value"), "      ")
+            out.append("    }")
+        out.append(f"    if (++{ctx.posArg()} == {ctx.endPosArg()}) " + "{")
+        out.append(f"      {field} = value;")
+        tmp: list[str] = []
+        self.pause(tmp)
+        ctx.indent(out, tmp, "      ")
+        out.append("    }")
+        out.append("  }")
+        out.append(f"  {field} = value;")
+        out.append("}")
+        out.append("#endif  /* LLPARSE_NO_DIGIT_RUN */")
+        return True
+
     def doBuild(self, out: list[str]):
         ctx = self.compilation
         otherwise = self.ref.otherwise
         assert otherwise
 
+        lowered = self.lowerRanges()
+        lowered_ids = {id(e) for group, _ in lowered for e in group}
+        if lowered:
+            out.append("unsigned char current;")
+            out.append("")
+
         self.prologue(out)
+        self.buildDigitRun(out)
+
+        if not self.ref.transform or self.ref.transform.ref.name == "id":
+            self.buildSWAR(
+                out,
+                [
+                    e.key
+                    for e in self.ref.edges
+                    if e.node.ref is self.ref and not e.noAdvance and e.value is None
+                ],
+            )
+
         transform = ctx.unwrapTransform(self.ref.transform)
         current = transform.build(ctx, f"*{ctx.posArg()}")
+        if lowered:
+            out.append(f"current = {current};")
+            current = "current"
+            for group, ranges in lowered:
+                e = group[0]
+                checks = " || ".join(rangeCheck(current, lo, hi) for lo, hi in ranges)
+                out.append(f"if ({checks}) " + "{")
+                tmp = []
+                self.tailTo(tmp, e.node, e.noAdvance, e.value)
+                ctx.indent(out, tmp, "  ")
+                out.append("}")
+
+        edges = [e for e in self.ref.edges if id(e) not in lowered_ids]
+        if not edges:
+            self.tailTo(out, otherwise.node, otherwise.noAdvance, None)
+            return
+
         out.append(f"switch ({current})" + "{")
 
-        for e in self.ref.edges:
+        for e in edges:
             if e.key < 0x20 or e.key > 0x7E or e.key == 0x27 or e.key == 0x5C:
                 ch = e.key
             else:
@@ -670,7 +1108,9 @@ class SpanEnd(Node):
         # Invoke callback
         callback = ctx.buildCode(ctx.unwrapCode(self.ref.callback))
 
+        ctx.storeFields(out)
         out.append(f"err = {callback}({ctx.stateArg()}, start, {ctx.posArg()});")
+        ctx.loadFields(out)
 
         out.append("if (err != 0) {")
         tmp = []
@@ -696,15 +1136,10 @@ class SpanEnd(Node):
 
         out.append(f"{ctx.errorPosField()} = (const char*) {resumePos};")
 
-        rt = ctx.unwrapNode(otherwise.node)
-        # check if the resumption target has already been built or not...
-        resumptionTarget = rt.build(ctx)
+        resumptionTarget = ctx.reserveState(ctx.unwrapNode(otherwise.node))
 
-        out.append(
-            f"{ctx.currentField()} = "
-            + f"(void*) (intptr_t) {STATE_PREFIX + resumptionTarget if not resumptionTarget.startswith(STATE_PREFIX) else resumptionTarget};"
-        )
-        out.append(f"return {STATE_ERROR};")
+        out.append(f"{ctx.currentField()} = {ctx.resumeAddress(resumptionTarget)};")
+        ctx.returnError(out)
 
 
 # Based off arthurschreiber's work with Indutny's Tips and requests added to the mix.
@@ -715,6 +1150,9 @@ class SpanEnd(Node):
 # 0x1000000 U24
 
 
+FIELD_BITS = {"i8": 8, "i16": 16, "i32": 32, "i64": 64}
+
+
 class Int(Node):
     __slots__ = ("offset", "priv_compilation", "cachedDecel")
 
@@ -729,146 +1167,87 @@ class Int(Node):
     def pair(self):
         return self.compilation, self.compilation.stateField(self.ref.field)
 
-    def readInt8(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        out.append(f"{index} = ((*{ctx.posArg()}) & 0x80);")
-
-    def readUInt8(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        out.append(f"{index} = (*{ctx.posArg()});")
-
-    # LITTLE ENDIAN
-
-    def readInt16LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            # Since BE Belongs to performing << aka left shifts we do >> right shifts
-            out.append(f"{index} = ({index} >> 8) | ((*{ctx.posArg()}) & 0x80);")
-
-    def readUInt16LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} >> 8) | (*{ctx.posArg()});")
-
-    def readInt24LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        elif self.offset == 1:
-            out.append(f"{index} = ({index} >> 8) | (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} >> 8) | ((*{ctx.posArg()}) & 0x80);")
-
-    def readUInt24LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} >> 8) | (*{ctx.posArg()});")
-
-    def readInt32LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        elif self.offset in (1, 2):
-            out.append(f"{index} = ({index} >> 8) | (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} >> 8) | ((*{ctx.posArg()}) & 0x80);")
-
-    def readUInt32LE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} >> 8) | (*{ctx.posArg()});")
-
-    # BIG ENDIAN
-
-    def readInt16BE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            # Since LE Belongs to >> we do "<<" instead
-            out.append(f"{index} = ({index} << 8) | ((*{ctx.posArg()}) & 0x80);")
+    def shifted(self, byte: str, shift: int) -> str:
+        """`byte` moved `shift` bits up, widened first so that the shift
+        can't overflow an `int`"""
+        if shift == 0:
+            return byte
+        width = 64 if shift >= 32 else 32
+        return f"((uint{width}_t) {byte} << {shift})"
 
-    def readUInt16BE(self, out: list[str]) -> None:
+    def readByte(self, out: list[str]) -> None:
+        """Adds the byte at `p` to the bytes that previous states have read"""
         ctx, index = self.pair
         if self.offset == 0:
             out.append(f"{index} = (*{ctx.posArg()});")
+        elif self.ref.littleEndian:
+            out.append(f"{index} |= {self.shifted(f'(*{ctx.posArg()})', self.offset * 8)};")
         else:
             out.append(f"{index} = ({index} << 8) | (*{ctx.posArg()});")
 
-    def readInt24BE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        elif self.offset == 1:
-            out.append(f"{index} = ({index} << 8) | (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} << 8) | ((*{ctx.posArg()}) & 0x80);")
+        if self.offset == self.ref.bits - 1:
+            self.signExtend(out)
 
-    def readUInt24BE(self, out: list[str]) -> None:
+    def readAll(self, out: list[str]) -> None:
+        """Reads every byte at once, compilers turn this into a single load
+        (and a byte swap where the endianness differs)"""
         ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} << 8) | (*{ctx.posArg()});")
-
-    def readInt32BE(self, out: list[str]) -> None:
+        bits = self.ref.bits
+        terms: list[str] = []
+        for i in range(bits):
+            shift = i * 8 if self.ref.littleEndian else (bits - 1 - i) * 8
+            terms.append(self.shifted(f"{ctx.posArg()}[{i}]", shift))
+        out.append(f"{index} = {' | '.join(terms)};")
+        self.signExtend(out)
+
+    def signExtend(self, out: list[str]) -> None:
         ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        elif self.offset in (1, 2):
-            out.append(f"{index} = ({index} << 8) | (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} << 8) | ((*{ctx.posArg()}) & 0x80);")
+        bits = self.ref.bits * 8
+        if not self.ref.signed or bits >= FIELD_BITS[ctx.getFieldType(self.ref.field)]:
+            return
+        sign = f"0x{1 << (bits - 1):x}{'ULL' if bits > 32 else 'U'}"
+        out.append(f"{index} = ({index} ^ {sign}) - {sign};")
 
-    def readUInt32BE(self, out: list[str]) -> None:
-        ctx, index = self.pair
-        if self.offset == 0:
-            out.append(f"{index} = (*{ctx.posArg()});")
-        else:
-            out.append(f"{index} = ({index} << 8) | (*{ctx.posArg()});")
+    def last(self) -> _frontend.node.Int:
+        """The state that reads the final byte of this integer"""
+        ref = self.ref
+        while ref.byteOffset != ref.bits - 1:
+            ref = ref.otherwise.node.ref
+        return ref
 
     def doBuild(self, out: list[str]):
+        ctx = self.compilation
         self.prologue(out)
-        # I'm still supporting 3.9 but I plan to drop it's support in favor of match case soon...
-        bits = self.ref.bits
 
-        if self.compilation.getFieldType(self.ref.field) == "ptr":
+        if ctx.getFieldType(self.ref.field) == "ptr":
             raise ValueError(
                 f'property {self.ref.field} should not use pointers but it was given "ptr"'
             )
+        if not 1 <= self.ref.bits <= 8:
+            raise ValueError(
+                f"can't read {self.ref.bits} bytes into {self.ref.field}, at most 8 fit"
+            )
 
-        if bits == 1:
-            self.readInt8(out) if self.ref.signed else self.readUInt8(out)
-        elif bits == 2:
-            if self.ref.littleEndian:
-                self.readInt16LE(out) if self.ref.signed else self.readUInt16LE(out)
-            else:
-                self.readInt16BE(out) if self.ref.signed else self.readUInt16BE(out)
-        elif bits == 3:
-            if self.ref.littleEndian:
-                self.readInt24LE(out) if self.ref.signed else self.readUInt24LE(out)
-            else:
-                self.readInt24BE(out) if self.ref.signed else self.readUInt24BE(out)
-        else:
-            if self.ref.littleEndian:
-                self.readInt32LE(out) if self.ref.signed else self.readUInt32LE(out)
-            else:
-                self.readInt32BE(out) if self.ref.signed else self.readUInt32BE(out)
-        # TODO: uint64 & int64
+        if self.offset == 0 and self.ref.bits > 1:
+            # The states after this one only run when the integer is split
+            # across two calls of `_execute`
+            out.append("#ifndef LLPARSE_NO_FUSED_INT")
+            out.append(f"if ({ctx.endPosArg()} - {ctx.posArg()} >= {self.ref.bits}) " + "{")
+            tmp: list[str] = []
+            self.readAll(tmp)
+            otherwise = self.last().otherwise
+            advance = self.ref.bits if not otherwise.noAdvance else self.ref.bits - 1
+            tmp.append(f"{ctx.posArg()} += {advance};")
+            self.tailTo(tmp, otherwise.node, True, None, moved=True)
+            ctx.indent(out, tmp, "  ")
+            out.append("}")
+            out.append("#endif  /* LLPARSE_NO_FUSED_INT */")
 
+        self.readByte(out)
         self.tailTo(out, self.ref.otherwise.node, self.ref.otherwise.noAdvance, None)
 
 
 MAX_CHAR = 0xFF
-TABLE_GROUP = 16
 
 # _mm_cmpestri takes 8 ranges
 SSE_RANGES_LEN = 16
@@ -883,6 +1262,8 @@ SSE_ALIGNMENT = 16
 class ITable:
     name: str
     declaration: list[str] = field(default_factory=list)
+    width: int = 8
+    """Bits per entry, tables with few edges pack several entries per byte"""
 
 
 class TableLookup(Node):
@@ -896,6 +1277,9 @@ class TableLookup(Node):
         table = self.buildTable()
         for line in table.declaration:
             out.append(line)
+        if table.width != 8:
+            out.append("unsigned char current;")
+            out.append("")
 
         self.prologue(out)
 
@@ -903,9 +1287,19 @@ class TableLookup(Node):
 
         self.buildSSE(out)
 
+        if not self.ref.transform or self.ref.transform.ref.name == "id":
+            keys: list[int] = []
+            for edge in self.ref.privEdges:
+                if edge.node.ref is self.ref and not edge.noAdvance:
+                    keys.extend(edge.keys)
+            self.buildSWAR(out, keys)
+
         current = transform.build(ctx, f"*{ctx.posArg()}")
+        if table.width != 8:
+            out.append(f"current = {current};")
+            current = "current"
 
-        out.append(f"switch ({table.name}[(uint8_t) {current}]) " + "{")
+        out.append(f"switch ({self.buildLookup(table, current)}) " + "{")
         tmp = []
         for index, edge in enumerate(self.ref.privEdges):
             out.append(f"  case {index + 1}: " + "{")
@@ -924,6 +1318,7 @@ class TableLookup(Node):
     def buildSSE(self, out: list[str]):
         ctx = self.compilation
 
+        # Transformation is not supported atm
         if self.ref.transform and self.ref.transform.ref.name != "id":
             return False
 
@@ -932,7 +1327,7 @@ class TableLookup(Node):
 
         edge = self.ref.privEdges[0]
 
-        if edge.node.ref != self.ref:
+        if edge.node.ref is not self.ref:
             return False
 
         ranges: list[int] = []
@@ -940,10 +1335,10 @@ class TableLookup(Node):
         first: int | None = None
         last: int | None = None
 
-        for key in edge.keys:
-            if not first:
+        for key in sorted(edge.keys):
+            if first is None:
                 first = key
-            if not last:
+            if last is None:
                 last = key
 
             if key - last > 1:
@@ -951,18 +1346,20 @@ class TableLookup(Node):
                 first = key
             last = key
 
-        if first and last:
+        if first is not None and last is not None:
             ranges.extend([first, last])
 
-        # Reduce Call load...
-        if ranges > MAX_SSE_CALLS * SSE_RANGES_LEN:
+        if not ranges:
+            return False
+
+        # Way too many calls, or pointless (and probably broken in SSE4.2)
+        if len(ranges) > MAX_SSE_CALLS * SSE_RANGES_LEN:
             return False
 
         out.append("#ifdef __SSE4_2__")
-        out.append(f"if ({ctx.endPosArg()}) - {ctx.posArg()} >= 16)" + "{")
+        out.append(f"if ({ctx.endPosArg()} - {ctx.posArg()} >= 16) " + "{")
         out.append("  __m128i ranges;")
         out.append("  __m128i input;")
-        out.append("  int avail;")
         out.append("  int match_len;")
         out.append("")
         out.append("  /* Load input */")
@@ -976,29 +1373,30 @@ class TableLookup(Node):
 
             blob = ctx.blob(bytes(paddedRanges), SSE_ALIGNMENT)
 
-            out.append(f"  ranges = _mm_loadu_si128((__128i const*) {blob});")
-            out.append("  /* Find first character that does not match 'ranges' */")
-            out.append(f"  match_len = _mm_cmpestri(ranges, {len(subRanges)})")
-            out.append("    input, 16,")
-            out.append("    _SIDDUBYTE_OPS | _SIDD_CMP_RANGES |")
-            out.append("      _SIDD_NEGATIVE_POLARITY);")
+            out.append(f"  ranges = _mm_loadu_si128((__m128i const*) {blob});")
+            out.append("")
+            out.append("  /* Find first character that does not match `ranges` */")
+            out.append(f"  match_len = _mm_cmpestri(ranges, {len(subRanges)},")
+            out.append("      input, 16,")
+            out.append("      _SIDD_UBYTE_OPS | _SIDD_CMP_RANGES |")
+            out.append("        _SIDD_NEGATIVE_POLARITY);")
             out.append("")
             out.append("  if (match_len != 0) {")
             out.append(f"    {ctx.posArg()} += match_len;")
 
             tmp: list[str] = []
             assert not edge.noAdvance
-            self.tailTo(tmp, edge.node, True, None)
+            self.tailTo(tmp, edge.node, True, moved=True)
             ctx.indent(out, tmp, "    ")
             out.append("  }")
 
         tmp: list[str] = []
 
         assert self.ref.otherwise
-        self.tailTo(tmp, self.ref.otherwise)
+        self.tailTo(tmp, **self.ref.otherwise.__dict__)
         ctx.indent(out, tmp, "  ")
         out.append("}")
-        out.append("#endif /* __SSE4_2__ */")
+        out.append("#endif  /* __SSE4_2__ */")
 
         return True
 
@@ -1010,19 +1408,34 @@ class TableLookup(Node):
                 assert table[key] == 0
                 table[key] = index
 
-        lines = ["static uint8_t lookup_table[] = {"]
+        # The frontend keeps the number of edges below `1 << maxTableElemWidth`,
+        # pick the narrowest of 1, 2, 4 or 8 bits that fits every index so
+        # that a single edge becomes a 32 byte bitmap
+        width = 1
+        while (1 << width) <= len(self.ref.privEdges):
+            width *= 2
+
+        perByte = 8 // width
+        packed = bytearray((MAX_CHAR + 1) // perByte)
+        for key, index in enumerate(table):
+            packed[key // perByte] |= index << ((key % perByte) * width)
 
-        for i in range(0, len(table), TABLE_GROUP):
-            # Turn all into string...
-            ntable = ", ".join(map(lambda x: "%i" % x, table[i : i + TABLE_GROUP]))
-            line = f"  {ntable}"
-            if i + TABLE_GROUP < len(table):
-                line += ","
-            lines.append(line)
+        # Identical tables end up in the same blob and are shared by every
+        # state that uses them
+        return ITable(name=self.compilation.blob(bytes(packed)), width=width)
 
-        lines.append("};")
+    def buildLookup(self, table: ITable, current: str) -> str:
+        """Returns the edge index of the (already transformed) byte `current`"""
+        if table.width == 8:
+            return f"{table.name}[(uint8_t) {current}]"
 
-        return ITable(name="lookup_table", declaration=lines)
+        perByte = 8 // table.width
+        shift = perByte.bit_length() - 1
+        mask = (1 << table.width) - 1
+        offset = f"({current} & {perByte - 1})"
+        if table.width != 1:
+            offset = f"{offset} * {table.width}"
+        return f"(({table.name}[(uint8_t) {current} >> {shift}] >> ({offset})) & {mask})"
 
 
 BLOB_GROUP_SIZE = 11
@@ -1032,6 +1445,10 @@ BLOB_GROUP_SIZE = 11
 class ICompilerOptions:
     debug: str | None = None
     header: str | None = None
+    computedGoto: bool = False
+    """Resume through label addresses stored in `_current` on GCC and Clang"""
+    cacheFields: bool = False
+    """Keep the integer fields that the parser works on in locals of `_run`"""
 
 
 @dataclass(slots=True)
@@ -1052,7 +1469,11 @@ class Compilation:
         "NodeContainer",
         "state_dict",
         "blobs",
-        "matchSequence"
+        "matchSequence",
+        "pendingStates",
+        "deferredStates",
+        "input",
+        "cachedFields",
     )
 
     def __init__(
@@ -1078,6 +1499,15 @@ class Compilation:
 
         self.matchSequence: dict[str, MatchSequence] = {}
 
+        # Targets reserved by the state currently being built
+        self.pendingStates: list[Node] = []
+        # Resumption targets that are only ever reached after a pause
+        self.deferredStates: deque[Node] = deque()
+        # Which jumps may skip the `p == endp` check, see `analyzeInput`
+        self.input: InputAvailability | None = None
+        # Fields kept in locals of `_run` and their C types, see `cacheFields`
+        self.cachedFields: dict[str, str] = {}
+
         for node in resumptionsTargets:
             self.resumption_targets.add(STATE_PREFIX + node.ref.id.name)
 
@@ -1205,6 +1635,61 @@ class Compilation:
             out.append("  UNREACHABLE;")
             out.append("}")
 
+    def analyzeInput(self, root: WrappedNode):
+        """Lets states entered with a byte of input skip their `p == endp`
+        check. Debug builds keep it so that every state still reports."""
+        if self.options.debug:
+            return
+        self.input = InputAvailability(root)
+
+    def skipsCheck(
+        self, source: _frontend.node.Node, noAdvance: bool, target: _frontend.node.Node
+    ) -> bool:
+        """Whether a jump from `source` may enter `target` past its check"""
+        if self.input is None:
+            return False
+        return self.input.carries(source, noAdvance) and self.input.enteredWithInput(
+            target
+        )
+
+    def reserveState(self, node: Node) -> str:
+        """Returns the state name of `node` and queues it to be built"""
+        self.pendingStates.append(node)
+        return node.stateName
+
+    def deferState(self, node: Node) -> str:
+        """Like `reserveState` but the state is only built after everything
+        else, if nothing else has built it by then"""
+        self.deferredStates.append(node)
+        return node.stateName
+
+    def startState(self, node: Node):
+        self.pendingStates = []
+        lines = node.start(self)
+        return lines, iter(self.pendingStates)
+
+    def buildStates(self, root: Node) -> str:
+        """Builds `root` and every state reachable from it with an explicit
+        worklist. States are visited depth-first in the order their targets
+        were reserved and added once all of their targets are done, this keeps
+        the output the same as building them recursively would."""
+        stack = [(root, *self.startState(root))]
+        while stack:
+            node, lines, targets = stack[-1]
+            for target in targets:
+                if not target.cachedDecel:
+                    stack.append((target, *self.startState(target)))
+                    break
+            else:
+                stack.pop()
+                self.addState(node.cachedDecel, lines)
+
+            while not stack and self.deferredStates:
+                target = self.deferredStates.popleft()
+                if not target.cachedDecel:
+                    stack.append((target, *self.startState(target)))
+        return root.cachedDecel
+
     def addState(self, state: str, lines: list[str]):
         assert not self.state_dict.get(state)
         self.state_dict[state] = lines
@@ -1338,6 +1823,12 @@ class Compilation:
             self.matchSequence[wrap.ref.name] = res
         return res.getName()
 
+    def getCompareSequence(
+        self, transform: IWrap[_frontend.transform.Transform]
+    ) -> str:
+        self.getMatchSequence(transform)
+        return self.matchSequence[transform.ref.name].getCompareName()
+
     def stateArg(self) -> str:
         return ARG_STATE
 
@@ -1356,6 +1847,20 @@ class Compilation:
     def currentField(self) -> str:
         return self.stateField("_current")
 
+    def returnError(self, out: list[str]):
+        self.storeFields(out)
+        if self.options.computedGoto:
+            # `_run` returns what `_execute` does
+            out.append(f"return {self.errorField()};")
+        else:
+            out.append(f"return {STATE_ERROR};")
+
+    def resumeAddress(self, state: str) -> str:
+        """What `_current` holds to resume at `state`"""
+        if self.options.computedGoto:
+            return f"LLPARSE_RESUME({state})"
+        return f"(void*) (intptr_t) {state}"
+
     def errorField(self) -> str:
         return self.stateField("error")
 
@@ -1372,8 +1877,43 @@ class Compilation:
         return self.stateField(f"_span_cb{index}")
 
     def stateField(self, name: str) -> str:
+        if name in self.cachedFields:
+            return f"{FIELD_PREFIX}{name}"
         return f"{self.stateArg()}->{name}"
 
+    def cacheFields(self, root: WrappedNode):
+        """Picks the integer fields that invokes, `Int` and `Consume` nodes
+        work on to be kept in locals of `_run`"""
+        if not self.options.cacheFields or self.options.debug:
+            return
+
+        types = {prop.name: prop.ty for prop in self.properties}
+        used: list[str] = []
+        for node in [root, *Enumerator.getAllNodes(root)]:
+            ref = node.ref
+            if isinstance(ref, _frontend.node.Invoke):
+                if isinstance(ref.code.ref, _frontend.code.Field):
+                    used.append(ref.code.ref.field)
+            elif isinstance(ref, (_frontend.node.Int, _frontend.node.Consume)):
+                used.append(ref.field)
+
+        for name in sorted(set(used)):
+            if types.get(name) in FIELD_BITS:
+                self.cachedFields[name] = f"uint{FIELD_BITS[types[name]]}_t"
+
+    def declareFields(self, out: list[str]):
+        for name, ty in self.cachedFields.items():
+            out.append(f"{ty} {FIELD_PREFIX}{name} = {self.stateArg()}->{name};")
+
+    def loadFields(self, out: list[str]):
+        for name in self.cachedFields:
+            out.append(f"{FIELD_PREFIX}{name} = {self.stateArg()}->{name};")
+
+    def storeFields(self, out: list[str]):
+        """Writes the cached fields back before `state` is seen outside"""
+        for name in self.cachedFields:
+            out.append(f"{self.stateArg()}->{name} = {FIELD_PREFIX}{name};")
+
     # Globals
 
     def cstring(self, value: str) -> str:
@@ -1,7 +1,12 @@
 CONTAINER_KEY = "c"
 LABEL_PREFIX = ""
 STATE_PREFIX = "s_n_"
+# Labels past the `p == endp` check of states entered with input
+INPUT_PREFIX = "s_i_"
+# Locals of `_run` holding cached fields
+FIELD_PREFIX = "field_"
 STATE_ERROR = "s_error"
+LABEL_SUSPEND = "llparse_suspend"
 BLOB_PREFIX = "llparse_blob"
 ARG_STATE = "state"
 ARG_POS = "p"
@@ -1,20 +1,7 @@
-from .pybuilder import Node
+from .pybuilder import GraphIndex, Node
 
 
 class Debugger:
     @staticmethod
     def getAllNodes(root: Node):
-        nodes: set[Node] = set()
-        queue: list[Node] = [root]
-
-        while queue:
-            node = queue.pop()
-            if edges := node.getEdges():
-                for slot in edges:
-                    if slot.node in nodes:
-                        continue
-
-                    nodes.add(slot.node)
-                    queue.append(slot.node)
-
-        return list(nodes)
+        return GraphIndex(root).nodes
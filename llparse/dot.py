@@ -1,5 +1,6 @@
 from pathlib import Path
 
+from .pybuilder.graph import GraphIndex
 from .pybuilder.main_code import Edge, Node
 
 # TODO: Fix all graphs and more It's currently broken...
@@ -32,24 +33,7 @@ class Dot:
         return res
 
     def enumerateNodes(self, root: Node):
-        queue = [root]
-        seen: set[Node] = set()
-
-        while queue:
-            node = queue.pop()
-            if node in seen:
-                continue
-
-            seen.add(node)
-
-            for edge in node:
-                queue.append(edge.node)
-
-            otherwise = node.getOtherwiseEdge()
-            if otherwise:
-                queue.append(otherwise.node)
-
-        return seen
+        return GraphIndex(root).nodes
 
     def buildNode(self, node: Node):
         res: str = ""
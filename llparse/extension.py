@@ -0,0 +1,518 @@
+"""
+Generates a CPython extension module around a parser. Instead of calling
+back into python for every span, match and value callback, the module
+records them into a native buffer of events while `execute` runs and hands
+the whole batch to python once it returns:
+
+```python
+module = p.extension("http").load(method)
+parser = module.Parser()
+parser.execute(b"GET /index.html HTTP/1.1\\r\\n\\r\\n")
+for event, start, end, value in parser.events():
+    ...
+```
+
+Every event is four `int32_t`s: the id of the callback (see
+`ExtensionResult.events`, also `module.EVENTS`), the offsets of the span or
+of the invoke in the buffer given to `execute` and the value of value
+callbacks. Parsers also export their events through the buffer protocol as
+an `(n, 4)` array so `memoryview(parser)` or `numpy.asarray(parser)` read them
+without copying.
+
+The error codes of the parser's pauses are in `module.PAUSES`. Recorded
+callbacks always return 0, so a parser built for the extension
+should not rely on its callbacks to fail.
+"""
+
+from __future__ import annotations
+
+import importlib.machinery
+import importlib.util
+import sys
+import sysconfig
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+from ._tempita import Template
+
+if TYPE_CHECKING:
+    from .llparse import CompilerResult, LLParse
+    from .pybuilder import main_code as builder
+
+# Records the buffer starts with, it doubles whenever it runs out
+DEFAULT_CAPACITY = 64
+
+MEMBER_TYPES = {
+    "uint8_t": "T_UBYTE",
+    "uint16_t": "T_USHORT",
+    "uint32_t": "T_UINT",
+    "uint64_t": "T_ULONGLONG",
+}
+
+EXTENSION_C = Template("""/* CPython extension module {{module}} around the parser {{prefix}} */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <structmember.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "{{prefix}}.h"
+
+typedef struct {
+  int32_t event;
+  int32_t start;
+  int32_t end;
+  int32_t value;
+} {{module}}_event_t;
+
+typedef struct {
+  PyObject_HEAD
+  {{prefix}}_t state;
+  {{module}}_event_t* events;
+  Py_ssize_t length;
+  Py_ssize_t capacity;
+  /* Views of the events that are still alive, the buffer can't move while
+   * there are any */
+  Py_ssize_t exports;
+  Py_ssize_t shape[2];
+  Py_ssize_t error_offset;
+  const char* data;
+  int nomem;
+} {{module}}_parser_t;
+
+#define {{upper}}_PARSER(s)                                                   \\
+  (({{module}}_parser_t*) ((char*) (s) - offsetof({{module}}_parser_t, state)))
+
+static int {{module}}__push({{prefix}}_t* s, int32_t event,
+                            const unsigned char* p, const unsigned char* endp,
+                            int32_t value) {
+  {{module}}_parser_t* self = {{upper}}_PARSER(s);
+  {{module}}_event_t* e;
+
+  if (self->length == self->capacity) {
+    e = realloc(self->events, 2 * self->capacity * sizeof(*e));
+    if (e == NULL) {
+      self->nomem = 1;
+      return -1;
+    }
+    self->events = e;
+    self->capacity *= 2;
+  }
+
+  e = &self->events[self->length++];
+  e->event = event;
+  e->start = (int32_t) ((const char*) p - self->data);
+  e->end = (int32_t) ((const char*) endp - self->data);
+  e->value = value;
+  return 0;
+}
+
+/* Spans */
+{{for name, id in spans}}
+int {{name}}({{prefix}}_t* s, const unsigned char* p,
+    const unsigned char* endp) {
+  return {{module}}__push(s, {{id}}, p, endp, 0);
+}
+{{endfor}}
+
+/* Matches */
+{{for name, id in matches}}
+int {{name}}({{prefix}}_t* s, const unsigned char* p,
+    const unsigned char* endp) {
+  return {{module}}__push(s, {{id}}, p, p, 0);
+}
+{{endfor}}
+
+/* Values */
+{{for name, id in values}}
+int {{name}}({{prefix}}_t* s, const unsigned char* p,
+    const unsigned char* endp, int value) {
+  return {{module}}__push(s, {{id}}, p, p, value);
+}
+{{endfor}}
+
+static PyObject* {{module}}_new(PyTypeObject* type, PyObject* args,
+                                PyObject* kwds) {
+  static char* keywords[] = {"capacity", NULL};
+  Py_ssize_t capacity = {{capacity}};
+  {{module}}_parser_t* self;
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|n:Parser", keywords,
+                                   &capacity)) {
+    return NULL;
+  }
+  if (capacity < 1) {
+    PyErr_SetString(PyExc_ValueError, "capacity must be at least 1");
+    return NULL;
+  }
+
+  self = ({{module}}_parser_t*) type->tp_alloc(type, 0);
+  if (self == NULL) {
+    return NULL;
+  }
+  self->events = malloc(capacity * sizeof(*self->events));
+  if (self->events == NULL) {
+    Py_DECREF(self);
+    return PyErr_NoMemory();
+  }
+  self->capacity = capacity;
+  self->error_offset = -1;
+  {{prefix}}_init(&self->state);
+  return (PyObject*) self;
+}
+
+static void {{module}}_dealloc({{module}}_parser_t* self) {
+  free(self->events);
+  Py_TYPE(self)->tp_free((PyObject*) self);
+}
+
+static int {{module}}__exported({{module}}_parser_t* self) {
+  if (self->exports == 0) {
+    return 0;
+  }
+  PyErr_SetString(PyExc_BufferError,
+                  "Existing exports of the events prevent running the parser");
+  return 1;
+}
+
+static PyObject* {{module}}_init({{module}}_parser_t* self,
+                                 PyObject* Py_UNUSED(ignored)) {
+  if ({{module}}__exported(self)) {
+    return NULL;
+  }
+  {{prefix}}_init(&self->state);
+  self->length = 0;
+  self->error_offset = -1;
+  Py_RETURN_NONE;
+}
+
+static PyObject* {{module}}_execute({{module}}_parser_t* self, PyObject* data) {
+  Py_buffer view;
+  int err;
+
+  if ({{module}}__exported(self)) {
+    return NULL;
+  }
+  if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) < 0) {
+    return NULL;
+  }
+  if (view.len > INT32_MAX) {
+    PyBuffer_Release(&view);
+    PyErr_SetString(PyExc_OverflowError, "data is too large for the events");
+    return NULL;
+  }
+
+  self->length = 0;
+  self->nomem = 0;
+  self->data = (const char*) view.buf;
+  err = {{prefix}}_execute(&self->state, self->data, self->data + view.len);
+  self->error_offset = err != 0 && self->state.error_pos != NULL
+                           ? self->state.error_pos - self->data
+                           : -1;
+  self->data = NULL;
+  PyBuffer_Release(&view);
+
+  if (self->nomem) {
+    return PyErr_NoMemory();
+  }
+  return PyLong_FromLong(err);
+}
+
+static PyObject* {{module}}_resume({{module}}_parser_t* self,
+                                   PyObject* Py_UNUSED(ignored)) {
+  self->state.error = 0;
+  Py_RETURN_NONE;
+}
+
+static PyObject* {{module}}_events({{module}}_parser_t* self,
+                                   PyObject* Py_UNUSED(ignored)) {
+  PyObject* list;
+  Py_ssize_t i;
+
+  list = PyList_New(self->length);
+  if (list == NULL) {
+    return NULL;
+  }
+  for (i = 0; i < self->length; i++) {
+    {{module}}_event_t* e = &self->events[i];
+    PyObject* item = Py_BuildValue("(iiii)", e->event, e->start, e->end,
+                                   e->value);
+    if (item == NULL) {
+      Py_DECREF(list);
+      return NULL;
+    }
+    PyList_SET_ITEM(list, i, item);
+  }
+  return list;
+}
+
+static int {{module}}_getbuffer({{module}}_parser_t* self, Py_buffer* view,
+                                int flags) {
+  static Py_ssize_t strides[2] = {sizeof({{module}}_event_t), sizeof(int32_t)};
+
+  if ((flags & PyBUF_WRITABLE) == PyBUF_WRITABLE) {
+    PyErr_SetString(PyExc_BufferError, "The events are read-only");
+    view->obj = NULL;
+    return -1;
+  }
+
+  self->shape[0] = self->length;
+  self->shape[1] = 4;
+  view->obj = (PyObject*) self;
+  Py_INCREF(self);
+  view->buf = self->events;
+  view->len = self->length * sizeof({{module}}_event_t);
+  view->readonly = 1;
+  view->itemsize = sizeof(int32_t);
+  view->format = (flags & PyBUF_FORMAT) == PyBUF_FORMAT ? "i" : NULL;
+  view->ndim = 2;
+  view->shape = (flags & PyBUF_ND) == PyBUF_ND ? self->shape : NULL;
+  view->strides = (flags & PyBUF_STRIDES) == PyBUF_STRIDES ? strides : NULL;
+  view->suboffsets = NULL;
+  view->internal = NULL;
+  self->exports++;
+  return 0;
+}
+
+static void {{module}}_releasebuffer({{module}}_parser_t* self,
+                                     Py_buffer* view) {
+  self->exports--;
+}
+
+static PyObject* {{module}}_get_reason({{module}}_parser_t* self,
+                                       void* Py_UNUSED(closure)) {
+  if (self->state.reason == NULL) {
+    Py_RETURN_NONE;
+  }
+  return PyUnicode_DecodeUTF8(self->state.reason, strlen(self->state.reason),
+                              "replace");
+}
+
+static PyObject* {{module}}_get_error_offset({{module}}_parser_t* self,
+                                             void* Py_UNUSED(closure)) {
+  if (self->error_offset < 0) {
+    Py_RETURN_NONE;
+  }
+  return PyLong_FromSsize_t(self->error_offset);
+}
+
+static PyMethodDef {{module}}_methods[] = {
+  {"init", (PyCFunction) {{module}}_init, METH_NOARGS,
+   "Resets the parser to its start"},
+  {"execute", (PyCFunction) {{module}}_execute, METH_O,
+   "Runs the parser over a bytes-like object, returns the error code and "
+   "keeps the events of the run"},
+  {"resume", (PyCFunction) {{module}}_resume, METH_NOARGS,
+   "Clears the error of a pause so that execute can go on"},
+  {"events", (PyCFunction) {{module}}_events, METH_NOARGS,
+   "The events of the last execute as (event, start, end, value) tuples"},
+  {NULL, NULL, 0, NULL}
+};
+
+static PyMemberDef {{module}}_members[] = {
+  {"error", T_INT, offsetof({{module}}_parser_t, state.error), READONLY,
+   NULL},
+{{for name, kind in properties}}
+  {"{{name}}", {{kind}}, offsetof({{module}}_parser_t, state.{{name}}), 0,
+   NULL},
+{{endfor}}
+  {NULL, 0, 0, 0, NULL}
+};
+
+static PyGetSetDef {{module}}_getset[] = {
+  {"reason", (getter) {{module}}_get_reason, NULL, NULL, NULL},
+  {"error_offset", (getter) {{module}}_get_error_offset, NULL,
+   "Where in the data of the last execute the parser stopped", NULL},
+  {NULL, NULL, NULL, NULL, NULL}
+};
+
+static PyBufferProcs {{module}}_as_buffer = {
+  (getbufferproc) {{module}}_getbuffer,
+  (releasebufferproc) {{module}}_releasebuffer,
+};
+
+static PyTypeObject {{module}}_type = {
+  PyVarObject_HEAD_INIT(NULL, 0)
+  .tp_name = "{{module}}.Parser",
+  .tp_basicsize = sizeof({{module}}_parser_t),
+  .tp_dealloc = (destructor) {{module}}_dealloc,
+  .tp_as_buffer = &{{module}}_as_buffer,
+  .tp_flags = Py_TPFLAGS_DEFAULT,
+  .tp_doc = "The {{prefix}} parser, records its callbacks as events",
+  .tp_methods = {{module}}_methods,
+  .tp_members = {{module}}_members,
+  .tp_getset = {{module}}_getset,
+  .tp_new = {{module}}_new,
+};
+
+static struct PyModuleDef {{module}}_module = {
+  PyModuleDef_HEAD_INIT,
+  .m_name = "{{module}}",
+  .m_size = -1,
+};
+
+PyMODINIT_FUNC PyInit_{{module}}(void) {
+  PyObject* module;
+  PyObject* events;
+  PyObject* pauses;
+  PyObject* value;
+
+  if (PyType_Ready(&{{module}}_type) < 0) {
+    return NULL;
+  }
+  module = PyModule_Create(&{{module}}_module);
+  if (module == NULL) {
+    return NULL;
+  }
+  Py_INCREF(&{{module}}_type);
+  if (PyModule_AddObject(module, "Parser", (PyObject*) &{{module}}_type) < 0) {
+    Py_DECREF(&{{module}}_type);
+    goto fail;
+  }
+
+  events = PyDict_New();
+  if (events == NULL || PyModule_AddObject(module, "EVENTS", events) < 0) {
+    Py_XDECREF(events);
+    goto fail;
+  }
+{{for name, id in events}}
+  value = PyLong_FromLong({{id}});
+  if (value == NULL || PyDict_SetItemString(events, "{{name}}", value) < 0) {
+    Py_XDECREF(value);
+    goto fail;
+  }
+  Py_DECREF(value);
+{{endfor}}
+
+  /* Frozen sets can only be filled while nothing else refers to them */
+  pauses = PyFrozenSet_New(NULL);
+  if (pauses == NULL) {
+    goto fail;
+  }
+{{for code in pauses}}
+  value = PyLong_FromLong({{code}});
+  if (value == NULL || PySet_Add(pauses, value) < 0) {
+    Py_XDECREF(value);
+    Py_DECREF(pauses);
+    goto fail;
+  }
+  Py_DECREF(value);
+{{endfor}}
+  if (PyModule_AddObject(module, "PAUSES", pauses) < 0) {
+    Py_DECREF(pauses);
+    goto fail;
+  }
+  return module;
+
+fail:
+  Py_DECREF(module);
+  return NULL;
+}
+""")
+
+
+@dataclass(slots=True)
+class ExtensionResult:
+    module: str
+    """Name of the extension module"""
+    prefix: str
+    """Prefix of the parser it wraps"""
+    parser: CompilerResult
+    """The parser itself"""
+    c: str
+    """Textual C source of the module, compiled together with `parser.c`"""
+    events: dict[str, int] = field(default_factory=dict)
+    """Id of the events recorded for each callback"""
+
+    def write(self, directory: Path | str) -> None:
+        """Writes the parser and the module's source to `directory`"""
+        directory = Path(directory)
+        self.parser.write(directory / f"{self.prefix}.c", directory / f"{self.prefix}.h")
+        (directory / f"{self.module}.c").write_text(self.c)
+
+    def load(
+        self,
+        cacheDir: Path | str | None = None,
+        cc: str | None = None,
+        cflags: list[str] | tuple[str, ...] = ("-O2",),
+    ) -> ModuleType:
+        """Compiles the module unless it is cached already and imports it, see `llparse.loader`"""
+        from .loader import defaultCacheDir, defaultCompiler, sharedObject
+
+        flags = ["-shared", "-fPIC", "-I", sysconfig.get_paths()["include"], *cflags]
+        if sys.platform == "darwin":
+            flags += ["-undefined", "dynamic_lookup"]
+
+        path, _ = sharedObject(
+            self.module,
+            {
+                f"{self.prefix}.c": self.parser.c,
+                f"{self.prefix}.h": self.parser.header,
+                f"{self.module}.c": self.c,
+            },
+            cc or defaultCompiler(),
+            flags,
+            Path(cacheDir) if cacheDir is not None else defaultCacheDir(),
+            sysconfig.get_config_var("EXT_SUFFIX"),
+        )
+
+        loader = importlib.machinery.ExtensionFileLoader(self.module, str(path))
+        spec = importlib.util.spec_from_file_location(self.module, path, loader=loader)
+        module = importlib.util.module_from_spec(spec)
+        loader.exec_module(module)
+        return module
+
+
+class ExtensionCompiler:
+    """Builds a parser together with a CPython extension module that batches
+    its callbacks into events"""
+
+    __slots__ = ("_module", "_llparse", "_capacity")
+
+    def __init__(self, module: str, llparse: LLParse, capacity: int = DEFAULT_CAPACITY) -> None:
+        if not module.isidentifier():
+            raise ValueError(f'"{module}" is not a valid module name')
+        self._module = module
+        self._llparse = llparse
+        self._capacity = capacity
+
+    def build(self, root: builder.Node, **options: Any) -> ExtensionResult:
+        """Builds `root` like `LLParse.build` does with `options` and generates the module around it"""
+        parser = self._llparse.build(root, **options)
+        prefix = self._llparse.prefix
+
+        events = {name: id for id, name in enumerate(parser.externals)}
+        # Everything after `_current` is a property of the parser
+        layout = parser.layout
+        properties = layout[layout.index(("void*", "_current")) + 1 :]
+
+        c = EXTENSION_C.substitute(
+            module=self._module,
+            prefix=prefix,
+            upper=self._module.upper(),
+            capacity=self._capacity,
+            events=list(events.items()),
+            pauses=parser.pauses,
+            spans=[(n, events[n]) for n, s in parser.externals.items() if s == "span"],
+            matches=[(n, events[n]) for n, s in parser.externals.items() if s == "match"],
+            values=[(n, events[n]) for n, s in parser.externals.items() if s == "value"],
+            properties=[
+                (name, MEMBER_TYPES[ty]) for ty, name in properties if ty in MEMBER_TYPES
+            ],
+        )
+        return ExtensionResult(self._module, prefix, parser, c, events)
+
+    def load(
+        self,
+        root: builder.Node,
+        cacheDir: Path | str | None = None,
+        cc: str | None = None,
+        cflags: list[str] | tuple[str, ...] = ("-O2",),
+        **options: Any,
+    ) -> ModuleType:
+        """Builds the module and imports it, see `ExtensionResult.load`"""
+        return self.build(root, **options).load(cacheDir, cc, cflags)
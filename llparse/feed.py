@@ -0,0 +1,80 @@
+"""
+Feeds files to loaded parsers through a memory map, one window at a time,
+without reading them into memory:
+
+```python
+error, offset = parseFile(parser, "capture.log", window=1 << 24)
+```
+
+Works with the parsers of `llparse.loader` and of `llparse.extension`
+alike. Pages of windows the parser is done with are handed back to the
+system so that memory use stays flat no matter how big the file is.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+# 16 MiB, big enough that the python side of each window doesn't matter
+DEFAULT_WINDOW = 1 << 24
+
+
+def windows(path: Path | str, window: int = DEFAULT_WINDOW) -> Iterator[tuple[int, memoryview]]:
+    """Maps the file at `path` and yields the offset and a view of every
+    `window` bytes of it in order. Views are released once the next window
+    is asked for, copy what has to outlive them"""
+    if window < 1:
+        raise ValueError("window must be at least 1 byte")
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Empty files can't be mapped
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = memoryview(mapped)
+            try:
+                for offset in range(0, size, window):
+                    view = data[offset : offset + window]
+                    try:
+                        yield offset, view
+                    finally:
+                        view.release()
+                    if hasattr(mapped, "madvise"):
+                        # Drops the pages that are done with, from the start
+                        # of their page as madvise wants
+                        start = offset - offset % mmap.PAGESIZE
+                        end = min(offset + window, size)
+                        mapped.madvise(mmap.MADV_DONTNEED, start, end - start)
+            finally:
+                data.release()
+
+
+def parseFile(
+    parser: Any,
+    path: Path | str,
+    window: int = DEFAULT_WINDOW,
+    onWindow: Callable[[Any, int, memoryview], None] | None = None,
+) -> tuple[int, int]:
+    """Runs `parser` over the file at `path` window by window.
+
+    :param parser: A `Parser` of a loaded library or of an extension module
+    :param window: How many bytes to hand to `parser.execute` at once
+    :param onWindow: Called as `onWindow(parser, offset, view)` after every
+        window the parser went through, e.g. to collect the events of an
+        extension parser. `view` is only valid during the call
+    :return: The error code of the parser, 0 if the whole file went through,
+        and the offset in the file where it stopped
+    """
+    for offset, view in windows(path, window):
+        err = parser.execute(view)
+        if err != 0:
+            return err, offset + (parser.error_offset or 0)
+        if onWindow is not None:
+            onWindow(parser, offset, view)
+    return 0, os.path.getsize(path)
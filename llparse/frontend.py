@@ -2,10 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from logging import getLogger
+from collections.abc import Generator
 from typing import Literal, TypeVar
 
 from .enumerator import Enumerator
-from .pybuilder import LoopChecker
+from .pybuilder import GraphIndex, LoopChecker
 from .pybuilder import builder as source
 
 # from pyfront.namespace import code, node , transform
@@ -14,6 +15,7 @@ from .pyfront.code import Identifier, IWrap, SpanField
 from .pyfront.implementation import IImplementation
 from .pyfront.nodes import ITableEdge
 from .pyfront.peephole import Peephole
+from .profiler import Profiler
 from .spanalloc import SpanAllocator
 from .trie import ITrieSingleChild, Trie, TrieEmpty, TrieNode, TrieSequence, TrieSingle
 
@@ -25,6 +27,7 @@ log = getLogger("llparse.frontend")
 
 
 CodeT = TypeVar("CodeT", bound=source.code.Code)
+_T = TypeVar("_T")
 NodeT = TypeVar("NodeT", bound=source.node.Node)
 
 WrappedNode = IWrap[_frontend.node.Node]
@@ -81,6 +84,29 @@ class IFrontendResult:
     spans: list[_frontend.node.SpanField] = field(default_factory=list)
     resumptionTargets: set[IWrap[_frontend.node.Node]] = field(default_factory=set)
 
+    def externals(self) -> dict[str, str]:
+        """The C callbacks that the parser calls and their signatures
+        (`"match"`, `"value"` or `"span"`), in the order they are first seen"""
+        externals: dict[str, str] = {}
+        for span in self.spans:
+            for callback in span.callbacks:
+                externals.setdefault(callback.ref.name, "span")
+        for node in [self.root, *Enumerator.getAllNodes(self.root)]:
+            if isinstance(node.ref, _frontend.node.Invoke):
+                code = node.ref.code.ref
+                if isinstance(code, _frontend.code.External):
+                    externals.setdefault(code.name, code.signature)
+        return externals
+
+    def pauses(self) -> list[int]:
+        """The error codes of the parser's pauses, as opposed to its errors"""
+        codes = {
+            node.ref.code
+            for node in [self.root, *Enumerator.getAllNodes(self.root)]
+            if isinstance(node.ref, _frontend.node.Pause)
+        }
+        return sorted(codes)
+
 
 @dataclass(slots=True)
 class IFrontendOptions:
@@ -91,6 +117,10 @@ class IFrontendOptions:
 MatchChildren = list[WrappedNode]
 MatchResult = WrappedNode | list[WrappedNode]
 
+# A translation step yields the builder nodes it needs translated and is sent
+# back their frontend nodes, see `Frontend.translate`
+Translation = Generator[source.code.Node, WrappedNode, _T]
+
 
 class Frontend:
     def __init__(
@@ -98,6 +128,8 @@ class Frontend:
         prefix: str,
         implementation: IImplementation = IImplementation(),
         options: dict[Literal["maxTableElemWidth", "minTableSize"], int] = dict(),
+        spanColoring: Literal["greedy", "dsatur"] = "greedy",
+        profiler: Profiler | None = None,
     ) -> None:
         self.prefix = prefix
         self.Id = Identifier(self.prefix + "__n_")
@@ -108,6 +140,8 @@ class Frontend:
         self.resumptionTargets: set[WrappedNode] = set()
         self.implementation = implementation
         self.prefix = prefix
+        self.spanColoring = spanColoring
+        self.profiler = profiler if profiler else Profiler(enabled=False)
         self.options: dict[Literal["maxTableElemWidth", "minTableSize"], int] = {
             "maxTableElemWidth": options.get(
                 "maxTableElemWidth", DEFAULT_MAX_TABLE_WIDTH
@@ -121,11 +155,24 @@ class Frontend:
             )
 
     def compile(self, root: source.code.Node, properties: list[source.Property] = []):
-        lc = LoopChecker()
-        lc.check(root)
+        profiler = self.profiler
+
+        # Every pass over the builder graph shares one index of it
+        with profiler.phase("graph") as stats:
+            graph = GraphIndex(root)
+            stats.counts["nodes"] = len(graph)
+            stats.counts["edges"] = len(graph.edges)
 
-        spanAllocator = SpanAllocator()
-        sourceSpans = spanAllocator.allocate(root)
+        with profiler.phase("loopChecker") as stats:
+            lc = LoopChecker()
+            lc.check(root, graph)
+            stats.counts["nodes"] = len(graph)
+
+        with profiler.phase("spanAllocator") as stats:
+            spanAllocator = SpanAllocator(self.spanColoring)
+            sourceSpans = spanAllocator.allocate(root, graph)
+            stats.counts["spans"] = len(sourceSpans.colors)
+            stats.counts["slots"] = len(sourceSpans.concurrency)
 
         spans: list[SpanField] = []
         for index, concurrent in enumerate(sourceSpans.concurrency):
@@ -142,17 +189,24 @@ class Frontend:
         # o = Debugger.getAllNodes(root)
         # print("debug",o)
         # Translate Code
-        out = self.translate(root)
+        with profiler.phase("translate") as stats:
+            out = self.translate(root)
+            stats.counts["nodes"] = len(self.Map)
 
         # Enumerate
         enumerator = Enumerator()
-        nodes = enumerator.getAllNodes(out)
+        with profiler.phase("enumerator") as stats:
+            nodes = enumerator.getAllNodes(out)
+            stats.counts["nodes"] = len(nodes)
+
         # Peephole optimizations...
-        peephole = Peephole()
-        out = peephole.optimize(out, nodes)
+        with profiler.phase("peephole") as stats:
+            peephole = Peephole()
+            out = peephole.optimize(out, nodes)
 
-        # Re-Enumerate
-        nodes = enumerator.getAllNodes(out)
+            # Re-Enumerate
+            nodes = enumerator.getAllNodes(out)
+            stats.counts["nodes"] = len(nodes)
 
         # DONT FORGET TO ADD "OUT" TO THE RESUMPTION TARGETS!!!
         self.resumptionTargets.add(out)
@@ -169,7 +223,9 @@ class Frontend:
             spans=spans,
         )
 
-    def translateMatch(self, node: source.code.Match) -> list[WrappedNode]:
+    def translateMatch(
+        self, node: source.code.Match
+    ) -> Translation[list[WrappedNode] | WrappedNode]:
         trie = Trie(node.name)
         assert node.getOtherwiseEdge()
         trieNode = trie.build(list(node))
@@ -182,7 +238,7 @@ class Frontend:
 
         children: MatchChildren = []
 
-        self.translateTrie(node, trieNode, children)
+        yield from self.translateTrie(node, trieNode, children)
         assert children
 
         return children
@@ -205,7 +261,35 @@ class Frontend:
         elif isinstance(node.ref, (_frontend.node.Pause, _frontend.node.SpanEnd)):
             self.resumptionTargets.add(node.ref.otherwise.node)
 
-    def translate(self, node: source.code.Node):
+    def translate(self, node: source.code.Node) -> WrappedNode:
+        """Translates `node` and everything reachable from it.
+
+        Each node is translated by a generator that yields the targets of
+        its edges instead of recursing into them. The generators are kept on
+        an explicit stack and resumed with the translated target, so deep
+        graphs never grow the python stack while nodes are still visited
+        (and named) in the same order as a recursive walk."""
+        if node in self.Map:
+            return self.Map[node]
+
+        result: WrappedNode | None = None
+        stack = [self.translateNode(node)]
+        while stack:
+            try:
+                target = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                result = done.value
+                continue
+
+            if target in self.Map:
+                result = self.Map[target]
+            else:
+                stack.append(self.translateNode(target))
+                result = None
+        return result
+
+    def translateNode(self, node: source.code.Node) -> Translation[WrappedNode]:
         if node in self.Map:
             return self.Map[node]
 
@@ -250,7 +334,7 @@ class Frontend:
             )
 
         elif isinstance(node, source.code.Match):
-            result = self.translateMatch(node)
+            result = yield from self.translateMatch(node)
 
         elif isinstance(node, source.node.Int):
             result = self.translateInt(node)
@@ -272,7 +356,7 @@ class Frontend:
                 for child in result:
                     if not child.ref.otherwise:
                         child.ref.setOtherwise(
-                            self.translate(otherwise.node), otherwise.noAdvance
+                            (yield otherwise.node), otherwise.noAdvance
                         )
                 transform = self.translateTransform(_match.getTransform())
                 for child in result:
@@ -281,7 +365,7 @@ class Frontend:
 
             else:
                 result[-1].ref.setOtherwise(
-                    self.translate(otherwise.node), otherwise.noAdvance
+                    (yield otherwise.node), otherwise.noAdvance
                 )
             assert len(result) >= 1
             return result[0]
@@ -294,9 +378,7 @@ class Frontend:
             self.Map[node] = single
 
             if otherwise is not None:
-                single.ref.setOtherwise(
-                    self.translate(otherwise.node), otherwise.noAdvance
-                )
+                single.ref.setOtherwise((yield otherwise.node), otherwise.noAdvance)
 
             else:
                 assert isinstance(node, source.code.Error), (
@@ -307,7 +389,7 @@ class Frontend:
                 for edge in node:
                     single.ref.addEdge(
                         ord(edge.key) if isinstance(edge.key, str) else edge.key,
-                        self.translate(edge.node),
+                        (yield edge.node),
                     )
             else:
                 assert len(list(node)) == 0
@@ -346,7 +428,7 @@ class Frontend:
 
     def maybeTableLookup(
         self, node: source.code.Match, trie: TrieSingle, children: MatchChildren
-    ):
+    ) -> Translation[WrappedNode | None]:
         if len(trie.children) < self.options["minTableSize"]:
             return None
 
@@ -405,7 +487,7 @@ class Frontend:
             self.Map[node] = table
 
         for target in targets.values():
-            _next = self.translateTrie(node, target.trie, children)
+            _next = yield from self.translateTrie(node, target.trie, children)
             table.ref.addEdge(
                 ITableEdge(keys=target.keys, noAdvance=target.noAdvance, node=_next)
             )
@@ -416,7 +498,7 @@ class Frontend:
 
     def translateSequence(
         self, node: source.code.Match, trie: TrieSequence, children: MatchChildren
-    ) -> IWrap[_frontend.node.Match]:
+    ) -> Translation[IWrap[_frontend.node.Match]]:
         sequence = self.implementation.node.Sequence(
             _frontend.node.Sequence(self.Id.id(node.name), trie.select)
         )
@@ -426,7 +508,7 @@ class Frontend:
         if not self.Map.get(node):
             self.Map[node] = sequence
 
-        childNode = self.translateTrie(node, trie.child, children)
+        childNode = yield from self.translateTrie(node, trie.child, children)
 
         value = trie.child.value if isinstance(trie.child, TrieEmpty) else None
 
@@ -436,22 +518,22 @@ class Frontend:
 
     def translateTrie(
         self, node: source.code.Match, trie: TrieNode, children: MatchChildren
-    ):
+    ) -> Translation[WrappedNode]:
         if isinstance(trie, TrieEmpty):
             assert self.Map.get(node)
-            return self.translate(trie.node)
+            return (yield trie.node)
         elif isinstance(trie, TrieSingle):
-            return self.translateSingle(node, trie, children)
+            return (yield from self.translateSingle(node, trie, children))
         elif isinstance(trie, TrieSequence):
-            return self.translateSequence(node, trie, children)
+            return (yield from self.translateSequence(node, trie, children))
         else:
             raise TypeError("Unknown trie node")
 
     def translateSingle(
         self, node: source.code.Match, trie: TrieSingle, children: MatchChildren
-    ):
+    ) -> Translation[WrappedNode]:
         # Check if Tablelookup could be a valid option to Optimze our code up...
-        if maybeTable := self.maybeTableLookup(node, trie, children):
+        if maybeTable := (yield from self.maybeTableLookup(node, trie, children)):
             return maybeTable
 
         single = self.implementation.node.Single(
@@ -464,7 +546,7 @@ class Frontend:
             self.Map[node] = single
 
         for child in trie.children:
-            childNode = self.translateTrie(node, child.node, children)
+            childNode = yield from self.translateTrie(node, child.node, children)
 
             single.ref.addEdge(
                 key=child.key,
@@ -475,7 +557,9 @@ class Frontend:
 
         if otherwise := trie.otherwise:
             single.ref.setOtherwise(
-                self.translateTrie(node, otherwise, children), True, otherwise.value
+                (yield from self.translateTrie(node, otherwise, children)),
+                True,
+                otherwise.value,
             )
         return single
 
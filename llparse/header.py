@@ -27,6 +27,27 @@ class HeaderBuilder:
     properties: list[Property] = field(default_factory=list)
     spans: list[SpanField] = field(default_factory=list)
 
+    def fields(self) -> list[tuple[str, str]]:
+        """The C type and name of every member of the state struct, in order"""
+        fields = [("int32_t", "_index")]
+
+        for index, f in enumerate(self.spans):
+            fields.append(("void*", f"_span_pos{index}"))
+            if len(f.callbacks) > 1:
+                fields.append(("void*", f"_span_cb{index}"))
+
+        fields.append(("int32_t", "error"))
+        fields.append(("const char*", "reason"))
+        fields.append(("const char*", "error_pos"))
+        fields.append(("void*", "data"))
+        fields.append(("void*", "_current"))
+
+        for prop in self.properties:
+            if not (ty := TYPE_LOOKUP.get(prop.ty)):
+                raise Exception(f'Unknown state property type: "{prop.ty}"')
+            fields.append((ty, prop.name))
+        return fields
+
     def build(self):
         """Builds The string to create the header file"""
         res = ""
@@ -46,24 +67,11 @@ class HeaderBuilder:
         # Main Structure
         res += f"typedef struct {self.prefix}_s {self.prefix}_t;\n"
         res += f"struct {self.prefix}_s " + "{\n"
-        res += "  int32_t _index;\n"
-
-        for index, f in enumerate(self.spans):
-            res += f"  void* _span_pos{index};\n"
-            if len(f.callbacks) > 1:
-                res += f"  void* _span_cb{index};\n"
-
-        res += "  int32_t error;\n"
-        res += "  const char* reason;\n"
-        res += "  const char* error_pos;\n"
-        res += "  void* data;\n"
-        res += "  void* _current;\n"
-
-        for prop in self.properties:
-            if not (ty := TYPE_LOOKUP.get(prop.ty)):
-                raise Exception(f'Unknown state property type: "{prop.ty}"')
-
-            res += f"  {ty}  {prop.name};\n"
+        fields = self.fields()
+        for index, (ty, name) in enumerate(fields):
+            # Properties have always been separated from their type by two spaces
+            sep = "  " if index >= len(fields) - len(self.properties) else " "
+            res += f"  {ty}{sep}{name};\n"
         res += "};"
 
         res += "\n"
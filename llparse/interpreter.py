@@ -0,0 +1,724 @@
+"""
+Runs parsers in python, straight from the states of the frontend, where
+there is no C compiler to build them with:
+
+```python
+interpreter = p.interpret(root, callbacks={"on_url": lambda parser, data: print(data)})
+parser = interpreter.parser()
+parser.execute(b"GET /index.html HTTP/1.1\\r\\n\\r\\n")
+```
+
+Parsers behave like the `_execute` of the generated C, down to the fields
+wrapping around at the width of their C type, and can be fed any number of
+chunks. Their API is the one of `llparse.loader`, so tests can run the same
+grammar through both.
+
+Every state is compiled once into a tuple, `Single` and `TableLookup`
+states into a table of 256 transitions with the transform already applied.
+States that loop on themselves skip the bytes they loop on with a regular
+expression (or `bytes.find` when a single byte leaves them) instead of going
+through the table byte by byte, sequences are compared in one go when they
+are in the buffer and integers read at once.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+import sys
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from .enumerator import Enumerator
+from .loader import SpanData
+from .pyfront import code as _code
+from .pyfront import nodes as _node
+
+if TYPE_CHECKING:
+    from .frontend import IFrontendResult
+
+    if sys.version_info < (3, 12):
+        from typing_extensions import Buffer
+    else:
+        from collections.abc import Buffer
+
+# What the first item of every compiled state tells `Parser._run`
+MATCH = 0
+SEQUENCE = 1
+INVOKE = 2
+SPAN_START = 3
+SPAN_END = 4
+EMPTY = 5
+INT = 6
+CONSUME = 7
+PAUSE = 8
+ERROR = 9
+
+# `Parser._current` once an error was reached, there is no way on from it
+STATE_ERROR = -1
+
+FIELD_BITS = {"i8": 8, "i16": 16, "i32": 32, "i64": 64}
+
+TRANSFORMS: dict[str, bytes | None] = {
+    "id": None,
+    "to_lower": bytes(c | 0x20 if 0x41 <= c <= 0x5A else c for c in range(256)),
+    "to_lower_unsafe": bytes(c | 0x20 for c in range(256)),
+}
+
+OPERATORS: dict[str, Callable[[int, int], bool]] = {
+    ">": operator.gt,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+BITWISE: dict[type, Callable[[int, int], int]] = {
+    _code.And: operator.and_,
+    _code.Or: operator.or_,
+}
+
+
+def cInt(value: int | None) -> int:
+    """`value` the way C hands it around as an `int`"""
+    if not value:
+        return 0
+    return ((int(value) + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+def operand(value: int, bits: int) -> int:
+    """What an `int` constant turns into when compared with an unsigned
+    field of `bits` bits, narrower fields are promoted to `int` instead"""
+    return value & ((1 << bits) - 1) if bits >= 32 else value
+
+
+class Interpreter:
+    """A parser compiled into states that python can run, hands out `Parser`s.
+
+    Callbacks are shared by every parser and called exactly like the ones of
+    `llparse.loader.ParserLibrary`, with the `Parser` that ran into them:
+
+    - match callbacks as `callback(parser)`
+    - value callbacks as `callback(parser, value)`
+    - span callbacks as `callback(parser, data)`, `data` being the bytes of
+      the span, a slice of the buffer given to `Parser.execute` with
+      `spans="memoryview"` and `callback(parser, start, end)` with `"offsets"`
+
+    :param skipAhead: Skip through self looping states, sequences and
+        integers in one go, without it every byte goes through the states
+        one by one
+    """
+
+    __slots__ = (
+        "prefix",
+        "externals",
+        "spans",
+        "skipAhead",
+        "fields",
+        "states",
+        "root",
+        "spanCallbacks",
+        "_callbacks",
+    )
+
+    def __init__(
+        self,
+        result: IFrontendResult,
+        callbacks: dict[str, Callable[..., int | None]] | None = None,
+        spans: SpanData = "bytes",
+        skipAhead: bool = True,
+    ) -> None:
+        if spans not in ("bytes", "memoryview", "offsets"):
+            raise ValueError(f'Unknown way to report spans: "{spans}"')
+        self.prefix = result.prefix
+        self.externals = result.externals()
+        self.spans = spans
+        self.skipAhead = skipAhead
+        self.fields = {
+            prop.name: FIELD_BITS[prop.ty] for prop in result.properties if prop.ty in FIELD_BITS
+        }
+        self.fields["_index"] = 32
+        # The callback of every span until a `SpanStart` picks one of several
+        self.spanCallbacks: list[str] = [""] * len(result.spans)
+        for span in result.spans:
+            self.spanCallbacks[span.index] = span.callbacks[0].ref.name
+        self._callbacks: dict[str, Callable[..., int | None]] = {}
+
+        self.states: list[tuple] = []
+        self.root = self.compile(result.root)
+
+        for name, callback in (callbacks or {}).items():
+            self.setCallback(name, callback)
+
+    def parser(self) -> Parser:
+        return Parser(self)
+
+    def setCallback(self, name: str, callback: Callable[..., int | None] | None) -> None:
+        """Routes the callback `name` to `callback`, `None` makes it return 0"""
+        if name not in self.externals:
+            raise KeyError(f'The parser has no callback named "{name}"')
+        if callback is None:
+            self._callbacks.pop(name, None)
+        else:
+            self._callbacks[name] = callback
+
+    # -- Compiling states
+
+    def compile(self, root: _code.IWrap[_node.Node]) -> int:
+        """Numbers every node reachable from `root` and builds its state,
+        returns the number of `root`"""
+        ids: dict[int, int] = {}
+        nodes: list[_node.Node] = []
+        for node in [root, *Enumerator.getAllNodes(root)]:
+            if id(node.ref) not in ids:
+                ids[id(node.ref)] = len(nodes)
+                nodes.append(node.ref)
+        for index, node in enumerate(nodes):
+            self.states.append(self.buildState(node, index, ids))
+        return 0
+
+    def buildState(self, node: _node.Node, index: int, ids: dict[int, int]) -> tuple:
+        def target(wrap: _code.IWrap[_node.Node]) -> int:
+            return ids[id(wrap.ref)]
+
+        otherwise = node.otherwise
+        if isinstance(node, (_node.Single, _node.TableLookup)):
+            return self.buildMatch(node, index, target)
+
+        if isinstance(node, _node.Sequence):
+            select = node.select.encode("utf-8") if isinstance(node.select, str) else node.select
+            edge = node.Edge
+            return (
+                SEQUENCE,
+                select,
+                self.transform(node),
+                target(edge.node),
+                edge.value,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+                otherwise.value,
+                self.skipAhead,
+            )
+
+        if isinstance(node, _node.Invoke):
+            edges = {edge.code: target(edge.node) for edge in node.edges()}
+            return (
+                INVOKE,
+                self.buildCode(node.code.ref),
+                edges,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+            )
+
+        if isinstance(node, _node.SpanStart):
+            callback = node.callback.ref.name if len(node.field.callbacks) > 1 else None
+            return (
+                SPAN_START,
+                node.field.index,
+                callback,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+                otherwise.value,
+            )
+
+        if isinstance(node, _node.SpanEnd):
+            return (
+                SPAN_END,
+                node.field.index,
+                node.callback.ref.name,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+            )
+
+        if isinstance(node, _node.Int):
+            bits = self.fields.get(node.field)
+            if bits is None:
+                raise ValueError(
+                    f'property {node.field} should not use pointers but it was given "ptr"'
+                )
+            if not 1 <= node.bits <= 8:
+                raise ValueError(
+                    f"can't read {node.bits} bytes into {node.field}, at most 8 fit"
+                )
+            # Where the whole integer continues to when it is read at once
+            last = node
+            while last.byteOffset != last.bits - 1:
+                last = last.otherwise.node.ref
+            fused = None
+            if self.skipAhead and node.byteOffset == 0 and node.bits > 1:
+                fused = (
+                    ids[id(last.otherwise.node.ref)],
+                    node.bits if not last.otherwise.noAdvance else node.bits - 1,
+                )
+            return (
+                INT,
+                node.field,
+                node.byteOffset,
+                node.bits,
+                node.littleEndian,
+                node.signed,
+                bits,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+                fused,
+            )
+
+        if isinstance(node, _node.Consume):
+            if node.field not in self.fields:
+                raise Exception(f"Unsupported type of field {node.field} for consume node")
+            return (
+                CONSUME,
+                node.field,
+                target(otherwise.node),
+                not otherwise.noAdvance,
+                otherwise.value,
+            )
+
+        if isinstance(node, _node.Pause):
+            return (PAUSE, node.code, node.reason, target(otherwise.node))
+
+        if isinstance(node, _node.Error):
+            return (ERROR, node.code, node.reason)
+
+        if isinstance(node, _node.Empty):
+            return (EMPTY, target(otherwise.node), not otherwise.noAdvance, otherwise.value)
+
+        raise TypeError(f"Can't interpret {type(node).__name__} nodes")
+
+    def transform(self, node: _node.Match) -> bytes | None:
+        if node.transform is None:
+            return None
+        return TRANSFORMS[node.transform.ref.name]
+
+    def buildMatch(self, node: _node.Match, index: int, target: Callable[..., int]) -> tuple:
+        """The 256 transitions of a `Single` or `TableLookup`, by input byte"""
+        otherwise = node.otherwise
+        # Only the `otherwise` edge of tables passes its value on, like in C
+        default = (
+            target(otherwise.node),
+            not otherwise.noAdvance,
+            otherwise.value if isinstance(node, _node.TableLookup) else None,
+        )
+        byKey: dict[int, tuple[int, bool, int | None]] = {}
+        if isinstance(node, _node.Single):
+            for edge in node.edges:
+                byKey[edge.key] = (target(edge.node), not edge.noAdvance, edge.value)
+        else:
+            for table in node.privEdges:
+                for key in table.keys:
+                    byKey[key] = (target(table.node), not table.noAdvance, None)
+
+        transform = self.transform(node)
+        edges = tuple(
+            byKey.get(transform[c] if transform else c, default) for c in range(256)
+        )
+
+        skip = exit = None
+        loops = bytes(c for c in range(256) if edges[c] == (index, True, None))
+        if self.skipAhead and loops:
+            # Finds the first byte that leaves the state
+            skip = re.compile(b"[^" + b"".join(re.escape(bytes([c])) for c in loops) + b"]").search
+            if len(loops) == 255:
+                # Only one byte leaves, `find` gets there faster
+                exit = bytes(c for c in range(256) if c not in loops)
+        return (MATCH, edges, skip, exit)
+
+    def buildCode(self, code: _code.Code) -> Callable[[Parser, int], int]:
+        """`code` as `call(parser, match)`, returning what its C version does"""
+        if isinstance(code, _code.External):
+            callbacks = self._callbacks
+            name = code.name
+            if code.signature == "value":
+
+                def external(parser: Parser, match: int) -> int:
+                    callback = callbacks.get(name)
+                    return cInt(callback(parser, match)) if callback is not None else 0
+            else:
+
+                def external(parser: Parser, match: int) -> int:
+                    callback = callbacks.get(name)
+                    return cInt(callback(parser)) if callback is not None else 0
+
+            return external
+
+        field = code.field
+        bits = self.fields[field]
+        mask = (1 << bits) - 1
+        value = getattr(code, "value", 0)
+
+        if isinstance(code, (_code.And, _code.Or)):
+            combine = BITWISE[type(code)]
+
+            def combineField(parser: Parser, match: int) -> int:
+                fields = parser.fields
+                fields[field] = combine(fields[field], value) & mask
+                return 0
+
+            return combineField
+        if isinstance(code, _code.Update):
+
+            def updateField(parser: Parser, match: int) -> int:
+                parser.fields[field] = value & mask
+                return 0
+
+            return updateField
+        if isinstance(code, _code.Store):
+
+            def storeField(parser: Parser, match: int) -> int:
+                parser.fields[field] = match & mask
+                return 0
+
+            return storeField
+        if isinstance(code, _code.Load):
+            return lambda parser, match: cInt(parser.fields[field])
+        if isinstance(code, _code.IsEqual):
+            value = operand(value, bits)
+            return lambda parser, match: int(parser.fields[field] == value)
+        if isinstance(code, _code.Test):
+            value = operand(value, bits)
+            return lambda parser, match: int(parser.fields[field] & value == value)
+        if isinstance(code, _code.Operator):
+            compare = OPERATORS[code.op]
+            value = operand(value, bits)
+            return lambda parser, match: int(compare(parser.fields[field], value))
+        if isinstance(code, _code.MulAdd):
+            return self.buildMulAdd(code, bits)
+        raise TypeError(f"Can't interpret {type(code).__name__} code")
+
+    @staticmethod
+    def buildMulAdd(code: _code.MulAdd, bits: int) -> Callable[[Parser, int], int]:
+        field = code.field
+        options = code.options
+        base = options.base
+        mask = (1 << bits) - 1
+
+        if not options.signed:
+
+            def mulAdd(parser: Parser, match: int) -> int:
+                fields = parser.fields
+                value = fields[field]
+                # Multiplication overflow
+                if value > mask // base:
+                    return 1
+                value *= base
+                fields[field] = value
+                # Addition overflow
+                if match >= 0 and value > mask - match:
+                    return 1
+                value = (value + match) & mask
+                fields[field] = value
+                if options.max and value > options.max:
+                    return 1
+                return 0
+
+            return mulAdd
+
+        sign = 1 << (bits - 1)
+        high = sign - 1
+        # C divides towards zero
+        low = -(sign // base)
+
+        def signedMulAdd(parser: Parser, match: int) -> int:
+            fields = parser.fields
+            value = (fields[field] ^ sign) - sign
+            if value > high // base or value < low:
+                return 1
+            value = ((value * base) & mask ^ sign) - sign
+            fields[field] = value & mask
+            if match >= 0 and value > high - match:
+                return 1
+            value = ((value + match) & mask ^ sign) - sign
+            fields[field] = value & mask
+            if options.max and value > options.max:
+                return 1
+            return 0
+
+        return signedMulAdd
+
+
+class Parser:
+    """One parser state, created by `Interpreter.parser`. The fields of the
+    parser are in `fields` and can be read as attributes"""
+
+    __slots__ = (
+        "interpreter",
+        "fields",
+        "error",
+        "reason",
+        "_errorPos",
+        "_current",
+        "_spans",
+        "_spanCallbacks",
+        "_data",
+    )
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        self._data: Any = None
+        self.init()
+
+    def init(self) -> None:
+        """Resets the state to the start of the parser"""
+        interpreter = self.interpreter
+        self.fields = dict.fromkeys(interpreter.fields, 0)
+        self.error = 0
+        self.reason: str | None = None
+        self._errorPos: int | None = None
+        self._current = interpreter.root
+        # Where every span started in the data of the running `execute`
+        self._spans: list[int | None] = [None] * len(interpreter.spanCallbacks)
+        self._spanCallbacks = list(interpreter.spanCallbacks)
+
+    def execute(self, data: Buffer) -> int:
+        """Feeds `data`, any contiguous buffer, to the parser and returns its
+        error code, 0 if it went through. Exceptions raised by callbacks are
+        raised from here and leave the parser where the callback was called"""
+        # Check lingering errors
+        if self.error != 0:
+            return self.error
+
+        if not isinstance(data, (bytes, bytearray)):
+            data = memoryview(data).cast("B")
+
+        spans = self._spans
+        for index, start in enumerate(spans):
+            if start is not None:
+                spans[index] = 0
+
+        self._data = data
+        try:
+            if not self._run(data, len(data)):
+                return self.error
+
+            for index, start in enumerate(spans):
+                if start is None:
+                    continue
+                err = self._span(self._spanCallbacks[index], start, len(data))
+                if err != 0:
+                    self.error = err
+                    self._errorPos = len(data)
+                    return err
+            return 0
+        finally:
+            self._data = None
+
+    @property
+    def error_offset(self) -> int | None:
+        """Where in the data of the last `execute` the parser stopped, `None` if it hasn't"""
+        if not self.error:
+            return None
+        return self._errorPos
+
+    def resume(self) -> None:
+        """Clears the error of a pause so that `execute` can go on"""
+        self.error = 0
+
+    def __getattr__(self, name: str):
+        try:
+            return self.fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def _span(self, name: str, start: int, end: int) -> int:
+        callback = self.interpreter._callbacks.get(name)
+        if callback is None:
+            return 0
+        spans = self.interpreter.spans
+        if spans == "offsets":
+            return cInt(callback(self, start, end))
+        if spans == "memoryview":
+            return cInt(callback(self, memoryview(self._data)[start:end]))
+        return cInt(callback(self, bytes(self._data[start:end])))
+
+    def _run(self, data: Any, end: int) -> bool:
+        """Goes through `data` from the state the parser is in, returns
+        `False` once it ran into an error or a pause"""
+        states = self.interpreter.states
+        fields = self.fields
+        state = self._current
+        p = 0
+        match = 0
+        # Views of other buffers have no `find`
+        find = not isinstance(data, memoryview)
+
+        if state == STATE_ERROR:
+            return False
+
+        try:
+            while True:
+                st = states[state]
+                kind = st[0]
+
+                if kind == MATCH:
+                    if p == end:
+                        break
+                    target, advance, value = st[1][data[p]]
+                    if target == state and advance and value is None:
+                        skip = st[2]
+                        if skip is None:
+                            p += 1
+                            continue
+                        if st[3] is not None and find:
+                            p = data.find(st[3], p + 1, end)
+                            if p == -1:
+                                p = end
+                                break
+                            continue
+                        found = skip(data, p + 1, end)
+                        if found is None:
+                            p = end
+                            break
+                        p = found.start()
+                        continue
+                    if advance:
+                        p += 1
+                    if value is not None:
+                        match = value
+                    state = target
+
+                elif kind == INVOKE:
+                    result = st[1](self, match)
+                    edges = st[2]
+                    if result in edges:
+                        state = edges[result]
+                    else:
+                        state = st[3]
+                        if st[4]:
+                            p += 1
+
+                elif kind == SPAN_START:
+                    if p == end:
+                        break
+                    self._spans[st[1]] = p
+                    if st[2] is not None:
+                        self._spanCallbacks[st[1]] = st[2]
+                    state = st[3]
+                    if st[4]:
+                        p += 1
+                    if st[5] is not None:
+                        match = st[5]
+
+                elif kind == SPAN_END:
+                    start = self._spans[st[1]]
+                    self._spans[st[1]] = None
+                    err = self._span(st[2], p if start is None else start, p)
+                    if err != 0:
+                        self.error = err
+                        self._errorPos = p + 1 if st[4] else p
+                        self._current = st[3]
+                        return False
+                    state = st[3]
+                    if st[4]:
+                        p += 1
+
+                elif kind == SEQUENCE:
+                    if p == end:
+                        break
+                    _, select, transform, target, value, otherwise, advance, otherValue, fast = st
+                    length = len(select)
+                    index = fields["_index"]
+                    if fast and index == 0 and end - p >= length:
+                        chunk = data[p : p + length]
+                        if transform is not None:
+                            chunk = bytes(chunk).translate(transform)
+                        if chunk == select:
+                            p += length
+                            if value is not None:
+                                match = value
+                            state = target
+                            continue
+
+                    while p != end:
+                        current = data[p]
+                        if transform is not None:
+                            current = transform[current]
+                        if current != select[index]:
+                            # Mismatch
+                            fields["_index"] = 0
+                            state = otherwise
+                            if advance:
+                                p += 1
+                            if otherValue is not None:
+                                match = otherValue
+                            break
+                        index += 1
+                        if index == length:
+                            # Complete
+                            fields["_index"] = 0
+                            p += 1
+                            if value is not None:
+                                match = value
+                            state = target
+                            break
+                        p += 1
+                    else:
+                        fields["_index"] = index
+                        break
+
+                elif kind == EMPTY:
+                    if st[2]:
+                        if p == end:
+                            break
+                        p += 1
+                    state = st[1]
+                    if st[3] is not None:
+                        match = st[3]
+
+                elif kind == INT:
+                    if p == end:
+                        break
+                    _, field, offset, bits, little, signed, width, target, advance, fused = st
+                    mask = (1 << width) - 1
+                    if fused is not None and end - p >= bits:
+                        value = int.from_bytes(data[p : p + bits], "little" if little else "big")
+                        offset = bits - 1
+                        state, step = fused
+                        p += step
+                    else:
+                        if offset == 0:
+                            value = data[p]
+                        elif little:
+                            value = fields[field] | data[p] << (offset * 8)
+                        else:
+                            value = (fields[field] << 8 | data[p]) & mask
+                        state = target
+                        if advance:
+                            p += 1
+                    if offset == bits - 1 and signed and bits * 8 < width:
+                        sign = 1 << (bits * 8 - 1)
+                        value = ((value ^ sign) - sign) & mask
+                    fields[field] = value
+
+                elif kind == CONSUME:
+                    field = st[1]
+                    need = fields[field]
+                    avail = end - p
+                    if avail < need:
+                        fields[field] = need - avail
+                        break
+                    p += need
+                    fields[field] = 0
+                    state = st[2]
+                    if st[3]:
+                        p += 1
+                    if st[4] is not None:
+                        match = st[4]
+
+                elif kind == PAUSE:
+                    self.error = st[1]
+                    self.reason = st[2]
+                    self._errorPos = p
+                    self._current = st[3]
+                    return False
+
+                else:
+                    self.error = st[1]
+                    self.reason = st[2]
+                    self._errorPos = p
+                    self._current = STATE_ERROR
+                    return False
+        except BaseException:
+            self._current = state
+            raise
+
+        self._current = state
+        return True
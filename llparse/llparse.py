@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Callable, Literal
 
 from .C_compiler import CCompiler
 from .frontend import (
@@ -10,7 +11,11 @@ from .frontend import (
     source,
 )
 from .header import HeaderBuilder
+from .loader import ParserLibrary, SpanData, load
 from .capi_builder import LibraryCompiler
+from .extension import ExtensionCompiler
+from .interpreter import Interpreter
+from .profiler import CompileStats, Profiler
 
 
 @dataclass(slots=True)
@@ -19,6 +24,14 @@ class CompilerResult:
     """Textual C code"""
     header: str
     """Textual C header file"""
+    stats: CompileStats | None = None
+    """Per-phase timings and sizes, only filled in when compiling with `profile=True`"""
+    layout: list[tuple[str, str]] = field(default_factory=list)
+    """C type and name of every member of the state struct, see `HeaderBuilder.fields`"""
+    externals: dict[str, str] = field(default_factory=dict)
+    """Callbacks the parser expects to be linked with and their signatures"""
+    pauses: list[int] = field(default_factory=list)
+    """Error codes the parser pauses with"""
 
     def write(self, c: Path | str, header:Path | str) -> None:
         """
@@ -42,12 +55,19 @@ class Compiler:
     debug: str | None = None
     maxTableElemWidth: int | None = None
     minTableSize: int | None = None
+    spanColoring: Literal["greedy", "dsatur"] = "greedy"
+    """`"dsatur"` packs spans into as few state fields as it can"""
+    computedGoto: bool = False
+    """Resume with `goto *` on label addresses when built with GCC or Clang"""
+    cacheFields: bool = False
+    """Keep the fields that invokes work on in locals while the parser runs"""
 
     def to_frontend(
         self,
         root: source.code.Node,
         properties: list[source.Property],
         Impl: IImplementation | None = IImplementation(),
+        profiler: Profiler | None = None,
     ):
         """compiles up the frontend and brings you back the frontend's results.
         I added documentation to this function so that you can do creative things
@@ -59,6 +79,8 @@ class Compiler:
                 "maxTableElemWidth": self.maxTableElemWidth,
                 "minTableSize": self.minTableSize,
             },
+            spanColoring=self.spanColoring,
+            profiler=profiler,
         ).compile(root, properties)
 
     def compile(
@@ -68,18 +90,41 @@ class Compiler:
         header_name: str | None = None,
         Impl: IImplementation | None = IImplementation(),
         override_llparse_name: bool = False,
+        profile: bool = False,
     ):
-        """Creates the C and header file..."""
-        info = self.to_frontend(root, properties, Impl)
-        hb = HeaderBuilder(self.prefix, self.headerGuard, properties, info.spans)
-        cdata = CCompiler(header_name, self.debug).compile(info)
-        if override_llparse_name:
-            # sometimes users want to combine parsers together when compiling with C
-            # to make up for conflicts with other parsers example: llhttp
-            # there should be a fair way of compiling everything.
-            cdata = cdata.replace("llparse", self.prefix)
+        """Creates the C and header file...
 
-        return CompilerResult(cdata, hb.build())
+        :param profile: Record the time, peak memory and output sizes of every
+            phase into `CompilerResult.stats`, times include the overhead of
+            tracing the memory
+        """
+        profiler = Profiler(enabled=profile)
+        info = self.to_frontend(root, properties, Impl, profiler)
+
+        with profiler.phase("ccompiler") as stats:
+            cdata = CCompiler(
+                header_name, self.debug, self.computedGoto, self.cacheFields
+            ).compile(info, stats)
+            if override_llparse_name:
+                # sometimes users want to combine parsers together when compiling with C
+                # to make up for conflicts with other parsers example: llhttp
+                # there should be a fair way of compiling everything.
+                cdata = cdata.replace("llparse", self.prefix)
+            stats.counts["bytes"] = len(cdata)
+
+        with profiler.phase("header") as stats:
+            hb = HeaderBuilder(self.prefix, self.headerGuard, properties, info.spans)
+            header = hb.build()
+            stats.counts["bytes"] = len(header)
+
+        return CompilerResult(
+            cdata,
+            header,
+            profiler.stats if profile else None,
+            hb.fields(),
+            info.externals(),
+            info.pauses(),
+        )
 
 
 class LLParse(source.Builder):
@@ -112,6 +157,9 @@ class LLParse(source.Builder):
         debug: str | None = None,
         maxTableElemWidth: int | None = None,
         minTableSize: int | None = None,
+        spanColoring: Literal["greedy", "dsatur"] = "greedy",
+        computedGoto: bool = False,
+        cacheFields: bool = False,
     ) -> Compiler:
         return Compiler(
             self.prefix,
@@ -119,6 +167,9 @@ class LLParse(source.Builder):
             debug,
             maxTableElemWidth if maxTableElemWidth else DEFAULT_MAX_TABLE_WIDTH,
             minTableSize if minTableSize else DEFAULT_MIN_TABLE_SIZE,
+            spanColoring,
+            computedGoto,
+            cacheFields,
         )
 
     def build(
@@ -130,6 +181,10 @@ class LLParse(source.Builder):
         minTableSize: int | None = None,
         header_name: str | None = None,
         override_llparse_name: bool = False,
+        spanColoring: Literal["greedy", "dsatur"] = "greedy",
+        profile: bool = False,
+        computedGoto: bool = False,
+        cacheFields: bool = False,
     ) -> CompilerResult:
         """Builds Graph and then compiles the data into C code , returns with the header and C file inside of a Dataclass"""
 
@@ -139,6 +194,9 @@ class LLParse(source.Builder):
             debug,
             maxTableElemWidth if maxTableElemWidth else DEFAULT_MAX_TABLE_WIDTH,
             minTableSize if minTableSize else DEFAULT_MIN_TABLE_SIZE,
+            spanColoring,
+            computedGoto,
+            cacheFields,
         )
 
         return compiler.compile(
@@ -146,6 +204,48 @@ class LLParse(source.Builder):
             self.properties(),
             header_name=header_name,
             override_llparse_name=override_llparse_name,
+            profile=profile,
+        )
+
+    def load(
+        self,
+        root: source.code.Node,
+        callbacks: dict[str, Callable[..., int | None]] | None = None,
+        cacheDir: Path | str | None = None,
+        cc: str | None = None,
+        cflags: list[str] | tuple[str, ...] = ("-O2",),
+        spans: SpanData = "bytes",
+        **options: Any,
+    ) -> ParserLibrary:
+        """Builds `root`, compiles it into a shared object with the system C compiler
+        and loads it with ctypes, see `llparse.loader`. Compiled parsers are cached by
+        the hash of their source so loading the same parser again skips the C compiler"""
+        return load(
+            self.build(root, **options),
+            self.prefix,
+            callbacks,
+            cacheDir,
+            cc,
+            cflags,
+            spans,
+        )
+
+    def interpret(
+        self,
+        root: source.code.Node,
+        callbacks: dict[str, Callable[..., int | None]] | None = None,
+        spans: SpanData = "bytes",
+        skipAhead: bool = True,
+        maxTableElemWidth: int | None = None,
+        minTableSize: int | None = None,
+    ) -> Interpreter:
+        """Runs `root` in python without compiling it, for places where there is no C
+        compiler. Its parsers work like the ones of `load`, see `llparse.interpreter`"""
+        compiler = self.get_compiler(
+            maxTableElemWidth=maxTableElemWidth, minTableSize=minTableSize
+        )
+        return Interpreter(
+            compiler.to_frontend(root, self.properties()), callbacks, spans, skipAhead
         )
 
     def to_frontend(
@@ -170,3 +270,10 @@ class LLParse(source.Builder):
     def capi(self, prefix: str) -> LibraryCompiler:
         """Using a new prefix this tool enables helping build c-api wrapper that is simillar to llhttp"""
         return LibraryCompiler(prefix, self)
+
+    def extension(self, module: str, capacity: int | None = None) -> ExtensionCompiler:
+        """Builds parsers into a CPython extension module named `module` that hands the
+        callbacks of each `execute` to python in one batch, see `llparse.extension`"""
+        if capacity is None:
+            return ExtensionCompiler(module, self)
+        return ExtensionCompiler(module, self, capacity)
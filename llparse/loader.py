@@ -0,0 +1,513 @@
+"""
+Compiles a generated parser into a shared object and loads it with ctypes,
+so that it can be run straight from python:
+
+```python
+lib = p.load(root, callbacks={"on_url": lambda parser, data: print(data)})
+parser = lib.parser()
+parser.execute(b"GET /index.html HTTP/1.1\\r\\n\\r\\n")
+```
+
+Shared objects are kept in a cache directory under a hash of everything
+that went into them (the C source, the header, the compiler, its version
+and its flags),
+building the same parser again only loads what is already there. Builds
+are serialized with a lock file in the cache directory so that concurrent
+test runs don't compile the same parser twice.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import functools
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import weakref
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+from .errors import Error
+
+if TYPE_CHECKING:
+    from .llparse import CompilerResult
+
+    if sys.version_info < (3, 12):
+        from typing_extensions import Buffer
+    else:
+        from collections.abc import Buffer
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+
+# Bumped whenever the shim or the build changes in a way the key can't see
+CACHE_VERSION = "2"
+
+# Held while compiling into a cache directory
+LOCK_NAME = ".lock"
+
+CTYPES: dict[str, type] = {
+    "int32_t": ctypes.c_int32,
+    "uint8_t": ctypes.c_uint8,
+    "uint16_t": ctypes.c_uint16,
+    "uint32_t": ctypes.c_uint32,
+    "uint64_t": ctypes.c_uint64,
+    "const char*": ctypes.c_char_p,
+    "void*": ctypes.c_void_p,
+}
+
+# `error_pos` points into the input, it is turned into an offset instead
+# of being read as a string
+POINTER_FIELDS = {"error_pos"}
+
+SIGNATURES: dict[str, str] = {
+    "match": "const unsigned char* p, const unsigned char* endp",
+    "span": "const unsigned char* p, const unsigned char* endp",
+    "value": "const unsigned char* p, const unsigned char* endp, int value",
+}
+
+SHIM = """\
+#include <stddef.h>
+#include "{prefix}.h"
+
+#if defined(_WIN32)
+#define LLPARSE_LOADER_EXPORT __declspec(dllexport)
+#else
+#define LLPARSE_LOADER_EXPORT __attribute__((visibility("default")))
+#endif
+
+/* Every callback goes through a pointer that python fills in, callbacks
+ * that were never set return 0 */
+{callbacks}
+"""
+
+CALLBACK = """\
+LLPARSE_LOADER_EXPORT int (*{prefix}__loader_{name})({prefix}_t*, {args});
+int {name}({prefix}_t* s, {args}) {{
+  return {prefix}__loader_{name} == NULL ? 0 : {prefix}__loader_{name}(s, {names});
+}}
+"""
+
+
+def defaultCacheDir() -> Path:
+    """`$LLPARSE_CACHE_DIR`, or `llparse` in the user's cache directory"""
+    if path := os.environ.get("LLPARSE_CACHE_DIR"):
+        return Path(path)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "llparse"
+
+
+def defaultCompiler() -> str:
+    cc = os.environ.get("CC") or shutil.which("cc") or shutil.which("gcc")
+    if cc is None:
+        raise Error("No C compiler found, set $CC to one")
+    return cc
+
+
+def buildShim(prefix: str, externals: dict[str, str]) -> str:
+    callbacks: list[str] = []
+    for name, signature in externals.items():
+        args = SIGNATURES[signature]
+        names = ", ".join(arg.split()[-1] for arg in args.split(", "))
+        callbacks.append(CALLBACK.format(prefix=prefix, name=name, args=args, names=names))
+    return SHIM.format(prefix=prefix, callbacks="\n".join(callbacks))
+
+
+@functools.lru_cache(maxsize=None)
+def compilerVersion(cc: str) -> str:
+    """What `cc --version` prints, so that upgrading the compiler rebuilds
+    what it compiled"""
+    try:
+        res = subprocess.run([cc, "--version"], capture_output=True, text=True)
+    except OSError:
+        return ""
+    return res.stdout + res.stderr
+
+
+def stateStruct(prefix: str, layout: list[tuple[str, str]]) -> type[ctypes.Structure]:
+    """A ctypes mirror of `{prefix}_t` laid out from `HeaderBuilder.fields`"""
+    fields = []
+    for ty, name in layout:
+        if name in POINTER_FIELDS:
+            fields.append((name, ctypes.c_void_p))
+        else:
+            fields.append((name, CTYPES[ty]))
+    return type(f"{prefix}_t", (ctypes.Structure,), {"_fields_": fields})
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """Holds an exclusive lock on `path` while compiling, the shared object
+    is still moved into place atomically where locks are not available"""
+    if fcntl is None:  # pragma: no cover - windows
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class PyBuffer(ctypes.Structure):
+    """`Py_buffer`, lets `Parser.execute` run over any buffer without copying it"""
+
+    _fields_ = [
+        ("buf", ctypes.c_void_p),
+        ("obj", ctypes.c_void_p),
+        ("len", ctypes.c_ssize_t),
+        ("itemsize", ctypes.c_ssize_t),
+        ("readonly", ctypes.c_int),
+        ("ndim", ctypes.c_int),
+        ("format", ctypes.c_char_p),
+        ("shape", ctypes.c_void_p),
+        ("strides", ctypes.c_void_p),
+        ("suboffsets", ctypes.c_void_p),
+        ("internal", ctypes.c_void_p),
+    ]
+
+
+PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(PyBuffer), ctypes.c_int]
+PyObject_GetBuffer.restype = ctypes.c_int
+PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+PyBuffer_Release.argtypes = [ctypes.POINTER(PyBuffer)]
+PyBuffer_Release.restype = None
+
+PyBUF_SIMPLE = 0
+
+SpanData = Literal["bytes", "memoryview", "offsets"]
+
+
+class Parser:
+    """One parser state, created by `ParserLibrary.parser`"""
+
+    __slots__ = ("library", "state", "_exception", "_data", "_view", "_start", "__weakref__")
+
+    def __init__(self, library: ParserLibrary) -> None:
+        self.library = library
+        self.state = library.State()
+        self._exception: BaseException | None = None
+        # What the running `execute` was given and where it starts in memory
+        self._data: Buffer | None = None
+        self._view: memoryview | None = None
+        self._start = 0
+        library._shared.parsers[ctypes.addressof(self.state)] = self
+        self.init()
+
+    def init(self) -> None:
+        """Resets the state to the start of the parser"""
+        self.library._init(ctypes.byref(self.state))
+
+    def execute(self, data: Buffer) -> int:
+        """Feeds `data`, any contiguous buffer such as `bytes`, `bytearray`, a
+        `memoryview` slice or an `mmap`, to the parser without copying it and
+        returns its error code, 0 if it went through. Exceptions raised by
+        callbacks are raised from here"""
+        view = PyBuffer()
+        PyObject_GetBuffer(data, ctypes.byref(view), PyBUF_SIMPLE)
+        try:
+            self._data = data
+            self._start = view.buf or 0
+            err = self.library._execute(
+                ctypes.byref(self.state), self._start, self._start + view.len
+            )
+        finally:
+            self._data = self._view = None
+            PyBuffer_Release(ctypes.byref(view))
+
+        if self._exception is not None:
+            exception, self._exception = self._exception, None
+            raise exception
+        return err
+
+    @property
+    def error(self) -> int:
+        return self.state.error
+
+    @property
+    def reason(self) -> str | None:
+        reason = self.state.reason
+        return reason.decode("utf-8", "replace") if reason is not None else None
+
+    @property
+    def error_offset(self) -> int | None:
+        """Where in the data of the last `execute` the parser stopped, `None` if it hasn't"""
+        if not self.state.error or not self.state.error_pos:
+            return None
+        return self.state.error_pos - self._start
+
+    def resume(self) -> None:
+        """Clears the error of a pause so that `execute` can go on"""
+        self.state.error = 0
+
+    def span(self, p: int, endp: int) -> bytes | memoryview | tuple[int, int]:
+        """The span between the pointers `p` and `endp` the way the library reports them"""
+        start = p - self._start
+        end = endp - self._start
+        spans = self.library.spans
+        if spans == "offsets":
+            return start, end
+        if spans == "memoryview":
+            if self._view is None:
+                self._view = memoryview(self._data).cast("B")
+            return self._view[start:end]
+        return ctypes.string_at(p, endp - p)
+
+    def __getattr__(self, name: str):
+        # Properties of the parser read straight from the state
+        return getattr(self.state, name)
+
+
+class SharedObject:
+    """A shared object loaded into the process. `dlopen` hands out the same
+    handle, and so the same callback pointers, every time a path is loaded,
+    so every `ParserLibrary` of a path goes through one `SharedObject`. Its
+    trampolines find the parser that ran into a callback, whatever library
+    it belongs to, and call that library's callback"""
+
+    __slots__ = ("lib", "prefix", "externals", "parsers", "_trampolines")
+
+    def __init__(self, path: Path, prefix: str, externals: dict[str, str]) -> None:
+        self.lib = ctypes.CDLL(str(path))
+        self.prefix = prefix
+        self.externals = externals
+        # Every live parser of the shared object by the address of its state
+        self.parsers: weakref.WeakValueDictionary[int, Parser] = weakref.WeakValueDictionary()
+        # ctypes callbacks have to outlive the pointers to them
+        self._trampolines: dict[str, object] = {}
+
+    def route(self, name: str) -> None:
+        """Points the C callback `name` at python, parsers of libraries
+        without a callback for it still get 0"""
+        if name in self._trampolines:
+            return
+
+        signature = self.externals[name]
+        args = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+        if signature == "value":
+            args.append(ctypes.c_int)
+        kind = ctypes.CFUNCTYPE(ctypes.c_int, *args)
+
+        def trampoline(state: int, p: int, endp: int, *value: int) -> int:
+            parser = self.parsers.get(state)
+            if parser is None or parser._exception is not None:
+                return -1
+            library = parser.library
+            callback = library._callbacks.get(name)
+            if callback is None:
+                return 0
+            try:
+                if signature != "span":
+                    res = callback(parser, *value)
+                elif library.spans == "offsets":
+                    res = callback(parser, *parser.span(p, endp))
+                else:
+                    res = callback(parser, parser.span(p, endp))
+            except BaseException as e:
+                # Raised again by `Parser.execute`, the parser stops here
+                parser._exception = e
+                return -1
+            return res or 0
+
+        function = kind(trampoline)
+        self._trampolines[name] = function
+        pointer = ctypes.c_void_p.in_dll(self.lib, f"{self.prefix}__loader_{name}")
+        pointer.value = ctypes.cast(function, ctypes.c_void_p).value
+
+
+# Shared objects are never unloaded, neither are their trampolines
+_sharedObjects: dict[Path, SharedObject] = {}
+
+
+def loadSharedObject(path: Path, prefix: str, externals: dict[str, str]) -> SharedObject:
+    shared = _sharedObjects.get(path)
+    if shared is None:
+        shared = _sharedObjects[path] = SharedObject(path, prefix, externals)
+    return shared
+
+
+class ParserLibrary:
+    """A parser compiled into a shared object, hands out `Parser`s.
+
+    Callbacks are python functions shared by every parser of the library,
+    they are called with the `Parser` that ran into them and return an int
+    (or `None` for 0) like their C counterparts would:
+
+    - match callbacks as `callback(parser)`
+    - value callbacks as `callback(parser, value)`
+    - span callbacks as `callback(parser, data)` with the bytes of the span,
+      when `spans` is `"memoryview"` `data` is a slice of the buffer given to
+      `Parser.execute` instead and with `"offsets"` they are called as
+      `callback(parser, start, end)` with the offsets of the span in it
+
+    Libraries loaded from the same shared object each keep their own callbacks.
+    """
+
+    __slots__ = (
+        "path",
+        "prefix",
+        "cached",
+        "State",
+        "externals",
+        "spans",
+        "_shared",
+        "_init",
+        "_execute",
+        "_callbacks",
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        prefix: str,
+        layout: list[tuple[str, str]],
+        externals: dict[str, str],
+        cached: bool = False,
+        spans: SpanData = "bytes",
+    ) -> None:
+        if spans not in ("bytes", "memoryview", "offsets"):
+            raise ValueError(f'Unknown way to report spans: "{spans}"')
+        self.path = path
+        self.prefix = prefix
+        self.cached = cached
+        """Whether the shared object was already in the cache"""
+        self.externals = externals
+        self.spans = spans
+        self.State = stateStruct(prefix, layout)
+
+        self._shared = loadSharedObject(path, prefix, externals)
+        # Functions of their own, the argument types differ between libraries
+        self._init = self._shared.lib[f"{prefix}_init"]
+        self._init.argtypes = [ctypes.POINTER(self.State)]
+        self._init.restype = ctypes.c_int
+        self._execute = self._shared.lib[f"{prefix}_execute"]
+        self._execute.argtypes = [
+            ctypes.POINTER(self.State),
+            ctypes.c_void_p,
+            ctypes.c_void_p,
+        ]
+        self._execute.restype = ctypes.c_int
+        self._callbacks: dict[str, Callable[..., int | None]] = {}
+
+    def parser(self) -> Parser:
+        return Parser(self)
+
+    def setCallback(self, name: str, callback: Callable[..., int | None] | None) -> None:
+        """Routes the C callback `name` to `callback`, `None` makes it return 0"""
+        if name not in self.externals:
+            raise KeyError(f'The parser has no callback named "{name}"')
+
+        if callback is None:
+            self._callbacks.pop(name, None)
+            return
+        self._callbacks[name] = callback
+        self._shared.route(name)
+
+
+def sharedObject(
+    name: str,
+    sources: dict[str, str],
+    cc: str,
+    flags: list[str],
+    cacheDir: Path,
+    suffix: str | None = None,
+) -> tuple[Path, bool]:
+    """Compiles the `.c` files of `sources` (file names to their contents,
+    headers included) into a shared object in `cacheDir`, unless it is
+    already there. Returns its path and whether it was"""
+    key = hashlib.sha256()
+    for part in (CACHE_VERSION, sys.platform, platform.machine(), cc, compilerVersion(cc), *flags):
+        key.update(part.encode("utf-8"))
+        key.update(b"\0")
+    for filename, source in sources.items():
+        key.update(filename.encode("utf-8"))
+        key.update(b"\0")
+        key.update(source.encode("utf-8"))
+        key.update(b"\0")
+    digest = key.hexdigest()
+
+    if suffix is None:
+        suffix = ".dll" if sys.platform == "win32" else ".so"
+    path = cacheDir / f"{name}-{digest[:32]}{suffix}"
+
+    if path.exists():
+        return path, True
+
+    cacheDir.mkdir(parents=True, exist_ok=True)
+    with locked(cacheDir / LOCK_NAME):
+        # Someone else may have built it while we waited
+        if path.exists():
+            return path, True
+        compile(cc, flags, name, sources, path)
+    return path, False
+
+
+def compile(cc: str, flags: list[str], name: str, sources: dict[str, str], path: Path) -> None:
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        out = Path(tmp)
+        for filename, source in sources.items():
+            (out / filename).write_text(source)
+
+        binary = out / path.name
+        res = subprocess.run(
+            [cc, *flags, "-I", tmp, "-o", str(binary)]
+            + [str(out / filename) for filename in sources if filename.endswith(".c")],
+            capture_output=True,
+            text=True,
+        )
+        if res.returncode != 0:
+            raise Error(f"Compiling {name} failed:\n{res.stderr}")
+        # Readers only ever see a complete shared object
+        os.replace(binary, path)
+
+
+def load(
+    result: CompilerResult,
+    prefix: str,
+    callbacks: dict[str, Callable[..., int | None]] | None = None,
+    cacheDir: Path | str | None = None,
+    cc: str | None = None,
+    cflags: list[str] | tuple[str, ...] = ("-O2",),
+    spans: SpanData = "bytes",
+) -> ParserLibrary:
+    """Compiles `result` into a shared object unless the cache already has
+    it and loads it
+
+    :param result: What `LLParse.build` returned for the parser
+    :param prefix: The parser's prefix
+    :param callbacks: Python functions for the C callbacks by name, see `ParserLibrary`
+    :param cacheDir: Where to keep shared objects, `defaultCacheDir()` if not given
+    :param cc: C compiler to use, `$CC` or `cc` if not given
+    :param cflags: Flags for the compiler besides the ones building a shared object
+    :param spans: How span callbacks get their data, see `ParserLibrary`
+    """
+    sources = {
+        f"{prefix}.c": result.c,
+        f"{prefix}.h": result.header,
+        "loader.c": buildShim(prefix, result.externals),
+    }
+    path, cached = sharedObject(
+        prefix,
+        sources,
+        cc or defaultCompiler(),
+        ["-shared", "-fPIC", *cflags],
+        Path(cacheDir) if cacheDir is not None else defaultCacheDir(),
+    )
+
+    library = ParserLibrary(path, prefix, result.layout, result.externals, cached, spans)
+    for name, callback in (callbacks or {}).items():
+        library.setCallback(name, callback)
+    return library
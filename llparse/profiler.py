@@ -0,0 +1,121 @@
+"""
+Opt-in instrumentation of the compile pipeline, records how long each phase
+took, how much memory it allocated at its peak and how big its output was.
+
+```python
+result = p.build(root, profile=True)
+print(result.stats.table())
+```
+"""
+
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class PhaseStats:
+    name: str
+    seconds: float = 0.0
+    """Wall time spent in the phase, including the overhead of `tracemalloc`
+    when memory is traced"""
+    peak: int = 0
+    """Peak of the memory allocated during the phase in bytes, 0 if memory was not traced"""
+    counts: dict[str, int] = field(default_factory=dict)
+    """Sizes of whatever the phase produced, e.g. nodes, edges or states"""
+
+
+@dataclass(slots=True)
+class CompileStats:
+    phases: list[PhaseStats] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(phase.seconds for phase in self.phases)
+
+    @property
+    def peak(self) -> int:
+        return max((phase.peak for phase in self.phases), default=0)
+
+    def get(self, name: str) -> PhaseStats | None:
+        for phase in self.phases:
+            if phase.name == name:
+                return phase
+        return None
+
+    def table(self) -> str:
+        """Formats the stats as a plain text table, one row per phase"""
+        rows = [("phase", "time (ms)", "peak (KiB)", "counts")]
+        for phase in self.phases:
+            rows.append(
+                (
+                    phase.name,
+                    f"{phase.seconds * 1e3:.2f}",
+                    f"{phase.peak / 1024:.1f}",
+                    " ".join(f"{k}={v}" for k, v in phase.counts.items()),
+                )
+            )
+        rows.append(("total", f"{self.seconds * 1e3:.2f}", f"{self.peak / 1024:.1f}", ""))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(3)]
+        lines: list[str] = []
+        for i, (name, seconds, peak, counts) in enumerate(rows):
+            lines.append(
+                f"{name:<{widths[0]}}  {seconds:>{widths[1]}}  {peak:>{widths[2]}}  {counts}".rstrip()
+            )
+            if i == 0 or i == len(rows) - 2:
+                lines.append("-" * len(lines[0]))
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.table()
+
+
+class Profiler:
+    """Collects `PhaseStats` for every phase it is asked to measure.
+
+    A disabled profiler still hands out `PhaseStats` so that the phases can
+    fill in their counts unconditionally, it just doesn't time them or keep
+    them around.
+
+    With `memory` every allocation of a phase goes through `tracemalloc`,
+    which slows allocation heavy phases down noticeably. Their `seconds`
+    include that overhead, profile with `memory=False` for timings that
+    can be compared with unprofiled builds.
+    """
+
+    __slots__ = ("enabled", "memory", "stats")
+
+    def __init__(self, enabled: bool = True, memory: bool = True) -> None:
+        self.enabled = enabled
+        self.memory = memory
+        self.stats = CompileStats()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        stats = PhaseStats(name)
+        if not self.enabled:
+            yield stats
+            return
+
+        tracing = self.memory
+        started = False
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+
+        begin = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds = time.perf_counter() - begin
+            if tracing:
+                stats.peak = max(tracemalloc.get_traced_memory()[1] - base, 0)
+                if started:
+                    tracemalloc.stop()
+            self.stats.phases.append(stats)
@@ -1,4 +1,5 @@
 from ..pybuilder.builder import *
+from ..pybuilder.graph import GraphIndex as GraphIndex
 from ..pybuilder.loopchecker import *
 from ..pybuilder.main_code import (  # I'll add more soon I feel a little lazy at the moment.
     Int,
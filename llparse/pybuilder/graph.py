@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .main_code import Edge, Node
+
+
+class GraphIndex:
+    """Frozen adjacency index of every node reachable from a builder root.
+
+    Nodes get dense ids in depth-first preorder with the root at `0`. Edges are
+    kept flat in `Node.getAllEdges()` order: the edges of node `i` live at
+    positions `offsets[i]` up to `offsets[i + 1]` of `edges`, `targets` holds
+    the id of the node each one points at and `noAdvance` flags the edges that
+    do not consume input. `otherwise[i]` is the position of the otherwise edge
+    of node `i`, or `-1` when it has none.
+
+    Builder nodes hash by name and names such as "error" repeat all over a
+    grammar, so passes should key their own state by these ids rather than
+    by the nodes themselves. The graph must not be modified while an index
+    built from it is in use.
+    """
+
+    __slots__ = (
+        "root",
+        "nodes",
+        "edges",
+        "offsets",
+        "targets",
+        "noAdvance",
+        "otherwise",
+        "_ids",
+    )
+
+    def __init__(self, root: Node) -> None:
+        self.root = root
+        self.nodes: list[Node] = []
+        self.edges: list[Edge] = []
+        self._ids: dict[int, int] = {}
+
+        ids = self._ids
+        nodes = self.nodes
+        queue = [root]
+        while queue:
+            node = queue.pop()
+            if id(node) in ids:
+                continue
+            ids[id(node)] = len(nodes)
+            nodes.append(node)
+            for edge in reversed(node.getAllEdges()):
+                if id(edge.node) not in ids:
+                    queue.append(edge.node)
+
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.noAdvance = bytearray()
+        self.otherwise = array("l")
+
+        for node in nodes:
+            edges = node.getAllEdges()
+            position = len(self.edges)
+            self.otherwise.append(
+                position + len(edges) - 1 if node.getOtherwiseEdge() else -1
+            )
+            self.edges.extend(edges)
+            self.targets.extend(ids[id(edge.node)] for edge in edges)
+            self.noAdvance.extend(edge.noAdvance for edge in edges)
+            self.offsets.append(len(self.edges))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self.nodes)
+
+    def __contains__(self, node: Node) -> bool:
+        return id(node) in self._ids
+
+    def indexOf(self, node: Node) -> int:
+        """Returns the id of `node`, raises `KeyError` if it is not reachable"""
+        return self._ids[id(node)]
+
+    def edgeRange(self, index: int) -> range:
+        """Positions of the edges belonging to node `index`"""
+        return range(self.offsets[index], self.offsets[index + 1])
+
+    def edgesOf(self, index: int) -> list[Edge]:
+        return self.edges[self.offsets[index] : self.offsets[index + 1]]
+
+    def successors(self, index: int) -> array:
+        """Ids of the nodes node `index` points at, in edge order"""
+        return self.targets[self.offsets[index] : self.offsets[index + 1]]
+
+    def advanceEdges(self, index: int) -> list[int]:
+        """Positions of the edges of node `index` that consume input"""
+        flags = self.noAdvance
+        return [e for e in self.edgeRange(index) if not flags[e]]
+
+    def noAdvanceEdges(self, index: int) -> list[int]:
+        """Positions of the edges of node `index` that do not consume input"""
+        flags = self.noAdvance
+        return [e for e in self.edgeRange(index) if flags[e]]
+
+    def isTerminal(self, index: int) -> bool:
+        return self.offsets[index] == self.offsets[index + 1]
@@ -1,8 +1,10 @@
 import logging
+from collections import deque
 from typing import Any, Literal
 
 from ..errors import Error
-from ..pybuilder.main_code import Node
+from ..pybuilder.graph import GraphIndex
+from ..pybuilder.main_code import Edge, Invoke, Node
 
 logger = logging.getLogger("llparse.pybuilder.loopchecker")
 logger.setLevel(logging.INFO)
@@ -12,133 +14,145 @@ MAX_VALUE = 256
 WORD_SIZE = 32
 SIZE = MAX_VALUE // WORD_SIZE
 WORD_FILL = -1 | 0
+FULL_MASK = (1 << MAX_VALUE) - 1
 
 assert MAX_VALUE % WORD_SIZE == 0
 
 
-# NOTE I think it's theroetically Possible to
-# Put Lattice Class into Cython as an optional replacement
-# for the Sake of speed in the near future once I've
-# figured out everything myself from a more deep brain
-# point of view/prespective... - Vizonex
+class Lattice:
+    """Immutable set of byte values backed by a single 256-bit integer.
 
+    Set operations are plain integer operations and the empty and full
+    lattices are interned, so `Lattice("empty")` and `Lattice("any")` always
+    return `EMPTY_VALUE` and `ANY_VALUE`.
+    """
 
-class Lattice:
-    def __init__(
-        self, value: Any | list[int] | bytes | Literal["empty"] | Literal["any"]
-    ) -> None:
-        self.value = value
-        self.words: list[int] = []
-
-        # allocate space by filling in data with zeros...
-        if value != "any":
-            for _ in range(SIZE):
-                self.words.append(0)
-        else:
-            for _ in range(SIZE):
-                self.words.append(WORD_FILL)
+    __slots__ = ("bits",)
+
+    bits: int
 
+    def __new__(
+        cls, value: Any | list[int] | bytes | Literal["empty"] | Literal["any"]
+    ) -> "Lattice":
+        if isinstance(value, str):
+            if value == "any":
+                return cls.fromBits(FULL_MASK)
+            if value == "empty":
+                return cls.fromBits(0)
+
+        bits = 0
         if isinstance(value, (list, bytes)):
             for single in value:
-                self.add(single)
+                single = ord(single) if isinstance(single, str) else single
+                if not (0 <= single and single < MAX_VALUE):
+                    raise AssertionError("Invalid Bit")
+                bits |= 1 << single
+        return cls.fromBits(bits)
+
+    @classmethod
+    def fromBits(cls, bits: int) -> "Lattice":
+        if bits == 0 and _EMPTY is not None:
+            return _EMPTY
+        if bits == FULL_MASK and _ANY is not None:
+            return _ANY
+        self = object.__new__(cls)
+        object.__setattr__(self, "bits", bits)
+        return self
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Lattice is immutable")
 
     def __iter__(self):
-        for i in range(MAX_VALUE):
-            if self.check(i):
-                yield i
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
 
-    def check(self, bit: int):
-        if not (0 <= bit and bit < MAX_VALUE):
-            raise AssertionError("Invalid Bit")
-        index = (bit // WORD_SIZE) | 0
-        off = bit % WORD_SIZE
-        return self.words[index] & (1 << off) != 0
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Lattice):
+            return NotImplemented
+        return self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
 
-    def add(self, bit: int):
-        bit = ord(bit) if isinstance(bit, str) else bit
+    def check(self, bit: int):
         if not (0 <= bit and bit < MAX_VALUE):
             raise AssertionError("Invalid Bit")
-
-        index = bit // WORD_SIZE
-        off = bit % WORD_SIZE
-
-        self.words[index] |= 1 << off
+        return (self.bits >> bit) & 1 == 1
 
     def union(self, other: "Lattice") -> "Lattice":
-        result = Lattice("empty")
-
-        for i in range(SIZE):
-            result.words[i] = self.words[i] | other.words[i]
-
-        return result
+        bits = self.bits | other.bits
+        if bits == self.bits:
+            return self
+        return Lattice.fromBits(bits)
 
     def intersect(self, other: "Lattice") -> "Lattice":
-        result = Lattice("empty")
-        for i in range(SIZE):
-            result.words[i] = self.words[i] & other.words[i]
-        return result
-
-    def __repr__(self):
-        return f"<Lattice {', '.join(f'{k}: {v!r}' for k, v in self.__dict__.items())}>"
+        bits = self.bits & other.bits
+        if bits == self.bits:
+            return self
+        return Lattice.fromBits(bits)
 
     def subtract(self, other: "Lattice") -> "Lattice":
-        result = Lattice("empty")
-        for i in range(SIZE):
-            result.words[i] = self.words[i] & (~other.words[i])
-        return result
+        bits = self.bits & ~other.bits
+        if bits == self.bits:
+            return self
+        return Lattice.fromBits(bits)
 
     def isEqual(self, other: "Lattice"):
-        if self.toJSON() == other.toJSON():
-            return True
-        else:
-            for i in range(SIZE):
-                if self.words[i] != other.words[i]:
-                    return False
-        return True
+        return self.bits == other.bits
+
+    def isEmpty(self):
+        return self.bits == 0
+
+    @property
+    def words(self) -> list[int]:
+        """The lattice split into `SIZE` words of `WORD_SIZE` bits"""
+        mask = (1 << WORD_SIZE) - 1
+        return [(self.bits >> (i * WORD_SIZE)) & mask for i in range(SIZE)]
+
+    def __repr__(self):
+        return f"<Lattice {self.toJSON()!r}>"
 
     def toJSON(self):
-        isEmpty = True
-        isFull = True
-        for i in range(SIZE):
-            if self.words[i] != 0:
-                isEmpty = False
-            if self.words[i] != WORD_FILL:
-                isFull = False
-        if isEmpty:
+        if self.bits == 0:
             return "empty"
-        if isFull:
+        if self.bits == FULL_MASK:
             return "any"
         return list(self)
 
 
+_EMPTY: Lattice | None = None
+_ANY: Lattice | None = None
+_EMPTY = Lattice.fromBits(0)
+_ANY = Lattice.fromBits(FULL_MASK)
+
+
 class Reachability:
     def __init__(self) -> None:
         return
 
     def build(self, root: Node) -> list[Node]:
-        res: set[Node] = set()
-        queue = [root]
-        while queue:
-            node = queue.pop()
-            if node in res:
-                continue
-            res.add(node)
-            for edge in node:
-                queue.append(edge.node)
-            if otherwise := node.getOtherwiseEdge():
-                queue.append(otherwise.node)
-
-        # Reverse the order so that we always
-        # throw an error on bad configurations...
-        return res
+        return GraphIndex(root).nodes
 
 
-EMPTY_VALUE = Lattice("empty")
-ANY_VALUE = Lattice("any")
+EMPTY_VALUE = _EMPTY
+ANY_VALUE = _ANY
 
 
 class LoopChecker:
-    def __init__(self) -> None:
+    """Detects `noAdvance` loops that could spin forever on some input byte.
+
+    The default engine computes strongly connected components of the
+    `noAdvance` subgraph once and propagates lattices per component, which
+    keeps checking close to linear in the size of the graph. The original
+    per-node fixpoint is still available with `legacy=True` so that both
+    engines can be compared against each other.
+    """
+
+    def __init__(self, legacy: bool = False) -> None:
+        self.legacy = legacy
         self.lattice: dict[Node, Lattice] = {}
         self.terminatedCache: dict[Node, Lattice] = {}
 
@@ -146,7 +160,214 @@ class LoopChecker:
         for node in nodes:
             self.lattice[node] = EMPTY_VALUE
 
-    def check(self, root: Node):
+    def check(self, root: Node, graph: GraphIndex | None = None):
+        if self.legacy:
+            return self.checkLegacy(root)
+
+        if graph is None:
+            graph = GraphIndex(root)
+        nodes = graph.nodes
+
+        # Lattices are handled as their raw `bits` to keep the per-edge work cheap.
+        succ: list[list[tuple[int, int]]] = []
+        alive: list[int] = []
+        for v, node in enumerate(nodes):
+            edges: list[tuple[int, int]] = []
+            terminated = 0
+            for e in graph.edgeRange(v):
+                edge = graph.edges[e]
+                if graph.noAdvance[e]:
+                    edges.append((graph.targets[e], self.edgeFilter(node, edge)))
+                elif edge.key is not None and not isinstance(node, Invoke):
+                    terminated |= self.edgeFilter(node, edge)
+            succ.append(edges)
+            alive.append(FULL_MASK & ~terminated)
+
+        for component in self.components(succ):
+            if len(component) == 1:
+                v = component[0]
+                if not any(w == v for w, _ in succ[v]):
+                    continue
+
+            lattice = self.stabilize(component, succ, alive)
+            if lattice is not None:
+                self.report(nodes, succ, component, lattice)
+
+        logger.debug("no loops detected")
+
+    def edgeFilter(self, node: Node, edge: Edge) -> int:
+        """Bits of the bytes allowed through a `noAdvance` edge"""
+        # Invoke keys are return codes of the callback not input characters
+        if edge.key is None or isinstance(node, Invoke):
+            return FULL_MASK
+        return 1 << (edge.key if isinstance(edge.key, int) else edge.key[0])
+
+    def components(self, succ: list[list[tuple[int, int]]]):
+        """Tarjan's strongly connected components, without recursion"""
+        count = len(succ)
+        index = [-1] * count
+        low = [0] * count
+        onStack = [False] * count
+        stack: list[int] = []
+        counter = 0
+
+        for start in range(count):
+            if index[start] != -1:
+                continue
+
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            onStack[start] = True
+            work = [(start, 0)]
+
+            while work:
+                v, i = work[-1]
+                if i < len(succ[v]):
+                    work[-1] = (v, i + 1)
+                    w = succ[v][i][0]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        onStack[w] = True
+                        work.append((w, 0))
+                    elif onStack[w]:
+                        low[v] = min(low[v], index[w])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+
+                if low[v] == index[v]:
+                    component: list[int] = []
+                    while True:
+                        w = stack.pop()
+                        onStack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    yield component
+
+    def stabilize(
+        self,
+        component: list[int],
+        succ: list[list[tuple[int, int]]],
+        alive: list[int],
+    ) -> dict[int, int] | None:
+        """Shrinks every member of the component to the bytes that can travel
+        around one of its cycles forever, returns `None` if there are none"""
+        members = set(component)
+        preds: dict[int, list[tuple[int, int]]] = {v: [] for v in component}
+        for v in component:
+            for w, edgeFilter in succ[v]:
+                if w in members:
+                    preds[w].append((v, edgeFilter))
+
+        lattice = {v: alive[v] for v in component}
+        queue = deque(sorted(component))
+        queued = set(component)
+        while queue:
+            v = queue.popleft()
+            queued.discard(v)
+
+            incoming = 0
+            for u, edgeFilter in preds[v]:
+                incoming |= lattice[u] & edgeFilter
+
+            value = alive[v] & incoming
+            if value == lattice[v]:
+                continue
+
+            lattice[v] = value
+            for w, _ in succ[v]:
+                if w in members and w not in queued:
+                    queue.append(w)
+                    queued.add(w)
+
+        if not any(lattice.values()):
+            return None
+        return lattice
+
+    def report(
+        self,
+        nodes: list[Node],
+        succ: list[list[tuple[int, int]]],
+        component: list[int],
+        lattice: dict[int, int],
+    ):
+        # Shortest noAdvance paths from the root, used to present the loop the
+        # same way a depth-first walk from the root would have found it
+        parent: dict[int, int] = {0: -1}
+        depth: dict[int, int] = {0: 0}
+        queue = deque([0])
+        while queue:
+            v = queue.popleft()
+            for w, _ in succ[v]:
+                if w not in parent:
+                    parent[w] = v
+                    depth[w] = depth[v] + 1
+                    queue.append(w)
+
+        def distance(v: int) -> tuple[int, int]:
+            return depth.get(v, len(nodes)), v
+
+        value = 0
+        for v in component:
+            value |= lattice[v]
+        bit = value & -value
+
+        def carries(v: int) -> bool:
+            return lattice[v] & bit != 0
+
+        # Every member carrying `bit` has a predecessor carrying it too,
+        # so walking backwards must eventually close a cycle
+        walk: list[int] = []
+        seen: dict[int, int] = {}
+        current = min((v for v in component if carries(v)), key=distance)
+        while current not in seen:
+            seen[current] = len(walk)
+            walk.append(current)
+            for u in component:
+                if not carries(u):
+                    continue
+                if any(w == current and f & bit for w, f in succ[u]):
+                    current = u
+                    break
+
+        start = seen[current]
+        cycle = [walk[start]] + walk[start + 1 :][::-1]
+
+        entry = min(cycle, key=distance)
+        offset = cycle.index(entry)
+        cycle = cycle[offset:] + cycle[:offset]
+
+        if entry == 0:
+            chain = cycle[1:] + [entry]
+        elif entry in parent:
+            prefix: list[int] = []
+            v = entry
+            while parent[v] != -1:
+                prefix.append(v)
+                v = parent[v]
+            chain = prefix[::-1] + cycle[1:]
+        else:
+            chain = cycle
+
+        looped = nodes[chain[0]] if entry == 0 else nodes[entry]
+        if len(chain) == 1:
+            raise Error(f'Detected loop in "{looped.name}" through "{looped.name}"')
+
+        raise Error(
+            'Detected loop in "'
+            + looped.name
+            + '" through chain '
+            + (" -> ").join(['"' + nodes[v].name + '"' for v in chain])
+        )
+
+    def checkLegacy(self, root: Node):
         r = Reachability()
         nodes = r.build(root)
 
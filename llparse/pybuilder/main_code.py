@@ -2,7 +2,9 @@ import re
 import sys
 from dataclasses import dataclass
 from typing import Literal, TypeVar
-from collections.abc import Callable
+from collections.abc import Callable, Hashable, Iterable
+
+from .graph import GraphIndex
 
 if sys.version_info < (3, 10):
     from typing_extensions import ParamSpec
@@ -158,7 +160,7 @@ class Update(FieldValue):
 
 class Value(Code):
     def __init__(self, name: str) -> None:
-        super().__init__("value", name, is_independent=True)
+        super().__init__("value", name, independent=True)
 
 
 # Nodes...
@@ -168,7 +170,14 @@ class Node:
     def __init__(self, name: str) -> None:
         self.name = name
         self.otherwiseEdge: Edge | None = None
+        # Edges are stored in insertion order but handed out newest first,
+        # privKeys indexes their keys for constant time duplicate checks.
         self.privEdges: list[Edge] = []
+        self.privKeys: set[Hashable] = set()
+        # Newest first views of the edges, built on first use and dropped
+        # whenever the edges change so that readers don't allocate
+        self.privView: list[Edge] | None = None
+        self.privAllView: list[Edge] | None = None
 
     def key(self):
         """reversed for sorting to prevent python from creating artificial randomness"""
@@ -181,41 +190,65 @@ class Node:
         if self.otherwiseEdge:
             raise TypeError("Node Already has an 'otherwise' or 'skipto'")
         self.otherwiseEdge = Edge(node, True, None, None)
+        self.privAllView = None
         return self
 
     def skipTo(self, node: "Node"):
         if self.otherwiseEdge:
             raise TypeError("Node Already has an 'otherwise' or 'skipto'")
         self.otherwiseEdge = Edge(node, False, None, None)
+        self.privAllView = None
         return self
 
     def getOtherwiseEdge(self):
         return self.otherwiseEdge
 
     def getEdges(self):
-        """Returns non if object is empty"""
-        return None if self.privEdges == [] else self.privEdges
+        """Returns non if object is empty, the list is shared and must not be changed"""
+        if not self.privEdges:
+            return None
+        if self.privView is None:
+            self.privView = self.privEdges[::-1]
+        return self.privView
 
     def getAllEdges(self):
-        r"Get list of all edges (including otherwise, if present)"
-        res = self.privEdges
-        if not self.otherwiseEdge:
-            return res
-        else:
-            # Concate DO NOT ADD TO RES!!!!
-            return res + [self.otherwiseEdge]
+        """Get list of all edges (including otherwise, if present), the list
+        is shared and must not be changed"""
+        if self.privAllView is None:
+            res = self.privEdges[::-1]
+            if self.otherwiseEdge:
+                res.append(self.otherwiseEdge)
+            self.privAllView = res
+        return self.privAllView
 
     def __iter__(self):
-        if self.privEdges != []:
-            for e in self.privEdges:
-                yield e
+        return reversed(self.privEdges)
+
+    @staticmethod
+    def edgeKey(key: int | bytes | list[int]) -> Hashable:
+        # keys from `.select()` with an integer are lists which can't be hashed
+        return tuple(key) if isinstance(key, list) else key
 
     def addEdge(self, edge: "Edge"):
         assert isinstance(edge.key, (int, str)) or edge.key
 
-        if len(self.privEdges) > 0:
-            assert edge.key not in [e.key for e in self.privEdges]
-        self.privEdges.insert(0, edge)
+        key = self.edgeKey(edge.key)
+        assert key not in self.privKeys
+        self.privKeys.add(key)
+        self.privEdges.append(edge)
+        self.privView = self.privAllView = None
+
+    def addEdges(self, edges: Iterable["Edge"]):
+        """Adds many edges at once, same as calling `addEdge` on each of them"""
+        keys = self.privKeys
+        # Edges added before a failing assert stay, the views must show them
+        self.privView = self.privAllView = None
+        for edge in edges:
+            assert isinstance(edge.key, (int, str)) or edge.key
+            key = self.edgeKey(edge.key)
+            assert key not in keys
+            keys.add(key)
+            self.privEdges.append(edge)
 
 
 # TODO Add strict type checking to \"Pause.__init__\"" parameters to prevent the
@@ -439,8 +472,10 @@ class Match(Node):
         # if isinstance(value,str):
         #     value = value.encode("utf-8")
         if isinstance(value, list) and len(value) > 1:
-            for i in value:
-                self.match(i.encode("utf-8") if isinstance(i, str) else i, next)
+            self.addEdges(
+                Edge(next, False, i.encode("utf-8") if isinstance(i, str) else i, None)
+                for i in value
+            )
             return self
 
         edge = Edge(next, False, value, None)
@@ -505,10 +540,7 @@ class Match(Node):
                 raise AssertionError("Invalid argument count of '.select()'")
 
             next = valueOrNext
-            for numKey, key in keyOrDict.items():
-                # print(f"{key}:{numKey}:{next}")
-                self.select(numKey, keyOrDict[numKey], next)
-
+            self.addEdges(self.selectEdges(keyOrDict, next))
             return self
 
         # select(key,value,next)
@@ -528,6 +560,13 @@ class Match(Node):
         self.addEdge(edge)
         return self
 
+    def selectEdges(self, mapping: dict[str | int, int], next: Node):
+        for key, value in mapping.items():
+            assert isinstance(value, int), (
+                "value Argument should be an integer not, %s" % (type(value).__name__)
+            )
+            yield Edge(next, False, toBuffer(key), int(value))
+
     def getTransform(self):
         return self.transformFn
 
@@ -596,21 +635,4 @@ class Span:
 class Reachability:
     @staticmethod
     def build(root: Node) -> list[Node]:
-        res: set[Node] = set()
-        queue = [root]
-
-        while queue:
-            node = queue.pop()
-            if node in res:
-                continue
-
-            res.add(node)
-
-            for edge in node:
-                queue.append(edge.node)
-
-            otherwise = node.getOtherwiseEdge()
-            if otherwise:
-                queue.append(otherwise.node)
-
-        return list(res)
+        return GraphIndex(root).nodes
@@ -1,3 +1,4 @@
+from ..pybuilder.graph import GraphIndex
 from ..pybuilder.main_code import Edge, Node
 
 
@@ -6,24 +7,10 @@ class ParserMap:
         self.root = root
 
     def Jsonize(self):
-        queue = [self.root]
-        seen: set[Node] = set()
-        while queue:
-            node = queue.pop()
-
-            if node in seen:
-                continue
-
-            seen.add(node)
-
-            for edge in node:
-                queue.append(edge.node)
-
-            otherwise = node.getOtherwiseEdge()
-            if otherwise:
-                queue.append(otherwise.node)
-
-        return [(s.__dict__, list(map(self.get_edges, s))) for s in seen]
+        return [
+            (s.__dict__, list(map(self.get_edges, s)))
+            for s in GraphIndex(self.root)
+        ]
 
     def get_edges(self, edge: Edge):
         if not edge:
@@ -35,19 +22,4 @@ class ParserMap:
 
 def traverse(root: Node):
     """Built for traversing through all implemented llparse nodes"""
-
-    queue = [root]
-    seen: set[Node] = set()
-    while queue:
-        node = queue.pop()
-        if node in seen:
-            continue
-
-        seen.add(node)
-
-        for edge in node:
-            queue.append(edge.node)
-
-        if otherwise := node.getOtherwiseEdge():
-            queue.append(otherwise.node)
-    yield from seen
+    yield from GraphIndex(root)
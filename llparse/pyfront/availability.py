@@ -0,0 +1,117 @@
+from collections.abc import Iterator
+
+from .code import IWrap
+from .nodes import (
+    Empty,
+    Int,
+    Invoke,
+    Node,
+    Pause,
+    Sequence,
+    Single,
+    SpanEnd,
+    SpanStart,
+    TableLookup,
+)
+
+# Nodes that have checked for a byte of input before taking any of their
+# `noAdvance` edges
+CHECKING = (Single, TableLookup, SpanStart)
+# Nodes that never look at the input, their `noAdvance` edges carry a byte
+# whenever every way into them does
+PASSING = (Invoke, SpanEnd, Empty)
+
+
+def hasPrologue(node: Node) -> bool:
+    """Whether the state of `node` starts with the `p == endp` check"""
+    if isinstance(node, Empty):
+        return node.otherwise is not None and not node.otherwise.noAdvance
+    return isinstance(node, (Single, TableLookup, SpanStart, Sequence, Int))
+
+
+def edgesOf(node: Node) -> Iterator[tuple[Node, bool]]:
+    """The states `node` jumps to and whether each jump leaves `p` alone"""
+    if isinstance(node, Single):
+        for e in node.edges:
+            yield e.node.ref, e.noAdvance
+    elif isinstance(node, TableLookup):
+        for e in node.privEdges:
+            yield e.node.ref, e.noAdvance
+    elif isinstance(node, Invoke):
+        for e in node.edges():
+            yield e.node.ref, True
+    elif isinstance(node, Sequence):
+        yield node.Edge.node.ref, False
+
+    # A pause only stores its target to resume at
+    if node.otherwise and not isinstance(node, Pause):
+        yield node.otherwise.node.ref, node.otherwise.noAdvance
+
+
+class InputAvailability:
+    """Finds the jumps between states that are known to leave a byte of
+    input at `p`, so that their targets can skip their `p == endp` check.
+
+    Peeks, invokes, span ends and empties that don't advance hand over
+    whatever the state before them proved. A passing node only has input
+    when every jump into it carries some and it is never resumed at, which
+    is found by dropping nodes from the optimistic set until nothing changes.
+    """
+
+    __slots__ = ("passing", "entered")
+
+    def __init__(self, root: IWrap[Node]) -> None:
+        nodes: dict[int, Node] = {id(root.ref): root.ref}
+        queue = [root.ref]
+        # States that `_execute` may start at with no input at all
+        resumed = {id(root.ref)}
+        while queue:
+            node = queue.pop()
+            if isinstance(node, (Pause, SpanEnd)) and node.otherwise:
+                resumed.add(id(node.otherwise.node.ref))
+            for target, _ in edgesOf(node):
+                if id(target) not in nodes:
+                    nodes[id(target)] = target
+                    queue.append(target)
+
+        incoming: dict[int, list[tuple[Node, bool]]] = {key: [] for key in nodes}
+        for node in nodes.values():
+            for target, noAdvance in edgesOf(node):
+                incoming[id(target)].append((node, noAdvance))
+
+        self.passing: set[int] = {
+            key
+            for key, node in nodes.items()
+            if isinstance(node, PASSING) and key not in resumed and incoming[key]
+        }
+
+        changed = True
+        while changed:
+            changed = False
+            for key in list(self.passing):
+                if not all(self.carries(src, na) for src, na in incoming[key]):
+                    self.passing.discard(key)
+                    changed = True
+
+        self.entered: set[int] = {
+            key
+            for key, node in nodes.items()
+            if hasPrologue(node) and any(self.carries(src, na) for src, na in incoming[key])
+        }
+
+    def hasInput(self, node: Node) -> bool:
+        """Whether every way into the passing `node` leaves a byte at `p`"""
+        return id(node) in self.passing
+
+    def carries(self, node: Node, noAdvance: bool) -> bool:
+        """Whether a jump out of `node` that did or didn't advance still has
+        a byte at `p`"""
+        if not noAdvance:
+            return False
+        if isinstance(node, CHECKING):
+            return True
+        return isinstance(node, PASSING) and self.hasInput(node)
+
+    def enteredWithInput(self, node: Node) -> bool:
+        """Whether some jump into `node` can skip its `p == endp` check"""
+        return id(node) in self.entered
@@ -191,14 +191,21 @@ class Identifier:
     prefix: str
     postfix: str = ""
     ns: set[str] = field(default_factory=set, init=False)
+    counters: dict[str, int] = field(default_factory=dict, init=False)
 
     def id(self, name: str) -> IUniqueName:
         target = self.prefix + name + self.postfix
+
         if target in self.ns:
-            i = 0
-            for i in range(1, len(self.ns)):
-                if (target + f"_{i}") not in self.ns:
-                    break
+            if len(self.ns) == 1:
+                i = 0
+            else:
+                # Names are never released so every suffix below the counter
+                # is still taken, resume the scan from there.
+                i = self.counters.get(target, 1)
+                while f"{target}_{i}" in self.ns:
+                    i += 1
+                self.counters[target] = i + 1
 
             target += f"_{i}"
 
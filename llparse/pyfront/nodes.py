@@ -51,16 +51,19 @@ class Identifier:
     prefix: str = ""
     postfix: str = ""
     ns: set[str] = field(default_factory=set, init=False)
+    counters: dict[str, int] = field(default_factory=dict, init=False)
 
     def id(self, name: str):
         """Creates a Unique name for the switches"""
         target = self.prefix + name + self.postfix
 
         if target in self.ns:
-            i = 1
-            for i in range(1, len(self.ns)):
-                if (target + f"_{i}") not in self.ns:
-                    break
+            # Names are never released so every suffix below the counter
+            # is still taken, resume the scan from there.
+            i = self.counters.get(target, 1)
+            while (target + f"_{i}") in self.ns:
+                i += 1
+            self.counters[target] = i + 1
             target += f"_{i}"
 
         self.ns.add(target)
@@ -235,7 +238,7 @@ class Single(Match):
     def buildSlots(self):
         for edge in self.privEdges:
             yield Slot(edge.node, edge.node)
-        return super().buildSlots()
+        yield from super().buildSlots()
 
 
 @dataclass
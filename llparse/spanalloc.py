@@ -1,10 +1,18 @@
+from collections import deque
 from dataclasses import dataclass, field
+from typing import Literal
 
 from .errors import Error
-from .pybuilder.main_code import Node, Reachability, Span, SpanEnd, SpanStart
+from .pybuilder.graph import GraphIndex
+from .pybuilder.main_code import Node, Span, SpanEnd, SpanStart
 
 SpanSet = set[Span]
 
+EXACT_COLORING_LIMIT = 16
+"""Largest number of spans colored with an exact search on top of DSATUR"""
+EXACT_COLORING_STEPS = 100_000
+"""Search steps the exact coloring may take before settling for the best found"""
+
 
 def _id(node: SpanStart | SpanEnd) -> Span:
     return node.span
@@ -12,7 +20,8 @@ def _id(node: SpanStart | SpanEnd) -> Span:
 
 @dataclass
 class ISpanActiveInfo:
-    active: dict[Node, SpanSet] = field(default_factory=dict)
+    active: list[SpanSet] = field(default_factory=list)
+    """Spans active at each node, indexed by the node's id in the graph"""
     spans: list[Span] = field(default_factory=list)
 
 
@@ -27,73 +36,92 @@ class ISpanAllocatorResult:
 
 
 class SpanAllocator:
-    __slots__ = ("_mx", "_colors", "_overlapMap")
+    """Assigns every span a slot in the parser state, letting spans that are
+    never active at the same time share one.
+
+    The default `"greedy"` mode is a direct port of llparse. The `"dsatur"`
+    mode tracks active spans as integer bitsets and colors the overlap graph
+    with DSATUR, searching for an exact minimum when there are few spans, so
+    that the state struct gets as few `_span_pos`/`_span_cb` slots as possible.
+    """
+
+    __slots__ = ("_mx", "_colors", "_overlapMap", "mode")
 
-    def __init__(self) -> None:
-        return
+    def __init__(self, mode: Literal["greedy", "dsatur"] = "greedy") -> None:
+        if mode not in ("greedy", "dsatur"):
+            raise ValueError(f"Unknown span allocation mode {mode!r}")
+        self.mode = mode
 
-    def allocate(self, root: Node):
-        nodes = Reachability.build(root)
-        info = self.computeActive(nodes)
+    def allocate(self, root: Node, graph: GraphIndex | None = None):
+        if graph is None:
+            graph = GraphIndex(root)
 
-        self.check(info)
+        if self.mode == "dsatur":
+            active, ends, spans = self.computeActiveBits(graph)
+            self.checkBits(graph, active, ends, spans)
+            overlap = self.computeOverlapBits(active, len(spans))
+            return self.colorDSatur(spans, overlap)
+
+        info = self.computeActive(graph)
+
+        self.check(info, graph)
         overlap = self.computeOverlap(info)
         return self.color(info.spans, overlap)
 
-    def check(self, info: ISpanActiveInfo):
-        for node, spans in info.active.items():
-            for edge in node.getAllEdges():
-                if isinstance(edge.node, SpanStart):
+    def check(self, info: ISpanActiveInfo, graph: GraphIndex):
+        nodes = graph.nodes
+        for index, spans in enumerate(info.active):
+            node = nodes[index]
+            for e in graph.edgeRange(index):
+                target = graph.targets[e]
+                edgeNode = nodes[target]
+                if isinstance(edgeNode, SpanStart):
                     continue
 
                 # Skip terminal nodes
-                # print(len(edge.node.getAllEdges()))
-                # print(info.active)
-                if len(edge.node.getAllEdges()) == 0:
+                if graph.isTerminal(target):
                     continue
 
-                # assert node.name != edge.node.name
-                # print("checking edge from %s to %s" % (node.name,edge.node.name))
-                # check edge
-
-                edgeSpans: set[Span] = info.active[edge.node]
-                # print("SPAN:%s  NODE:%s" % (edgeSpans,edge.node.__dict__))
+                edgeSpans: set[Span] = info.active[target]
                 for subSpan in edgeSpans:
                     if subSpan not in spans:
                         raise Error(
                             f'unmatched span end for "{subSpan.callback.name}"'
-                            f'at "{edge.node.name}", coming from "{node.name}"'
+                            f'at "{edgeNode.name}", coming from "{node.name}"'
                         )
 
-                if isinstance(edge.node, SpanEnd):
-                    span = _id(edge.node)
+                if isinstance(edgeNode, SpanEnd):
+                    span = _id(edgeNode)
                     if span not in spans:
                         raise Error(f'unmatched span end for "{span.callback.name}"')
 
-    def computeActive(self, nodes: list[Node]) -> ISpanActiveInfo:
-        activeMap: dict[Node, SpanSet] = {}
-        for node in nodes:
-            activeMap[node] = set()
+    def computeActive(self, graph: GraphIndex) -> ISpanActiveInfo:
+        nodes = graph.nodes
+        targets = graph.targets
+        activeMap: list[SpanSet] = [set() for _ in nodes]
 
-        queue = set(nodes)
+        queue = set(range(len(nodes)))
         spans: SpanSet = set()
         # This fixes an issue when using a for loop which unlike in typescript
         # we cannot remove items when in a for-loop in python this also ensures
         # that all spans are visited.
         while queue:
-            node = queue.pop()
-            active = activeMap[node]
+            index = queue.pop()
+            node = nodes[index]
+            active = activeMap[index]
             if isinstance(node, SpanStart):
                 span = _id(node)
                 spans.add(span)
                 active.add(span)
 
             for span in active:
+                # Don't propagate a span past its own end
                 if isinstance(node, SpanEnd) and span == _id(node):
-                    break
+                    continue
 
-                for edge in node.getAllEdges():
-                    edgeNode = edge.node
+                for e in graph.edgeRange(index):
+                    target = targets[e]
+                    edgeNode = nodes[target]
 
                     if isinstance(edgeNode, SpanStart):
                         if _id(edgeNode) == span:
@@ -101,12 +129,12 @@ class SpanAllocator:
                                 f'Detected loop in span {span.callback.name} at "{node.name}"'
                             )
 
-                    edgeActive = activeMap[edgeNode]
+                    edgeActive = activeMap[target]
                     if span in edgeActive:
-                        break
+                        continue
 
                     edgeActive.add(span)
-                    queue.add(edgeNode)
+                    queue.add(target)
 
         return ISpanActiveInfo(active=activeMap, spans=list(spans))
 
@@ -114,7 +142,7 @@ class SpanAllocator:
         active = info.active
 
         overlap: dict[Span, set[Span]] = {span: set() for span in info.spans}
-        for spans in active.values():
+        for spans in active:
             for one in spans:
                 for other in spans:
                     if other != one:
@@ -159,5 +187,203 @@ class SpanAllocator:
             concurrency[self._allocate(s)].append(s)
         return ISpanAllocatorResult(colors, concurrency, self._mx)
 
+    def computeActiveBits(
+        self, graph: GraphIndex
+    ) -> tuple[list[int], list[int], list[Span]]:
+        """Same as `computeActive` but with the spans of each node as a bitset,
+        bit `i` standing for the `i`-th span of the returned list. Also returns
+        the bit of the span each `SpanEnd` node closes"""
+        nodes = graph.nodes
+        targets = graph.targets
+
+        spans: list[Span] = []
+        bits: dict[Span, int] = {}
+        starts = [0] * len(nodes)
+        ends = [0] * len(nodes)
+
+        def bit(span: Span) -> int:
+            if span not in bits:
+                bits[span] = 1 << len(spans)
+                spans.append(span)
+            return bits[span]
+
+        for index, node in enumerate(nodes):
+            if isinstance(node, SpanStart):
+                starts[index] = bit(_id(node))
+
+        # Ends without any start are never active, they only need to be told apart
+        started = len(spans)
+        for index, node in enumerate(nodes):
+            if isinstance(node, SpanEnd):
+                ends[index] = bit(_id(node))
+
+        active = starts[:]
+        queue = deque(index for index, mask in enumerate(active) if mask)
+        queued = bytearray(len(nodes))
+        for index in queue:
+            queued[index] = 1
+
+        while queue:
+            index = queue.popleft()
+            queued[index] = 0
+
+            # Don't propagate a span past its own end
+            mask = active[index] & ~ends[index]
+            if not mask:
+                continue
+
+            for e in graph.edgeRange(index):
+                target = targets[e]
+                if mask & starts[target]:
+                    span = spans[starts[target].bit_length() - 1]
+                    raise Error(
+                        f'Detected loop in span {span.callback.name} at "{nodes[index].name}"'
+                    )
+
+                added = mask & ~active[target]
+                if added:
+                    active[target] |= added
+                    if not queued[target]:
+                        queued[target] = 1
+                        queue.append(target)
+
+        return active, ends, spans[:started]
+
+    def checkBits(
+        self, graph: GraphIndex, active: list[int], ends: list[int], spans: list[Span]
+    ):
+        nodes = graph.nodes
+        for index, mask in enumerate(active):
+            for e in graph.edgeRange(index):
+                target = graph.targets[e]
+                edgeNode = nodes[target]
+                if isinstance(edgeNode, SpanStart):
+                    continue
+
+                # Skip terminal nodes
+                if graph.isTerminal(target):
+                    continue
+
+                missing = active[target] & ~mask
+                if missing:
+                    subSpan = spans[(missing & -missing).bit_length() - 1]
+                    raise Error(
+                        f'unmatched span end for "{subSpan.callback.name}"'
+                        f'at "{edgeNode.name}", coming from "{nodes[index].name}"'
+                    )
+
+                if ends[target] & ~mask:
+                    span = _id(edgeNode)
+                    raise Error(f'unmatched span end for "{span.callback.name}"')
+
+    def computeOverlapBits(self, active: list[int], count: int) -> list[int]:
+        """Bitset of the spans each span is ever active together with"""
+        overlap = [0] * count
+        # Many nodes share the same set of active spans
+        for mask in set(active):
+            rest = mask
+            while rest:
+                low = rest & -rest
+                overlap[low.bit_length() - 1] |= mask
+                rest ^= low
+
+        for i in range(count):
+            overlap[i] &= ~(1 << i)
+        return overlap
+
+    def dsatur(self, overlap: list[int]) -> list[int]:
+        """Colors the overlap graph picking the span with the most differently
+        colored neighbours first, ties going to the most neighbours"""
+        count = len(overlap)
+        colors = [-1] * count
+        used = [0] * count
+        degree = [mask.bit_count() for mask in overlap]
+
+        for _ in range(count):
+            v = max(
+                (u for u in range(count) if colors[u] == -1),
+                key=lambda u: (used[u].bit_count(), degree[u], -u),
+            )
+            free = ~used[v] & (used[v] + 1)
+            color = free.bit_length() - 1
+            colors[v] = color
+
+            rest = overlap[v]
+            while rest:
+                low = rest & -rest
+                used[low.bit_length() - 1] |= 1 << color
+                rest ^= low
+
+        return colors
+
+    def exactColoring(self, overlap: list[int], colors: list[int]) -> list[int]:
+        """Keeps trying to use one color less than `colors` does until
+        that is proven impossible or the search runs out of steps"""
+        budget = [EXACT_COLORING_STEPS]
+        while colors:
+            limit = max(colors)
+            if limit == 0:
+                break
+
+            attempt = [-1] * len(overlap)
+            if not self._search(overlap, attempt, limit, budget):
+                break
+            colors = attempt
+        return colors
+
+    def _search(
+        self, overlap: list[int], colors: list[int], limit: int, budget: list[int]
+    ) -> bool:
+        v = -1
+        vUsed = 0
+        vKey = (-1, -1)
+        for u, color in enumerate(colors):
+            if color != -1:
+                continue
+
+            used = 0
+            rest = overlap[u]
+            while rest:
+                low = rest & -rest
+                c = colors[low.bit_length() - 1]
+                if c != -1:
+                    used |= 1 << c
+                rest ^= low
+
+            key = (used.bit_count(), overlap[u].bit_count())
+            if key > vKey:
+                v, vUsed, vKey = u, used, key
+
+        if v == -1:
+            return True
+
+        # Colors are interchangeable so never open more than one new color
+        top = min(limit, max(colors) + 2)
+        for color in range(top):
+            if vUsed & (1 << color):
+                continue
+            budget[0] -= 1
+            if budget[0] < 0:
+                break
+            colors[v] = color
+            if self._search(overlap, colors, limit, budget):
+                return True
+
+        colors[v] = -1
+        return False
+
+    def colorDSatur(self, spans: list[Span], overlap: list[int]) -> ISpanAllocatorResult:
+        slots = self.dsatur(overlap)
+        if len(spans) <= EXACT_COLORING_LIMIT:
+            slots = self.exactColoring(overlap, slots)
+
+        mx = max(slots, default=-1)
+        colors = {span: slots[i] for i, span in enumerate(spans)}
+
+        concurrency: list[list[Span]] = [[] for _ in range(mx + 1)]
+        for s in sorted(spans, key=lambda s: s.callback.name):
+            concurrency[colors[s]].append(s)
+        return ISpanAllocatorResult(colors, concurrency, mx)
+
 
 # TODO (Vizonex) Use Indutny's Mini Http parser to help with testing ours to verify that ours is correct...
@@ -5,7 +5,7 @@ from .pybuilder.main_code import Edge, Node
 
 
 @total_ordering
-@dataclass
+@dataclass(slots=True)
 class IEdge:
     # NOTE THIS SHOULD BE STRICTLY BYTES !!!
     key: bytes
@@ -17,37 +17,37 @@ class IEdge:
         return self.key < object.key
 
 
-@dataclass
+@dataclass(slots=True)
 class TrieNode:
     """Mainly Used as an Abstract Object for typing"""
 
 
-@dataclass
+@dataclass(slots=True)
 class TrieSequence(TrieNode):
     select: bytes
     child: TrieNode
 
 
-@dataclass
+@dataclass(slots=True)
 class ITrieSingleChild:
     key: int
     noAdvance: bool
     node: TrieNode
 
 
-@dataclass
+@dataclass(slots=True)
 class TrieEmpty(TrieNode):
     node: Node
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TrieSingle(TrieNode):
     children: list[ITrieSingleChild]
     otherwise: TrieEmpty | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Trie:
     name: str
 
@@ -57,98 +57,103 @@ class Trie:
         internalEdges: list[IEdge] = []
 
         for edge in edges:
-            key = chr(edge.key) if isinstance(edge.key, int) else edge.key
+            # Integer keys are raw bytes, `chr(key).encode()` would turn
+            # anything above 0x7F into two bytes
+            key = bytes((edge.key,)) if isinstance(edge.key, int) else edge.key
             internalEdges.append(
                 IEdge(
-                    key=key.encode("utf-8") if isinstance(key, str) else key,
+                    key=key.encode("utf-8") if isinstance(key, str) else bytes(key),
                     noAdvance=edge.noAdvance,
                     node=edge.node,
                     value=edge.value,
                 )
             )
 
-        return self.level(internalEdges)
+        # Every level of the trie is a range of this one sorted list, with
+        # the keys read from `depth` onwards instead of being sliced
+        internalEdges.sort()
+        return self.level(internalEdges, 0, len(internalEdges), 0, [])
 
-    def level(self, edges: list[IEdge], path: list[bytes] = []):
-        first = edges[0].key
-        last = edges[-1].key
-        # print("level", edges, first)
-        if len(edges) == 1 and (not len(edges[0].key)):
-            return TrieEmpty(edges[0].node, edges[0].value)
+    def level(
+        self, edges: list[IEdge], start: int, end: int, depth: int, path: list[bytes]
+    ) -> TrieNode:
+        first = edges[start].key
+        last = edges[end - 1].key
+        if end - start == 1 and len(first) == depth:
+            return TrieEmpty(edges[start].node, edges[start].value)
 
-        i = 0
-        for i in range(len(first)):
-            if first[i] != last[i]:
-                break
+        # Keys are sorted so the prefix shared by the first and the last
+        # key is shared by the whole range
+        limit = min(len(first), len(last))
+        i = depth
+        while i < limit and first[i] == last[i]:
+            i += 1
 
-        if i > 1:
-            # NOTE I think Indutny intended for these sequences
-            # to advance otherwise not having this would result in a recursion error
-            # This is why first[:i] is used and not first[0:count] like in typescript...
-            return self.sequence(edges, first[: i + 1], path)
+        # Sequence must be longer than a single character
+        if i - depth > 1:
+            return self.sequence(edges, start, end, depth, i, path)
 
-        return self.single(edges, path)
-
-    def slice(self, edges: list[IEdge], off: int):
-        _slice = [
-            IEdge(edge.key[off:], edge.node, edge.noAdvance, edge.value)
-            for edge in edges
-        ]
-        return sorted(_slice, key=lambda k: k.key)
+        return self.single(edges, start, end, depth, path)
 
     def sequence(
-        self, edges: list[IEdge], prefix: bytes, path: list[bytes]
+        self,
+        edges: list[IEdge],
+        start: int,
+        end: int,
+        depth: int,
+        to: int,
+        path: list[bytes],
     ) -> TrieSequence:
-        sliced = self.slice(edges, len(prefix))
-        assert not any([edge.noAdvance for edge in edges])
-        child = self.level(sliced, path + [prefix])
+        assert not any(edges[e].noAdvance for e in range(start, end))
+        prefix = edges[start].key[depth:to]
+
+        path.append(prefix)
+        child = self.level(edges, start, end, to, path)
+        path.pop()
         return TrieSequence(prefix, child)
 
-    def single(self, edges: list[IEdge], path: list[bytes]) -> TrieSingle:
-        if not len(edges[0].key):
-            assert not path, f'Empty root entry at "{self.name}"'
-            assert not (len(edges) == 1 or len(edges[1].key) != 0), (
+    def single(
+        self, edges: list[IEdge], start: int, end: int, depth: int, path: list[bytes]
+    ) -> TrieSingle:
+        otherwise = None
+        if len(edges[start].key) == depth:
+            assert path, f'Empty root entry at "{self.name}"'
+            assert end - start == 1 or len(edges[start + 1].key) != depth, (
                 f'Duplicate entries in "{self.name}" at: ['
                 + (b", ".join(path).decode("utf-8"))
                 + "]"
             )
-
-        keys: dict[int, list[IEdge]] = {}
-        otherwise = None
-        for edge in edges:
-            if not edge.key:
-                otherwise = TrieEmpty(edge.node, edge.value)
-                continue
-
-            key = edge.key[0]
-
-            if key in keys:
-                keys[key].append(edge)
-            else:
-                keys[key] = [edge]
+            otherwise = TrieEmpty(edges[start].node, edges[start].value)
+            start += 1
 
         children: list[ITrieSingleChild] = []
 
-        for key, subEdges in keys.items():
-            # TODO LOG FUNCTION's ARGUMENTS TO DETERMINE WEATHER OR NOT IT'S the Problem...
-            # I think this maybe the problem now that I think about it...
-            sliced = self.slice(subEdges, 1)
+        i = start
+        while i < end:
+            key = edges[i].key[depth]
+            noAdvance = edges[i].noAdvance
+            allSame = True
 
-            subPath = path + [chr(key).encode("utf-8")]
+            j = i + 1
+            while j < end and edges[j].key[depth] == key:
+                allSame = allSame and edges[j].noAdvance == noAdvance
+                j += 1
 
-            noAdvance = any([e.noAdvance for e in subEdges])
-            allSame = all([e.noAdvance == noAdvance for e in subEdges])
-
-            if not (allSame or len(subEdges) == 0):
+            path.append(chr(key).encode("utf-8"))
+            if not allSame:
                 err = (
                     f'Conflicting `.peek` and `.match` entries in "{self.name}" at: ['
-                    + (b", ".join(subPath).decode("utf-8"))
+                    + (b", ".join(path).decode("utf-8"))
                     + "]"
                 )
                 raise TypeError(err)
 
             children.append(
-                ITrieSingleChild(key, noAdvance, self.level(sliced, subPath))
+                ITrieSingleChild(
+                    key, noAdvance, self.level(edges, i, j, depth + 1, path)
+                )
             )
+            path.pop()
+            i = j
 
         return TrieSingle(children, otherwise)
@@ -0,0 +1,396 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from llparse import LLParse
+
+CC = shutil.which("cc") or shutil.which("gcc")
+
+DRIVER = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include "{prefix}.h"
+
+typedef {prefix}_t parser_t;
+
+static void event(const char* name, const char* p, const char* endp) {{
+  printf("%s[", name);
+  fwrite(p, 1, endp - p, stdout);
+  printf("] ");
+}}
+
+{callbacks}
+
+int main(int argc, char** argv) {{
+  static char buf[1 << 22];
+  size_t len = fread(buf, 1, sizeof(buf), stdin);
+  size_t chunk = argc > 1 ? (size_t) atol(argv[1]) : 0;
+  size_t off = 0;
+  parser_t s;
+
+  if (chunk == 0) {{
+    chunk = len;
+  }}
+
+  {prefix}_init(&s);
+  do {{
+    size_t n = len - off < chunk ? len - off : chunk;
+    int err = {prefix}_execute(&s, buf + off, buf + off + n);
+    if (err != 0) {{
+      printf("error=%d reason=\"%s\" pos=%ld ", err, s.reason, (long) (s.error_pos - buf));
+      if (err != {resume}) {{
+        break;
+      }}
+      /* Pauses resume where they stopped */
+      s.error = 0;
+      off = s.error_pos - buf;
+      continue;
+    }}
+    off += n;
+  }} while (off < len);
+  {fields}
+  printf("\n");
+  return 0;
+}}
+"""
+
+
+class CParser:
+    """A parser compiled together with `DRIVER`, every callback prints what
+    it was called with so that runs can be compared with each other"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def run(self, data: bytes, chunk: int = 0) -> str:
+        res = subprocess.run(
+            [str(self.path), str(chunk)], input=data, capture_output=True, check=True
+        )
+        return res.stdout.decode("latin-1")
+
+
+@pytest.fixture()
+def compile_parser(tmp_path: Path):
+    """Builds `root` with llparse and compiles the result with the system C compiler,
+    the driver resumes after errors with the code `resume` as if they were pauses"""
+    if CC is None:
+        pytest.skip("No C compiler available")
+
+    count = 0
+
+    def compile(
+        p: LLParse,
+        root,
+        spans: list[str] = [],
+        matches: list[str] = [],
+        values: list[str] = [],
+        fields: str = "",
+        cflags: list[str] = [],
+        resume: int = 0,
+        **options,
+    ) -> CParser:
+        nonlocal count
+        count += 1
+        out = tmp_path / str(count)
+        out.mkdir()
+
+        res = p.build(root, **options)
+        (out / f"{p.prefix}.c").write_text(res.c)
+        (out / f"{p.prefix}.h").write_text(res.header)
+
+        callbacks: list[str] = []
+        for name in spans:
+            callbacks.append(
+                f"int {name}(parser_t* s, const char* p, const char* endp) "
+                f'{{ event("{name}", p, endp); return 0; }}'
+            )
+        for name in matches:
+            callbacks.append(
+                f"int {name}(parser_t* s, const char* p, const char* endp) "
+                f'{{ printf("{name} "); return 0; }}'
+            )
+        for name in values:
+            callbacks.append(
+                f"int {name}(parser_t* s, const char* p, const char* endp, int value) "
+                f'{{ printf("{name}=%d ", value); return 0; }}'
+            )
+
+        (out / "driver.c").write_text(
+            DRIVER.format(
+                prefix=p.prefix,
+                callbacks="\n".join(callbacks),
+                fields=fields,
+                resume=resume,
+            )
+        )
+        binary = out / "parser"
+        subprocess.run(
+            [CC, "-O2", "-w", *cflags, "-I", str(out), "-o", str(binary),
+             str(out / "driver.c"), str(out / f"{p.prefix}.c")],
+            check=True,
+        )
+        return CParser(binary)
+
+    return compile
+
+
+def pairs_parser(pause: bool = False) -> tuple[LLParse, object]:
+    """`key=value` pairs separated by `;` or newlines, with `pause` a `!`
+    between pairs pauses the parser"""
+    p = LLParse("lltest")
+    p.property("i8", "kind")
+    start = p.node("start")
+    key = p.node("key")
+    equals = p.node("equals")
+    value = p.node("value")
+    separator = p.node("separator")
+    keySpan = p.span(p.code.span("on_key"))
+    valueSpan = p.span(p.code.span("on_value"))
+
+    letters = list("abcdefghijklmnopqrstuvwxyz")
+    onKey = p.invoke(p.code.match("on_pair"), {0: keySpan.end(equals)}, p.error(1, "on_pair"))
+    onValue = p.invoke(p.code.store("kind"), valueSpan.end(separator))
+    onSeparator = p.invoke(p.code.value("on_separator"), {0: start}, p.error(7, "on_separator"))
+
+    start.match("\n", start)
+    if pause:
+        start.match("!", p.pause(8, "paused").otherwise(start))
+    start.peek(letters, keySpan.start(key)).otherwise(p.error(2, "bad key"))
+    key.match(letters, key).peek("=", onKey).otherwise(p.error(3, "bad key"))
+    equals.match("=", valueSpan.start(value)).otherwise(p.error(4, "missing ="))
+    value.select({"1": 1, "2": 2, "3": 3}, onValue).otherwise(p.error(5, "bad value"))
+    separator.select({";": 1, "\n": 2}, onSeparator).otherwise(p.error(6, "bad separator"))
+    return p, start
+
+
+def lines_parser(pause: bool = False) -> tuple[LLParse, object]:
+    """Reports every line, a `?` is an error and with `pause` a `!` pauses
+    the parser"""
+    p = LLParse("lltest")
+    start = p.node("start")
+    line = p.node("line")
+    lineSpan = p.span(p.code.span("on_line"))
+
+    ends = ["\n", "?"]
+    start.match("\n", start).match("?", p.error(2, "bad"))
+    if pause:
+        ends.append("!")
+        start.match("!", p.pause(8, "ack").otherwise(start))
+    start.otherwise(lineSpan.start(line))
+    line.peek(ends, lineSpan.end(start)).skipTo(line)
+    return p, start
+
+
+def value_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    value = p.node("value")
+    eol = p.node("eol")
+    span = p.span(p.code.span("on_value"))
+
+    chars = [chr(c) for c in range(0x20, 0x7F) if c != ord(",")]
+    chars += ["\t"] + list(range(0xA0, 0xB0))
+    start.match("\n", start).otherwise(span.start(value))
+    value.match(chars, value).otherwise(span.end(eol))
+    eol.match("\n", start).otherwise(p.error(1, "bad"))
+    return p, start
+
+
+def spaces_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    spaces = p.node("spaces")
+    word = p.node("word")
+    tail = p.node("tail")
+    span = p.span(p.code.span("on_word"))
+
+    # Few enough keys for a `Single` switch, with bytes on both halves
+    blank = [" ", "\t", 0xFE, 0xFF]
+    start.match(["\n", ","], start).match(blank, spaces).otherwise(span.start(word))
+    spaces.match(blank, spaces).match(":", start).otherwise(span.start(word))
+    word.match([chr(c) for c in range(0x21, 0x7F) if c != ord(":")], word).otherwise(
+        span.end(tail)
+    )
+    tail.match(["\n", ","], start).match(blank, spaces).otherwise(
+        p.error(1, "unexpected byte")
+    )
+    return p, start
+
+
+def sequence_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    lower = p.node("lower")
+    unsafe = p.node("unsafe")
+    rest = p.node("rest")
+    error = p.error(1, "no match")
+
+    start.match("HTTP/1.1 ", rest).match("lower ", lower).match(
+        "unsafe ", unsafe
+    ).otherwise(error)
+    # Sequences of 2 to 20 bytes, long enough to exercise every word size
+    lower.transform(p.transform.toLower()).match(
+        ["content-length:", "transfer-encoding:", "ab", "xyz"], rest
+    ).match("connection:keep-alive", rest).otherwise(error)
+    unsafe.transform(p.transform.toLowerUnsafe()).match(
+        ["upgrade:", "keep-alive"], rest
+    ).otherwise(error)
+    rest.match("\n", start).skipTo(rest)
+    return p, start
+
+
+def table_parser(targets: int) -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    error = p.error(1, "no match")
+
+    # Every target gets its own set of letters and reports itself
+    letters = [chr(c) for c in range(ord("A"), ord("Z") + 1)]
+    letters += [chr(c) for c in range(ord("a"), ord("z") + 1)]
+    for index in range(targets):
+        node = p.invoke(p.code.match(f"on_{index}"), {0: start}, error)
+        start.match(letters[index::targets], node)
+    start.otherwise(error)
+    return p, start
+
+
+def resume_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    method = p.node("method")
+    url = p.node("url")
+    span = p.span(p.code.span("on_url"))
+    error = p.error(1, "bad method")
+
+    start.match("!", p.pause(7, "paused").otherwise(start)).match(
+        "\n", start
+    ).otherwise(method)
+    method.match(["GET ", "POST "], span.start(url)).otherwise(error)
+    url.match("!", p.pause(7, "paused in url").otherwise(url)).match(
+        "\n", span.end(start)
+    ).skipTo(url)
+    return p, start
+
+
+# (builder method, field, field type, bytes)
+INTS = [
+    ("uintBE", "u8", "i8", 1),
+    ("intBE", "s8", "i32", 1),
+    ("uintBE", "u16be", "i16", 2),
+    ("intLE", "s24le", "i32", 3),
+    ("uintLE", "u32le", "i32", 4),
+    ("intBE", "s32be", "i32", 4),
+    ("intBE", "s16be", "i64", 2),
+    ("uintLE", "u64le", "i64", 8),
+]
+
+
+def int_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    for _, field, ty, _ in INTS:
+        p.property(ty, field)
+
+    start = p.node("start")
+    nodes = [getattr(p, method)(field, size) for method, field, _, size in INTS]
+    start.match("!", nodes[0]).otherwise(p.error(1, "no frame"))
+    for node, next in zip(nodes, nodes[1:] + [start]):
+        node.skipTo(next)
+    return p, start
+
+
+def digits_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    p.property("i32", "length")
+    p.property("i8", "small")
+    p.property("i64", "size")
+
+    start = p.node("start")
+    length = p.node("length")
+    small = p.node("small")
+    size = p.node("size")
+    done = p.invoke(p.code.match("on_done"), {0: start}, p.error(1, "done"))
+
+    decimal = {str(i): i for i in range(10)}
+    hexadecimal = {**decimal, **{c: 10 + i for i, c in enumerate("abcdef")}}
+    hexadecimal.update({c: 10 + i for i, c in enumerate("ABCDEF")})
+
+    start.match("L", length).match("S", small).match("H", size).otherwise(
+        p.error(2, "bad prefix")
+    )
+    # Contiguous digits, with and without a maximum
+    length.select(
+        decimal,
+        p.invoke(
+            p.code.mulAdd("length", 10, max=1000000),
+            {1: p.error(3, "length overflow")},
+            length,
+        ),
+    ).match("\n", done).otherwise(p.error(4, "bad length"))
+    small.select(
+        decimal,
+        p.invoke(p.code.mulAdd("small", 10), {1: p.error(5, "small overflow")}, small),
+    ).match("\n", done).otherwise(p.error(6, "bad small"))
+    # Scattered keys go through a table
+    size.select(
+        hexadecimal,
+        p.invoke(p.code.mulAdd("size", 16), {1: p.error(7, "size overflow")}, size),
+    ).match("\n", done).otherwise(p.error(8, "bad size"))
+    return p, start
+
+
+def token_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    start = p.node("start")
+    word = p.node("word")
+    number = p.node("number")
+    token = p.span(p.code.span("on_token"))
+    done = p.invoke(p.code.match("on_done"), {0: start}, p.error(1, "done"))
+
+    lower = list("abcdefghijklmnopqrstuvwxyz")
+    digits = list("0123456789")
+    start.match(" ", start).peek(lower, token.start(word)).peek(
+        digits, token.start(number)
+    ).match("\n", done).otherwise(p.error(2, "bad start"))
+    word.match(lower + ["_"], word).peek([" ", "\n"], token.end(start)).otherwise(
+        p.error(3, "bad word")
+    )
+    number.match(digits + ["."], number).peek([" ", "\n"], token.end(start)).otherwise(
+        p.error(4, "bad number")
+    )
+    return p, start
+
+
+def ops_parser() -> tuple[LLParse, object]:
+    p = LLParse("lltest")
+    p.property("i8", "flags")
+    p.property("i16", "count")
+    p.property("i32", "total")
+    p.property("i64", "skip")
+
+    start = p.node("start")
+    number = p.node("number")
+    skip = p.consume("skip")
+    skip.otherwise(start)
+
+    flagged = p.invoke(
+        p.code.test("flags", 3), {1: p.invoke(p.code.And("flags", 1), start)}, start
+    )
+    seven = p.invoke(
+        p.code.isEqual("count", 7), {1: p.invoke(p.code.match("on_seven"), start)}, start
+    )
+    big = p.invoke(p.code.is_gt("total", 2), {1: p.pause(9, "big").otherwise(start)}, start)
+
+    start.match("a", p.invoke(p.code.Or("flags", 2), start)).match(
+        "b", p.invoke(p.code.update("count", 7), start)
+    ).match("c", flagged).match("e", seven).match("g", big).match(
+        "k", p.invoke(p.code.update("skip", 2), skip)
+    ).match("n", number).select(
+        {"1": 1, "2": 2, "3": 3}, p.invoke(p.code.store("total"), start)
+    ).otherwise(p.error(1, "bad"))
+    number.select(
+        {str(i): i for i in range(10)},
+        p.invoke(p.code.mulAdd("count", 10), {1: p.error(2, "overflow")}, number),
+    ).otherwise(p.invoke(p.code.load("count"), {0: start}, p.error(3, "nonzero")))
+    return p, start
@@ -0,0 +1,252 @@
+import asyncio
+import shutil
+import sysconfig
+from pathlib import Path
+
+import pytest
+from conftest import lines_parser
+
+from llparse.aio import (
+    PAUSE,
+    Event,
+    Feeder,
+    ParseError,
+    ParserPool,
+    Paused,
+    StreamParser,
+    protocolFactory,
+)
+from llparse.errors import Error
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("cc") or shutil.which("gcc"))
+    or not (Path(sysconfig.get_paths()["include"]) / "Python.h").exists(),
+    reason="No C compiler or python headers available",
+)
+
+
+@pytest.fixture(scope="module")
+def module(tmp_path_factory):
+    p, start = lines_parser(pause=True)
+    return p.extension("lltest_aio").load(start, cacheDir=tmp_path_factory.mktemp("cache"))
+
+
+def lines(events) -> list[bytes]:
+    return [event.data.tobytes() for event in events if isinstance(event, Event)]
+
+
+async def until(condition) -> None:
+    while not condition():
+        await asyncio.sleep(0.001)
+
+
+def test_pool(module):
+    pool = ParserPool(module, size=2, maxSize=2)
+    assert len(pool) == 2
+    first = pool.acquire()
+    second = pool.acquire()
+    third = pool.acquire()
+    assert len(pool) == 0
+
+    first.execute(b"a?")
+    pool.release(first)
+    pool.release(second)
+    # Only `size` parsers are kept around
+    pool.release(third)
+    assert len(pool) == 2
+    assert pool.acquire() is second
+    reused = pool.acquire()
+    assert reused is first and reused.error == 0
+
+    pool = ParserPool(module)
+    parser = pool.acquire()
+    pool.release(parser)
+    assert pool.acquire() is parser
+
+
+def test_feeder(module):
+    feeder = Feeder(module, module.Parser())
+    assert lines(feeder.feed(b"a\nb!c")) == [b"a", b"b"]
+    assert feeder.paused == Paused(8, "ack")
+    assert feeder.feed(b"d\ne\n") == []
+    # Spans end with the data of each `execute`
+    assert lines(feeder.resume()) == [b"c", b"d", b"e"]
+    assert feeder.paused is None
+
+    with pytest.raises(ParseError) as e:
+        feeder.feed(b"f?")
+    assert e.value.code == 2 and e.value.offset == 2
+
+
+def test_protocol(module):
+    pool = ParserPool(module, size=1)
+    received: list[bytes] = []
+    pauses: list[Paused] = []
+    reading: list[bool] = []
+
+    async def onLine(protocol, event):
+        await asyncio.sleep(0)
+        received.append(event.data.tobytes())
+
+    def onPause(protocol, paused):
+        pauses.append(paused)
+        reading.append(protocol._reading)
+        # Acknowledged a bit later
+        asyncio.get_running_loop().call_later(0.01, protocol.resume)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(
+            protocolFactory(pool, {"on_line": onLine, PAUSE: onPause}), "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        for _ in range(2):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"one\ntwo!")
+            await writer.drain()
+            await asyncio.sleep(0.001)
+            writer.write(b"three\nfour\n")
+            writer.close()
+            await writer.wait_closed()
+            await asyncio.wait_for(until(lambda: len(received) % 4 == 0), 5)
+            # The parser went back to the pool
+            await asyncio.wait_for(until(lambda: len(pool) == 1), 5)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+    assert received == [b"one", b"two", b"three", b"four"] * 2
+    assert pauses == [Paused(8, "ack")] * 2
+    assert reading == [False, False]
+
+
+def test_protocol_error(module):
+    pool = ParserPool(module)
+    received: list[bytes] = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(
+            protocolFactory(pool, {"on_line": lambda protocol, event: received.append(event.data.tobytes())}),
+            "127.0.0.1",
+            0,
+        )
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"one\n?two\n")
+        # The server closes the connection
+        assert await reader.read() == b""
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+    assert received == [b"one"]
+
+
+def test_stream(module):
+    pool = ParserPool(module, size=1)
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"one\ntwo!three")
+        reader.feed_data(b"\nfour!")
+        reader.feed_eof()
+
+        stream = StreamParser(pool, reader, chunk=4)
+        assert len(pool) == 0
+        events = []
+        async for event in stream:
+            events.append(event)
+            if isinstance(event, Paused):
+                stream.resume()
+        return events
+
+    events = asyncio.run(main())
+    # Read 4 bytes at a time, lines split by a read come in two spans
+    assert [e if isinstance(e, Paused) else e.data.tobytes() for e in events] == [
+        b"one",
+        b"two",
+        Paused(8, "ack"),
+        b"thre",
+        b"e",
+        b"fo",
+        b"ur",
+        Paused(8, "ack"),
+    ]
+    assert len(pool) == 1
+
+
+def test_stream_error(module):
+    pool = ParserPool(module, size=1)
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"one\n?")
+        reader.feed_eof()
+        events = []
+        with pytest.raises(ParseError):
+            async for event in StreamParser(pool, reader):
+                events.append(event)
+        return events
+
+    assert lines(asyncio.run(main())) == [b"one"]
+    assert len(pool) == 1
+
+
+def test_stream_close(module):
+    pool = ParserPool(module, size=1, maxSize=2)
+
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"one\ntwo\nthree\n")
+        reader.feed_eof()
+
+        received = []
+        async with StreamParser(pool, reader, chunk=4) as stream:
+            async for event in stream:
+                received.append(event.data.tobytes())
+                break
+            # Stopping early keeps the parser, iterating again goes on
+            assert len(pool) == 0
+            async for event in stream:
+                received.append(event.data.tobytes())
+                break
+        await stream.aclose()
+        # Released once however often the stream was left
+        assert len(pool) == 1
+        with pytest.raises(Error):
+            async for event in stream:
+                pass
+        return received
+
+    assert asyncio.run(main()) == [b"one", b"two"]
+
+
+def test_stream_break(module):
+    pool = ParserPool(module, size=1)
+
+    async def main():
+        reader = asyncio.StreamReader()
+        # One read, a single batch of events
+        reader.feed_data(b"one\ntwo\nthree!four\nfive\n")
+        reader.feed_eof()
+
+        received = []
+        async with StreamParser(pool, reader) as stream:
+            async for event in stream:
+                received.append(event.data.tobytes())
+                break
+            async for event in stream:
+                if isinstance(event, Paused):
+                    received.append(event)
+                    break
+                received.append(event.data.tobytes())
+            # Left at the pause, resuming goes on with the rest of the batch
+            stream.resume()
+            async for event in stream:
+                received.append(event.data.tobytes())
+        return received
+
+    assert asyncio.run(main()) == [b"one", b"two", b"three", Paused(8, "ack"), b"four", b"five"]
+    assert len(pool) == 1
@@ -0,0 +1,81 @@
+from llparse.pybuilder import Builder, GraphIndex
+
+import pytest
+
+
+@pytest.fixture()
+def b() -> Builder:
+    return Builder()
+
+
+def test_edges_are_newest_first(b: Builder) -> None:
+    start = b.node("start")
+    a, c = b.node("a"), b.node("c")
+    start.match("a", a).match(["x", "y"], c).peek("z", a).otherwise(a)
+
+    assert [e.key for e in start] == [b"z", b"y", b"x", b"a"]
+    assert [e.key for e in start.getAllEdges()] == [b"z", b"y", b"x", b"a", None]
+
+    # The views are kept until the edges change
+    assert start.getEdges() is start.getEdges()
+    assert start.getAllEdges() is start.getAllEdges()
+    start.match("w", c)
+    assert [e.key for e in start.getEdges()] == [b"w", b"z", b"y", b"x", b"a"]
+    assert start.getAllEdges()[0].key == b"w"
+
+
+def test_duplicate_keys(b: Builder) -> None:
+    start = b.node("start")
+    start.match("a", start).select(1, 2, start)
+
+    with pytest.raises(AssertionError):
+        start.match("a", start)
+    with pytest.raises(AssertionError):
+        start.select(1, 3, start)
+    assert len(start.getEdges()) == 2
+    with pytest.raises(AssertionError):
+        start.select({"b": 1, "a": 2}, start)
+    # "b" went in before "a" failed
+    edges = start.getEdges()
+    assert len(edges) == 3 and edges[0].key == b"b"
+
+
+def test_bulk_select(b: Builder) -> None:
+    start = b.node("start")
+    invoke = b.invoke(b.code.store("header"), start)
+    headers = {f"x-header-{i}": i for i in range(20_000)}
+    start.select(headers, invoke)
+
+    edges = start.getEdges()
+    assert len(edges) == len(headers)
+    assert edges[0].key == b"x-header-19999" and edges[0].value == 19999
+    assert edges[-1].key == b"x-header-0" and edges[-1].value == 0
+
+
+def test_graph_index(b: Builder) -> None:
+    start = b.node("start")
+    error = b.error(1, "error")
+    a = b.node("a")
+    other = b.node("a")
+
+    start.match("x", a).peek("y", other).otherwise(error)
+    a.skipTo(start)
+    other.otherwise(start)
+
+    graph = GraphIndex(start)
+    assert len(graph) == 4
+    assert graph.nodes[0] is start
+    assert a in graph and other in graph
+    assert graph.indexOf(a) != graph.indexOf(other)
+
+    index = graph.indexOf(start)
+    assert list(graph.successors(index)) == [
+        graph.indexOf(other),
+        graph.indexOf(a),
+        graph.indexOf(error),
+    ]
+    assert [graph.edges[e].key for e in graph.advanceEdges(index)] == [b"x"]
+    assert [graph.edges[e].key for e in graph.noAdvanceEdges(index)] == [b"y", None]
+    assert graph.edges[graph.otherwise[index]].node is error
+    assert graph.otherwise[graph.indexOf(error)] == -1
+    assert graph.isTerminal(graph.indexOf(error))
@@ -1,5 +1,29 @@
 # The good old http_parser was borrowed from llparse.org to demonstrate this for you :)
+import platform
+import random
+import shutil
+import subprocess
+
+import pytest
+from conftest import (
+    INTS,
+    digits_parser,
+    int_parser,
+    ops_parser,
+    pairs_parser,
+    resume_parser,
+    sequence_parser,
+    spaces_parser,
+    table_parser,
+    token_parser,
+    value_parser,
+)
+
 from llparse import LLParse
+from llparse.C_compiler import CCompiler
+from llparse.frontend import IFrontendResult
+from llparse.pyfront import namespace as front
+from llparse.pyfront.code import Identifier, IWrap
 
 
 def test_http_parser_example():
@@ -51,3 +75,323 @@ def test_http_parser_example():
 
     # if this build fails in any way then we have failed...
     c = p.build(method)
+
+
+def test_deep_state_chain():
+    # Code generation walks states with a worklist so long chains of states
+    # must not run into python's recursion limit.
+    ids = Identifier("chain__n_")
+    last = IWrap(front.node.Error(ids.id("error"), 1, "end"))
+    root = last
+    for i in range(200_000):
+        node = IWrap(front.node.Empty(ids.id(f"skip_{i}")))
+        node.ref.setOtherwise(root, False)
+        root = node
+
+    code = CCompiler().compile(
+        IFrontendResult("chain", root, resumptionTargets={root})
+    )
+    assert "s_n_chain__n_skip_0: {" in code
+    assert code.count("goto s_n_chain__n_") == 200_000
+
+
+def test_pause_target_is_built():
+    p = LLParse("lltest")
+    s = p.node("start")
+    s2 = p.node("start2")
+    s.match("p", p.pause(1, "paused").otherwise(s2)).skipTo(s)
+    s2.match("q", p.error(2, "done")).skipTo(s2)
+    code = p.build(s).c.splitlines()
+    assert "    s_n_lltest__n_start2 : {" in code
+
+
+VALUE_INPUTS = [
+    b"short\n",
+    b"a value that is much longer than sixteen bytes\n\nand another one\n",
+    b"x" * 15 + b"\n" + b"y" * 16 + b"\n" + b"z" * 17 + b"\n",
+    b"\t" * 40 + b"tabs and spaces" + b" " * 33 + b"\n",
+    b"stops at a comma somewhere in the middle, of the line\n",
+    "high bytes \xa0\xa5\xaf in range and \xb0 out of it\n".encode("latin-1"),
+    b"q" * 1000 + b"\n",
+    b"",
+]
+
+
+@pytest.mark.skipif(platform.machine() not in ("x86_64", "AMD64"), reason="x86 only")
+def test_sse_table_lookup(compile_parser):
+    p, start = value_parser()
+    assert "_mm_cmpestri" in p.build(start).c
+
+    scalar = compile_parser(*value_parser(), spans=["on_value"])
+    sse = compile_parser(*value_parser(), spans=["on_value"], cflags=["-msse4.2"])
+
+    for data in VALUE_INPUTS:
+        for chunk in (0, 1, 7, 16, 17, 64):
+            expected = scalar.run(data, chunk)
+            assert sse.run(data, chunk) == expected, (data, chunk)
+
+
+@pytest.mark.parametrize("parser", [value_parser, spaces_parser])
+def test_swar_skip_ahead(compile_parser, parser):
+    p, start = parser()
+    assert "LLPARSE_NO_SWAR" in p.build(start).c
+
+    spans = ["on_value", "on_word"]
+    scalar = compile_parser(*parser(), spans=spans, cflags=["-DLLPARSE_NO_SWAR"])
+    swar = compile_parser(*parser(), spans=spans)
+
+    rng = random.Random(1)
+    alphabet = b"  \t\t\xfe\xffabcXYZ09~!,:\n\x7f\x80\xa0\xa5\xaf\xb0"
+    inputs = VALUE_INPUTS + [
+        bytes(rng.choice(alphabet) for _ in range(rng.randint(1, 200)))
+        for _ in range(50)
+    ]
+    inputs += [b" " * n + b"word\n" for n in range(20)]
+    for data in inputs:
+        for chunk in (0, 1, 9):
+            assert swar.run(data, chunk) == scalar.run(data, chunk), (data, chunk)
+
+
+def test_fast_match_sequence(compile_parser):
+    p, start = sequence_parser()
+    assert "llparse_compare_sequence_to_lower(" in p.build(start).c
+
+    slow = compile_parser(*sequence_parser(), cflags=["-DLLPARSE_NO_FAST_MATCH"])
+    fast = compile_parser(*sequence_parser())
+
+    words = [
+        b"HTTP/1.1 ", b"HTTP/1.0 ", b"lower ", b"unsafe ", b"Content-Length:",
+        b"CONTENT-LENGTH:", b"content-lengtH:", b"Transfer-Encoding:", b"AB", b"xYz",
+        b"Connection:Keep-Alive", b"connection:keep-alivE", b"UPGRADE:", b"Keep-Alive",
+        b"keep-alive", b"\x80ab", b"\xc1B", b"[b", b"@b", b"Kee\xd0-alive", b"x",
+    ]
+    rng = random.Random(2)
+    inputs = []
+    for _ in range(200):
+        line = b"".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.2:
+            line = bytearray(line)
+            line[rng.randrange(len(line))] = rng.randrange(256)
+            line = bytes(line)
+        inputs.append(line + b"\n")
+    inputs.append(b"".join(inputs[:40]))
+
+    for data in inputs:
+        for chunk in (0, 1, 3, 8):
+            assert fast.run(data, chunk) == slow.run(data, chunk), (data, chunk)
+
+
+@pytest.mark.parametrize("targets, size", [(1, 32), (3, 64), (5, 128), (16, 256)])
+def test_packed_table_lookup(compile_parser, targets, size):
+    p, start = table_parser(targets)
+    c = p.build(start, maxTableElemWidth=8).c
+    blob = c[c.index("llparse_blob0[] = {") :]
+    assert blob[: blob.index("};")].count(",") + 1 == size
+
+    matches = [f"on_{index}" for index in range(targets)]
+    table = compile_parser(*table_parser(targets), matches=matches, maxTableElemWidth=8)
+    switch = compile_parser(*table_parser(targets), matches=matches, minTableSize=1000)
+    rng = random.Random(targets)
+    alphabet = bytes(range(ord("A"), ord("z") + 1)) + b" \n\xe1"
+    for _ in range(20):
+        data = bytes(rng.choice(alphabet) for _ in range(rng.randint(1, 100)))
+        for chunk in (0, 1, 5):
+            assert table.run(data, chunk) == switch.run(data, chunk), (data, chunk)
+
+
+def test_identical_tables_are_shared():
+    p = LLParse("lltest")
+    first = p.node("first")
+    second = p.node("second")
+    keys = [chr(c) for c in range(ord("A"), ord("z") + 1)]
+    first.match(keys, first).match("\n", second).otherwise(p.error(1, "first"))
+    second.match(keys, second).match("\n", first).otherwise(p.error(2, "second"))
+
+    c = p.build(first).c
+    assert c.count("static const unsigned char") == 1
+
+
+def test_computed_goto(compile_parser):
+    p, start = resume_parser()
+    c = p.build(start, computedGoto=True).c
+    assert "goto *(" in c
+    assert "(intptr_t) next" not in c
+
+    spans = ["on_url"]
+    switch = compile_parser(*resume_parser(), spans=spans, resume=7)
+    labels = compile_parser(*resume_parser(), spans=spans, resume=7, computedGoto=True)
+    fallback = compile_parser(
+        *resume_parser(),
+        spans=spans,
+        resume=7,
+        computedGoto=True,
+        cflags=["-DLLPARSE_NO_COMPUTED_GOTO"],
+    )
+
+    rng = random.Random(3)
+    pieces = [b"GET ", b"POST ", b"/a", b"!", b"\n", b"PUT ", b"xyz"]
+    inputs = [b"GET /!x\n!!POST /y\n", b"!\nGET /\n"]
+    inputs += [
+        b"".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+        for _ in range(40)
+    ]
+    for data in inputs:
+        for chunk in (0, 1, 3):
+            expected = switch.run(data, chunk)
+            assert labels.run(data, chunk) == expected, (data, chunk)
+            assert fallback.run(data, chunk) == expected, (data, chunk)
+
+
+@pytest.mark.skipif(not shutil.which("gcc"), reason="gcc only")
+def test_computed_goto_warnings(tmp_path):
+    p, start = resume_parser()
+    res = p.build(start, computedGoto=True)
+    (tmp_path / "lltest.c").write_text(res.c)
+    (tmp_path / "lltest.h").write_text(res.header)
+    # Storing `&&label` in `_current` must not trip `-Wdangling-pointer`,
+    # the rest are warnings the switch build has as well
+    subprocess.run(
+        ["gcc", "-O2", "-Wall", "-Werror", "-Wno-unused-label", "-Wno-unused-variable",
+         "-Wno-pointer-sign", "-c", "-I", str(tmp_path), "-o", str(tmp_path / "lltest.o"),
+         str(tmp_path / "lltest.c")],
+        check=True,
+    )
+
+
+def expected_ints(data: bytes) -> str:
+    out = []
+    for method, field, ty, size in INTS:
+        value = int.from_bytes(
+            data[:size], "little" if method.endswith("LE") else "big", signed=method.startswith("int")
+        )
+        bits = {"i8": 8, "i16": 16, "i32": 32, "i64": 64}[ty]
+        out.append(f"{field}={value % (1 << bits)}")
+        data = data[size:]
+    return " ".join(out)
+
+
+def test_int_reads(compile_parser):
+    p, start = int_parser()
+    assert "((uint64_t) p[7] << 56)" in p.build(start).c
+
+    fields = " ".join(
+        f'printf("{field}=%llu ", (unsigned long long) s.{field});'
+        for _, field, _, _ in INTS
+    )
+    parser = compile_parser(*int_parser(), fields=fields)
+    size = sum(size for *_, size in INTS)
+
+    rng = random.Random(4)
+    frames = [bytes([0xFF]) * size, bytes(size), bytes([0x80] * size)]
+    frames += [bytes(rng.randrange(256) for _ in range(size)) for _ in range(20)]
+    for frame in frames:
+        for chunk in (0, 1, 2, 3, 5):
+            assert parser.run(b"!" + frame, chunk).strip() == expected_ints(frame)
+
+
+def test_digit_run(compile_parser):
+    p, start = digits_parser()
+    assert p.build(start).c.count("LLPARSE_NO_DIGIT_RUN") == 6
+
+    fields = 'printf("length=%u small=%u size=%llu", s.length, s.small, (unsigned long long) s.size);'
+    options = dict(matches=["on_done"], fields=fields)
+    slow = compile_parser(*digits_parser(), cflags=["-DLLPARSE_NO_DIGIT_RUN"], **options)
+    fast = compile_parser(*digits_parser(), **options)
+
+    inputs = [
+        b"L123\n", b"L1000000\n", b"L1000001\n", b"L99999999999\n", b"S255\n", b"S256\n",
+        b"S25\nS5\n", b"HdeadBEEF\n", b"Hffffffffffffffff\n", b"H10000000000000000\n",
+        b"L12x", b"H\n", b"L\nS\n", b"Hag",
+    ]
+    rng = random.Random(5)
+    for _ in range(30):
+        prefix = rng.choice(b"LSH")
+        digits = bytes(rng.choice(b"0123456789abcdefABCDEF") for _ in range(rng.randint(0, 20)))
+        inputs.append(bytes([prefix]) + digits + b"\n")
+    for data in inputs:
+        for chunk in (0, 1, 2, 7):
+            assert fast.run(data, chunk) == slow.run(data, chunk), (data, chunk)
+
+
+def test_range_lowering(compile_parser, monkeypatch):
+    from llparse import compilator
+
+    p, start = token_parser()
+    c = p.build(start).c
+    assert "(unsigned char) (current - 97) <= 25" in c
+    assert "(unsigned char) (current - 48) <= 9" in c
+    fast = compile_parser(*token_parser(), spans=["on_token"], matches=["on_done"])
+
+    monkeypatch.setattr(compilator, "RANGE_COST", 1000)
+    p, start = token_parser()
+    assert "(current - 97)" not in p.build(start).c
+    slow = compile_parser(*token_parser(), spans=["on_token"], matches=["on_done"])
+
+    inputs = [b"abc 123\n", b"a_b 1.5 zz\n", b"\n \n", b"abc1\n", b"12a\n", b"A\n", b"a{\n"]
+    rng = random.Random(18)
+    for _ in range(30):
+        inputs.append(bytes(rng.choice(b"az_09. \n`{/:") for _ in range(rng.randint(0, 30))))
+    for data in inputs:
+        for chunk in (0, 1, 3):
+            assert fast.run(data, chunk) == slow.run(data, chunk), (data, chunk)
+
+
+def test_skip_input_check(compile_parser, monkeypatch):
+    from llparse.compilator import Compilation
+
+    options = dict(
+        spans=["on_key", "on_value"],
+        matches=["on_pair"],
+        values=["on_separator"],
+        fields='printf("kind=%d", s.kind);',
+    )
+    p, start = pairs_parser()
+    c = p.build(start).c
+    assert "s_i_lltest__n_key:" in c
+    assert "goto s_i_lltest__n_equals;" in c
+    fast = compile_parser(*pairs_parser(), **options)
+
+    monkeypatch.setattr(Compilation, "analyzeInput", lambda self, root: None)
+    p, start = pairs_parser()
+    assert "s_i_" not in p.build(start).c
+    slow = compile_parser(*pairs_parser(), **options)
+
+    inputs = [b"a=1;bc=2\n", b"key=3\n\nx=1", b"a=4\n", b"a1=1\n", b"=1\n", b"a=\n", b"a=1,"]
+    rng = random.Random(19)
+    for _ in range(30):
+        inputs.append(bytes(rng.choice(b"abz=123;\n4") for _ in range(rng.randint(0, 30))))
+    for data in inputs:
+        for chunk in (0, 1, 2, 5):
+            assert fast.run(data, chunk) == slow.run(data, chunk), (data, chunk)
+
+
+OPS_FIELDS = (
+    'printf("flags=%u count=%u total=%u skip=%llu", s.flags, s.count, s.total, '
+    "(unsigned long long) s.skip);"
+)
+DIGITS_FIELDS = 'printf("length=%u small=%u size=%llu", s.length, s.small, (unsigned long long) s.size);'
+
+
+@pytest.mark.parametrize(
+    "parser, alphabet, fields",
+    [
+        (ops_parser, b"abceg123knx0579", OPS_FIELDS),
+        (digits_parser, b"LSH0129aF\n", DIGITS_FIELDS),
+    ],
+)
+def test_cache_fields(compile_parser, parser, alphabet, fields):
+    p, start = parser()
+    c = p.build(start, cacheFields=True).c
+    assert "field_" in c and "static inline int" in c
+
+    options = dict(matches=["on_seven", "on_done"], fields=fields, resume=9)
+    cached = compile_parser(*parser(), cacheFields=True, **options)
+    plain = compile_parser(*parser(), **options)
+
+    rng = random.Random(20)
+    inputs = [b"abcegn12\n", b"bek12345678k", b"3g1g", b"n0a", b"L12\nS300\n"]
+    for _ in range(40):
+        inputs.append(bytes(rng.choice(alphabet) for _ in range(rng.randint(0, 30))))
+    for data in inputs:
+        for chunk in (0, 1, 2, 5):
+            assert cached.run(data, chunk) == plain.run(data, chunk), (data, chunk)
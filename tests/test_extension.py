@@ -0,0 +1,99 @@
+import shutil
+import sysconfig
+from pathlib import Path
+
+import pytest
+from conftest import pairs_parser
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("cc") or shutil.which("gcc"))
+    or not (Path(sysconfig.get_paths()["include"]) / "Python.h").exists(),
+    reason="No C compiler or python headers available",
+)
+
+
+@pytest.fixture()
+def module(tmp_path: Path):
+    p, start = pairs_parser(pause=True)
+    return p.extension("lltest_ext", capacity=2).load(start, cacheDir=tmp_path)
+
+
+def test_events(module):
+    events = module.EVENTS
+    assert sorted(events) == ["on_key", "on_pair", "on_separator", "on_value"]
+    assert sorted(events.values()) == [0, 1, 2, 3]
+    assert module.PAUSES == {8}
+
+    parser = module.Parser()
+    data = b"ab=2;cd=3\nx"
+    assert parser.execute(data) == 0
+    assert parser.events() == [
+        (events["on_pair"], 2, 2, 0),
+        (events["on_key"], 0, 2, 0),
+        (events["on_value"], 3, 4, 0),
+        (events["on_separator"], 5, 5, 1),
+        (events["on_pair"], 7, 7, 0),
+        (events["on_key"], 5, 7, 0),
+        (events["on_value"], 8, 9, 0),
+        (events["on_separator"], 10, 10, 2),
+        # Spans are flushed at the end of each buffer
+        (events["on_key"], 10, 11, 0),
+    ]
+    assert parser.kind == 3
+
+    # Every execute starts a new batch
+    assert parser.execute(b"y=1;") == 0
+    assert parser.events() == [
+        (events["on_pair"], 1, 1, 0),
+        (events["on_key"], 0, 1, 0),
+        (events["on_value"], 2, 3, 0),
+        (events["on_separator"], 4, 4, 1),
+    ]
+    assert parser.kind == 1
+
+    parser.kind = 2
+    assert parser.kind == 2
+
+
+def test_buffer(module):
+    parser = module.Parser()
+    assert parser.execute(bytearray(b"ab=2;")) == 0
+    view = memoryview(parser)
+    assert view.format == "i" and view.shape == (4, 4) and view.readonly
+    assert view.tolist() == [list(event) for event in parser.events()]
+
+    with pytest.raises(BufferError):
+        parser.execute(b"a")
+    view.release()
+    assert parser.execute(memoryview(b"==x=1;")[2:]) == 0
+
+
+def test_errors(module):
+    parser = module.Parser()
+    data = b"a=1;!b=2;"
+    assert parser.execute(data) == 8
+    assert parser.reason == "paused"
+    assert parser.error_offset == 5
+    assert parser.execute(data) == 8
+
+    parser.resume()
+    assert parser.execute(data[parser.error_offset :]) == 0
+    assert parser.error_offset is None
+    events = module.EVENTS
+    assert [event[0] for event in parser.events()] == [
+        events["on_pair"],
+        events["on_key"],
+        events["on_value"],
+        events["on_separator"],
+    ]
+
+    assert parser.execute(b"a=4") == 5
+    assert parser.reason == "bad value" and parser.error == 5
+    parser.init()
+    assert parser.error == 0 and parser.reason is None
+    assert parser.events() == []
+
+    with pytest.raises(TypeError):
+        parser.execute("a=1;")
+    with pytest.raises(ValueError):
+        module.Parser(capacity=0)
@@ -0,0 +1,76 @@
+import shutil
+import sysconfig
+from pathlib import Path
+
+import pytest
+from conftest import lines_parser
+
+from llparse.feed import parseFile, windows
+
+HAS_CC = bool(shutil.which("cc") or shutil.which("gcc"))
+HAS_HEADERS = (Path(sysconfig.get_paths()["include"]) / "Python.h").exists()
+
+
+def test_windows(tmp_path: Path):
+    path = tmp_path / "data"
+    path.write_bytes(bytes(range(256)) * 40)
+    chunks = [(offset, view.tobytes()) for offset, view in windows(path, 4096)]
+    assert [offset for offset, _ in chunks] == [0, 4096, 8192]
+    assert b"".join(chunk for _, chunk in chunks) == path.read_bytes()
+
+    (tmp_path / "empty").write_bytes(b"")
+    assert list(windows(tmp_path / "empty")) == []
+    with pytest.raises(ValueError):
+        next(windows(path, 0))
+
+
+@pytest.mark.skipif(not HAS_CC, reason="No C compiler available")
+def test_parse_file(tmp_path: Path):
+    path = tmp_path / "data"
+    text = b"".join(b"line %d\n" % i for i in range(1000))
+    path.write_bytes(text)
+
+    lines: list[tuple[int, int]] = []
+    p, start = lines_parser()
+    lib = p.load(
+        start,
+        callbacks={"on_line": lambda parser, start, end: lines.append((start, end))},
+        cacheDir=tmp_path,
+        spans="offsets",
+    )
+    parser = lib.parser()
+
+    pieces: list[bytes] = []
+
+    def onWindow(parser, offset, view):
+        # Lines split by a window are reported in two spans
+        pieces.extend(view[start:end].tobytes() for start, end in lines)
+        lines.clear()
+
+    assert parseFile(parser, path, window=1000, onWindow=onWindow) == (0, len(text))
+    assert b"\n".join(pieces).replace(b"\n", b"") == text.replace(b"\n", b"")
+
+    path.write_bytes(text + b"?")
+    parser.init()
+    # The error comes after the "?" it matched
+    assert parseFile(parser, path, window=1000) == (2, len(text) + 1)
+
+
+@pytest.mark.skipif(not (HAS_CC and HAS_HEADERS), reason="No C compiler or python headers")
+def test_parse_file_extension(tmp_path: Path):
+    path = tmp_path / "data"
+    text = b"".join(b"line %d\n" % i for i in range(1000))
+    path.write_bytes(text)
+
+    p, start = lines_parser()
+    module = p.extension("lltest_feed").load(start, cacheDir=tmp_path)
+    parser = module.Parser()
+    count = 0
+
+    def onWindow(parser, offset, view):
+        nonlocal count
+        count += len(parser.events())
+
+    assert parseFile(parser, path, window=4096, onWindow=onWindow) == (0, len(text))
+    # Every window but the last one ends in the middle of a line
+    assert count == 1000 + len(text) // 4096
@@ -1,4 +1,9 @@
+import sys
+
 from llparse import LLParse
+from llparse.frontend import Frontend
+from llparse.pyfront.code import Identifier
+from llparse.pybuilder import Builder
 from llparse.pybuilder.main_code import Operator
 
 import pytest
@@ -123,8 +128,9 @@ def test_build_tables():
         loop,
     ).otherwise(p.error(0, "im a little teapot"))
 
-    # If there is not a lookup_table this then it has failed me ;-;
-    assert "lookup_table" in p.build(start).c
+    # If there is not a lookup table this then it has failed me ;-;
+    # (tables are shared blobs now, a single target packs into a bitmap)
+    assert "llparse_blob0[(uint8_t) current >> 3]" in p.build(start).c
 
 
 def test_pausing():
@@ -178,3 +184,51 @@ def test_operators(op: str):
         assert "int test__c_ge_a_10 (" in code
     elif op == "<=":
         assert "int test__c_le_a_10 (" in code
+
+
+def test_translate_long_chain():
+    # Generated grammars can chain hundreds of thousands of nodes, translation
+    # must not depend on the python stack.
+    b = Builder()
+    node = b.error(1, "end")
+    count = 200_000
+    assert count > sys.getrecursionlimit() * 10
+    for i in range(count):
+        node = b.uintBE(f"field_{i}", 1).skipTo(node)
+
+    root = Frontend("chain").translate(node)
+    assert root.ref.id.name == f"chain__n_field_{count - 1}_uint_8"
+
+
+def test_identifier_suffixes():
+    ids = Identifier("p_")
+    names = [ids.id("x").name for _ in range(4)]
+    assert names == ["p_x", "p_x_0", "p_x_1", "p_x_2"]
+
+    ids = Identifier("p_")
+    ids.id("y")
+    ids.id("x_1")
+    names = [ids.id("x").name for _ in range(3)]
+    assert names == ["p_x", "p_x_2", "p_x_3"]
+
+
+def test_identifier_many_duplicates():
+    ids = Identifier("p_")
+    names = {ids.id("error").name for _ in range(100_000)}
+    assert len(names) == 100_000
+
+
+def test_span_coloring():
+    p = LLParse("lltest")
+    start = p.node("start")
+    spans = [p.span(p.code.span(f"on_{name}")) for name in "abc"]
+    bodies = [p.node(f"body_{name}") for name in "abc"]
+    for i, (span, body) in enumerate(zip(spans, bodies)):
+        start.match(chr(0x61 + i), span.start(body))
+        body.match(" ", span.end(start)).skipTo(body)
+    start.otherwise(p.error(1, "error"))
+
+    # No two spans are ever active together so they can share one slot
+    artifacts = p.build(start, spanColoring="dsatur")
+    assert "_span_pos0" in artifacts.c
+    assert "_span_pos1" not in artifacts.c
@@ -0,0 +1,227 @@
+import random
+
+import pytest
+from conftest import (
+    digits_parser,
+    int_parser,
+    ops_parser,
+    pairs_parser,
+    resume_parser,
+    sequence_parser,
+    spaces_parser,
+    table_parser,
+    token_parser,
+    value_parser,
+)
+
+from llparse import LLParse
+
+
+def run(
+    p: LLParse,
+    root,
+    data: bytes,
+    chunk: int = 0,
+    spans: list[str] = [],
+    matches: list[str] = [],
+    fields: list[str] = [],
+    resume: int = 0,
+    **options,
+) -> str:
+    """Runs `data` through the interpreter the way the C driver of
+    `compile_parser` does and prints the same"""
+    out: list[str] = []
+    callbacks = {}
+    for name in spans:
+        callbacks[name] = lambda parser, data, name=name: out.append(
+            f"{name}[{data.decode('latin-1')}] "
+        )
+    for name in matches:
+        callbacks[name] = lambda parser, name=name: out.append(f"{name} ")
+    parser = p.interpret(root, callbacks=callbacks, **options).parser()
+
+    chunk = chunk or len(data)
+    off = 0
+    while True:
+        n = min(len(data) - off, chunk)
+        err = parser.execute(data[off : off + n])
+        if err != 0:
+            out.append(f'error={err} reason="{parser.reason}" pos={off + parser.error_offset} ')
+            if err != resume:
+                break
+            # Pauses resume where they stopped
+            off += parser.error_offset
+            parser.resume()
+        else:
+            off += n
+        if off >= len(data):
+            break
+    out.append("".join(f"{field}={getattr(parser, field)} " for field in fields))
+    return "".join(out).rstrip()
+
+
+GRAMMARS = [
+    (value_parser, b"ab ,\n\t\xa0\xb0", dict(spans=["on_value"])),
+    (spaces_parser, b"ab: \t,\n\xfe\xff", dict(spans=["on_word"])),
+    (sequence_parser, b"HTP/1 lowerunsafCNTE-:", {}),
+    (resume_parser, b"GET POST /!\nx", dict(spans=["on_url"], resume=7)),
+    (
+        int_parser,
+        bytes([0x21, 0x00, 0x7F, 0x80, 0xFF]),
+        dict(fields=["u8", "s8", "u16be", "s24le", "u32le", "s32be", "s16be", "u64le"]),
+    ),
+    (digits_parser, b"LSH0129aF\n", dict(matches=["on_done"], fields=["length", "small", "size"])),
+    (
+        ops_parser,
+        b"abceg123knx0579",
+        dict(matches=["on_seven"], fields=["flags", "count", "total", "skip"], resume=9),
+    ),
+    (token_parser, b"ab_9. \nx", dict(spans=["on_token"], matches=["on_done"])),
+    (
+        lambda: table_parser(5),
+        b"ABCabcz \n",
+        dict(matches=[f"on_{index}" for index in range(5)]),
+    ),
+]
+
+
+@pytest.mark.parametrize("parser, alphabet, options", GRAMMARS)
+def test_matches_c(compile_parser, parser, alphabet, options):
+    fields = options.get("fields", [])
+    c = compile_parser(
+        *parser(),
+        spans=options.get("spans", []),
+        matches=options.get("matches", []),
+        fields="".join(
+            f'printf("{field}=%llu ", (unsigned long long) s.{field});' for field in fields
+        ),
+        resume=options.get("resume", 0),
+    )
+
+    rng = random.Random(25)
+    inputs = [b""]
+    for _ in range(40):
+        inputs.append(bytes(rng.choice(alphabet) for _ in range(rng.randint(1, 40))))
+    for data in inputs:
+        for chunk in (0, 1, 3):
+            expected = c.run(data, chunk).rstrip()
+            assert run(*parser(), data, chunk, **options) == expected, (data, chunk)
+            assert run(*parser(), data, chunk, skipAhead=False, **options) == expected, (data, chunk)
+
+
+def test_execute():
+    events: list[tuple] = []
+    p, start = pairs_parser(pause=True)
+    interpreter = p.interpret(
+        start,
+        callbacks={
+            "on_key": lambda parser, data: events.append(("key", data)),
+            "on_value": lambda parser, data: events.append(("value", data)),
+            "on_pair": lambda parser: events.append(("pair",)),
+        },
+    )
+    assert interpreter.externals == {
+        "on_key": "span",
+        "on_value": "span",
+        "on_pair": "match",
+        "on_separator": "value",
+    }
+
+    parser = interpreter.parser()
+    assert parser.execute(b"ab=2;c") == 0
+    # Spans are only flushed at the end of each buffer
+    assert parser.execute(bytearray(b"d=3\n")) == 0
+    assert events == [
+        ("pair",),
+        ("key", b"ab"),
+        ("value", b"2"),
+        ("key", b"c"),
+        ("pair",),
+        ("key", b"d"),
+        ("value", b"3"),
+    ]
+    assert parser.kind == 3
+
+    data = b"a=1;!b=2;"
+    assert parser.execute(data) == 8
+    assert parser.reason == "paused" and parser.error_offset == 5
+    offset = parser.error_offset
+    parser.resume()
+    assert parser.execute(memoryview(data)[offset:]) == 0
+    assert parser.kind == 2
+
+    assert parser.execute(b"a=4") == 5
+    assert parser.reason == "bad value" and parser.error_offset == 2
+    # Errors linger until `init`
+    assert parser.execute(b"a=1;") == 5
+    parser.init()
+    assert parser.error == 0 and parser.error_offset is None
+    assert parser.execute(b"x=1\n") == 0
+
+    with pytest.raises(TypeError):
+        parser.execute("a=1;")
+    with pytest.raises(AttributeError):
+        parser.missing
+
+
+def test_callbacks():
+    p, start = pairs_parser(pause=True)
+    interpreter = p.interpret(
+        start, callbacks={"on_separator": lambda parser, value: value == 2}, spans="offsets"
+    )
+    parser = interpreter.parser()
+    assert parser.execute(b"a=1;b=2\nc") == 7
+    assert parser.reason == "on_separator"
+    assert parser.kind == 2
+
+    keys: list[tuple[int, int]] = []
+    interpreter.setCallback("on_separator", None)
+    interpreter.setCallback("on_key", lambda parser, start, end: keys.append((start, end)))
+    parser.init()
+    assert parser.execute(b"ab=1;cde=2;f") == 0
+    assert keys == [(0, 2), (5, 8), (11, 12)]
+
+    def fail(parser):
+        raise ValueError("no pairs")
+
+    interpreter.setCallback("on_pair", fail)
+    parser.init()
+    with pytest.raises(ValueError, match="no pairs"):
+        parser.execute(b"a=1;")
+
+    with pytest.raises(KeyError):
+        interpreter.setCallback("on_missing", fail)
+    with pytest.raises(ValueError):
+        p.interpret(start, spans="lines")
+
+
+def test_chunks():
+    p, start = pairs_parser(pause=True)
+    data = b"".join(b"%s=%d;\n" % (b"key" * n, n % 3 + 1) for n in range(1, 30))
+
+    def events(chunk: int, skipAhead: bool) -> list[tuple]:
+        out: list[tuple] = []
+        parser = p.interpret(
+            start,
+            callbacks={
+                "on_key": lambda parser, data: out.append(("key", data)),
+                "on_separator": lambda parser, value: out.append(("separator", value)),
+            },
+            skipAhead=skipAhead,
+        ).parser()
+        for off in range(0, len(data), chunk):
+            assert parser.execute(data[off : off + chunk]) == 0
+        # Keys split by a chunk come in pieces, put them back together
+        merged: list[tuple] = []
+        for event in out:
+            if merged and event[0] == "key" and merged[-1][0] == "key":
+                merged[-1] = ("key", merged[-1][1] + event[1])
+            else:
+                merged.append(event)
+        return merged
+
+    expected = events(len(data), True)
+    assert len(expected) == 29 * 2
+    for chunk in (1, 2, 3, 7, 64):
+        assert events(chunk, True) == expected
+        assert events(chunk, False) == expected
@@ -0,0 +1,167 @@
+import array
+import mmap
+import shutil
+from pathlib import Path
+
+import pytest
+from conftest import pairs_parser
+
+from llparse.errors import Error
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("cc") or shutil.which("gcc")), reason="No C compiler available"
+)
+
+
+def test_load(tmp_path: Path):
+    events: list[tuple] = []
+    p, start = pairs_parser()
+    lib = p.load(
+        start,
+        callbacks={
+            "on_key": lambda parser, data: events.append(("key", data)),
+            "on_value": lambda parser, data: events.append(("value", data)),
+            "on_pair": lambda parser: events.append(("pair",)),
+        },
+        cacheDir=tmp_path,
+    )
+    assert not lib.cached
+    assert lib.externals == {
+        "on_key": "span",
+        "on_value": "span",
+        "on_pair": "match",
+        "on_separator": "value",
+    }
+
+    parser = lib.parser()
+    assert parser.execute(b"ab=2;c") == 0
+    # Spans are only flushed at the end of each buffer
+    assert parser.execute(b"d=3\n") == 0
+    assert events == [
+        ("pair",),
+        ("key", b"ab"),
+        ("value", b"2"),
+        ("key", b"c"),
+        ("pair",),
+        ("key", b"d"),
+        ("value", b"3"),
+    ]
+    assert parser.kind == 3
+
+    data = b"a=4"
+    assert parser.execute(data) == 5
+    assert parser.reason == "bad value"
+    assert parser.error_offset == 2
+
+    parser.init()
+    assert parser.error == 0
+    assert parser.execute(b"x=1\n") == 0
+
+
+def test_callback_result(tmp_path: Path):
+    p, start = pairs_parser()
+    lib = p.load(
+        start, callbacks={"on_separator": lambda parser, value: value == 2}, cacheDir=tmp_path
+    )
+    parser = lib.parser()
+    assert parser.execute(b"a=1;b=2\nc") == 7
+    assert parser.reason == "on_separator"
+    assert parser.kind == 2
+
+    def fail(parser):
+        raise ValueError("no pairs")
+
+    lib.setCallback("on_separator", None)
+    lib.setCallback("on_pair", fail)
+    parser.init()
+    with pytest.raises(ValueError, match="no pairs"):
+        parser.execute(b"a=1;")
+
+    with pytest.raises(KeyError):
+        lib.setCallback("on_missing", fail)
+
+
+def test_cache(tmp_path: Path):
+    pairs: dict[str, list[int]] = {"first": [], "again": []}
+    p, start = pairs_parser()
+    first = p.load(
+        start, callbacks={"on_pair": lambda parser: pairs["first"].append(1)}, cacheDir=tmp_path
+    )
+    again = p.load(
+        start, callbacks={"on_pair": lambda parser: pairs["again"].append(1)}, cacheDir=tmp_path
+    )
+    assert again.cached and again.path == first.path
+
+    # Both come from the same shared object but keep their own callbacks
+    firstParser = first.parser()
+    againParser = again.parser()
+    assert firstParser.execute(b"a=1;") == 0
+    assert againParser.execute(b"a=1;b=2;") == 0
+    assert firstParser.execute(b"c=3;") == 0
+    assert pairs == {"first": [1, 1], "again": [1, 1]}
+    again.setCallback("on_pair", None)
+    assert againParser.execute(b"d=1;") == 0
+    assert firstParser.execute(b"d=1;") == 0
+    assert pairs == {"first": [1, 1, 1], "again": [1, 1]}
+
+    optimized = p.load(start, cacheDir=tmp_path, cflags=["-O1"])
+    assert not optimized.cached and optimized.path != first.path
+
+    changed = p.load(start, cacheDir=tmp_path, computedGoto=True)
+    assert not changed.cached and changed.path != first.path
+    # One lock for the whole cache directory
+    assert [path.name for path in tmp_path.iterdir() if "lock" in path.name] == [".lock"]
+
+
+def test_compile_error(tmp_path: Path):
+    p, start = pairs_parser()
+    with pytest.raises(Error, match="Compiling lltest failed"):
+        p.load(start, cacheDir=tmp_path, cflags=["-include", "missing.h"])
+    assert not any(path.suffix == ".so" for path in tmp_path.iterdir())
+
+
+def test_buffers(tmp_path: Path):
+    keys: list = []
+    p, start = pairs_parser()
+    lib = p.load(
+        start,
+        callbacks={"on_key": lambda parser, data: keys.append(data)},
+        cacheDir=tmp_path,
+    )
+    parser = lib.parser()
+    data = bytearray(b"??ab=1;cd=2;")
+    assert parser.execute(memoryview(data)[2:7]) == 0
+    assert parser.execute(data[7:]) == 0
+    assert parser.execute(array.array("B", b"ef=3;")) == 0
+    assert keys == [b"ab", b"cd", b"ef"]
+    # Nothing of the buffer is kept around
+    data.extend(b"x")
+
+    with pytest.raises(TypeError):
+        parser.execute("ab=1;")
+
+
+@pytest.mark.parametrize("spans", ["memoryview", "offsets"])
+def test_span_data(tmp_path: Path, spans: str):
+    keys: list = []
+    if spans == "offsets":
+
+        def onKey(parser, start, end):
+            keys.append((start, end))
+    else:
+
+        def onKey(parser, data):
+            keys.append(data.tobytes())
+
+    p, start = pairs_parser()
+    lib = p.load(start, callbacks={"on_key": onKey}, cacheDir=tmp_path, spans=spans)
+    parser = lib.parser()
+    data = b"ab=1;cde=2;f"
+    with mmap.mmap(-1, len(data)) as mapped:
+        mapped.write(data)
+        assert parser.execute(mapped) == 0
+
+    if spans == "offsets":
+        assert keys == [(0, 2), (5, 8), (11, 12)]
+    else:
+        assert keys == [b"ab", b"cde", b"f"]
@@ -1,4 +1,6 @@
 from llparse.pybuilder import LoopChecker, Builder
+from llparse.pybuilder.loopchecker import ANY_VALUE, EMPTY_VALUE, Lattice
+from llparse.pybuilder.main_code import Edge
 from llparse.errors import Error
 import pytest
 
@@ -6,9 +8,9 @@ import pytest
 # Time Taken: 7 hours if you count the hard amounts of debugging, I went through.
 
 
-@pytest.fixture()
-def loop_checker() -> tuple[LoopChecker, Builder]:
-    return LoopChecker(), Builder()
+@pytest.fixture(params=[False, True], ids=["scc", "legacy"])
+def loop_checker(request: pytest.FixtureRequest) -> tuple[LoopChecker, Builder]:
+    return LoopChecker(legacy=request.param), Builder()
 
 
 def test_detect_shallow_loops(loop_checker: tuple[LoopChecker, Builder]) -> None:
@@ -158,3 +160,47 @@ def test_ignore_loops_with_multi_peek_match(
 
     another.match(NUM, another).otherwise(start)
     lc.check(start)
+
+
+def test_detect_loops_behind_advancing_edges() -> None:
+    b = Builder()
+    start = b.node("start")
+    loop = b.node("loop")
+    start.match("a", loop).otherwise(b.error(1, "error"))
+    loop.peek("b", loop).otherwise(b.error(1, "error"))
+    with pytest.raises(Error, match=r'Detected loop in "loop" through "loop"'):
+        LoopChecker().check(start)
+
+
+def test_long_no_advance_chain() -> None:
+    b = Builder()
+    start = b.node("start")
+    node = start
+    for i in range(20000):
+        invoke = b.invoke(b.code.match(f"nop_{i}"), b.error(1, "error"))
+        node.otherwise(invoke)
+        node = b.node(f"n_{i}")
+        invoke.addEdge(Edge(node, True, 0, None))
+    node.match("a", start).otherwise(b.error(1, "error"))
+    LoopChecker().check(start)
+
+
+def test_lattice_interning() -> None:
+    assert Lattice("empty") is EMPTY_VALUE
+    assert Lattice("any") is ANY_VALUE
+    assert Lattice([]) is EMPTY_VALUE
+    assert Lattice(bytes(range(256))) is ANY_VALUE
+    assert Lattice(b"ab").subtract(Lattice(b"ab")) is EMPTY_VALUE
+
+
+def test_lattice_operations() -> None:
+    ab = Lattice(b"ab")
+    bc = Lattice([ord("b"), ord("c")])
+    assert list(ab.union(bc)) == [97, 98, 99]
+    assert ab.intersect(bc).toJSON() == [98]
+    assert ab.subtract(bc).isEqual(Lattice(b"a"))
+    assert ANY_VALUE.subtract(ab).check(99)
+    assert not ANY_VALUE.subtract(ab).check(97)
+    assert EMPTY_VALUE.isEmpty()
+    with pytest.raises(AttributeError):
+        ab.bits = 0
@@ -0,0 +1,40 @@
+from llparse import LLParse
+
+
+def build(profile: bool):
+    p = LLParse("lltest")
+    start = p.node("start")
+    span = p.span(p.code.span("on_data"))
+    body = p.node("body")
+    start.match("GET", span.start(body)).otherwise(p.error(1, "error"))
+    body.peek(" ", span.end(start)).skipTo(body)
+    return p.build(start, profile=profile)
+
+
+def test_no_stats_by_default():
+    assert build(False).stats is None
+
+
+def test_phase_stats():
+    stats = build(True).stats
+    assert stats is not None
+    assert [phase.name for phase in stats.phases] == [
+        "graph",
+        "loopChecker",
+        "spanAllocator",
+        "translate",
+        "enumerator",
+        "peephole",
+        "ccompiler",
+        "header",
+    ]
+    assert all(phase.seconds >= 0 for phase in stats.phases)
+    assert stats.get("spanAllocator").counts == {"spans": 1, "slots": 1}
+    assert stats.get("graph").counts["nodes"] > 0
+    assert stats.get("ccompiler").counts["states"] > 0
+    assert stats.get("ccompiler").peak > 0
+
+    table = stats.table().splitlines()
+    assert table[0].split() == ["phase", "time", "(ms)", "peak", "(KiB)", "counts"]
+    assert table[-1].startswith("total")
+    assert len(table) == len(stats.phases) + 4
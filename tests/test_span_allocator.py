@@ -7,9 +7,9 @@ import pytest
 # Brought over and translated from llparse-builder/tests/span-allocator.ts
 
 
-@pytest.fixture()
-def span_alloc() -> tuple[SpanAllocator, Builder]:
-    return SpanAllocator(), Builder()
+@pytest.fixture(params=["greedy", "dsatur"])
+def span_alloc(request: pytest.FixtureRequest) -> tuple[SpanAllocator, Builder]:
+    return SpanAllocator(request.param), Builder()
 
 
 def test_allocate_single_span(span_alloc: tuple[SpanAllocator, Builder]) -> None:
@@ -125,3 +125,51 @@ def test_propagate_through_invoke_map(span_alloc: tuple[SpanAllocator, Builder])
     )
 
     sa.allocate(span.start(start))
+
+
+def test_dsatur_crown_graph() -> None:
+    b = Builder()
+    left = [b.span(b.code.span(f"left{i}")) for i in range(4)]
+    right = [b.span(b.code.span(f"right{i}")) for i in range(4)]
+
+    # Every left span overlaps every right span except its partner, which an
+    # unlucky greedy order needs four slots for
+    start = b.node("start")
+    key = 0
+    for i, one in enumerate(left):
+        for j, other in enumerate(right):
+            if i == j:
+                continue
+            body = b.node("body")
+            body.skipTo(other.end(one.end(start)))
+            start.match(chr(0x41 + key), one.start(other.start(body)))
+            key += 1
+    start.otherwise(b.error(1, "error"))
+
+    res = SpanAllocator("dsatur").allocate(start)
+    assert res.max == 1
+    for i, one in enumerate(left):
+        for j, other in enumerate(right):
+            if i != j:
+                assert res.colors[one] != res.colors[other]
+
+
+def test_exact_coloring() -> None:
+    # A path of four spans colored with four slots only needs two
+    overlap = [0b0010, 0b0101, 0b1010, 0b0100]
+    colors = SpanAllocator("dsatur").exactColoring(overlap, [0, 1, 2, 3])
+    assert max(colors) == 1
+
+    # An odd cycle can't do with less than three
+    overlap = [0b10010, 0b00101, 0b01010, 0b10100, 0b01001]
+    colors = SpanAllocator("dsatur").exactColoring(overlap, [0, 1, 2, 3, 4])
+    assert max(colors) == 2
+    for v, mask in enumerate(overlap):
+        for w in range(5):
+            if mask & (1 << w):
+                assert colors[v] != colors[w]
+
+
+def test_unknown_mode() -> None:
+    with pytest.raises(ValueError):
+        SpanAllocator("random")
@@ -0,0 +1,83 @@
+from llparse.pybuilder import Builder
+from llparse.trie import Trie, TrieEmpty, TrieSequence, TrieSingle
+
+import pytest
+
+
+@pytest.fixture()
+def b() -> Builder:
+    return Builder()
+
+
+def test_shared_prefix(b: Builder) -> None:
+    node = b.node("node")
+    a, c = b.node("a"), b.node("c")
+    node.match("abxe", c).match("abcd", a)
+
+    trie = Trie("node").build(list(node))
+    assert isinstance(trie, TrieSequence)
+    assert trie.select == b"ab"
+
+    assert isinstance(trie.child, TrieSingle)
+    assert [child.key for child in trie.child.children] == [ord("c"), ord("x")]
+
+    tail = trie.child.children[0].node
+    assert isinstance(tail, TrieSingle)
+    assert [child.key for child in tail.children] == [ord("d")]
+    assert tail.children[0].node.node is a
+
+
+def test_key_prefix_of_another(b: Builder) -> None:
+    node = b.node("node")
+    a, c = b.node("a"), b.node("c")
+    node.match("ab", c).match("a", a)
+
+    trie = Trie("node").build(list(node))
+    assert isinstance(trie, TrieSingle)
+
+    inner = trie.children[0].node
+    assert isinstance(inner, TrieSingle)
+    assert inner.otherwise is not None and inner.otherwise.node is a
+    assert [child.key for child in inner.children] == [ord("b")]
+
+
+def test_select_values(b: Builder) -> None:
+    node = b.node("node")
+    target = b.node("target")
+    node.select({"PUT": 3, "POST": 2, "PATCH": 8}, target)
+
+    trie = Trie("node").build(list(node))
+    assert isinstance(trie, TrieSingle)
+    assert [child.key for child in trie.children] == [ord("P")]
+
+    inner = trie.children[0].node
+    assert [child.key for child in inner.children] == [ord(c) for c in "AOU"]
+
+
+def test_conflicting_peek_and_match(b: Builder) -> None:
+    node = b.node("node")
+    a = b.node("a")
+    node.peek("a", a).match("ab", a)
+
+    with pytest.raises(TypeError, match="Conflicting"):
+        Trie("node").build(list(node))
+
+
+def test_many_keywords(b: Builder) -> None:
+    node = b.node("node")
+    target = b.node("target")
+    node.select({f"keyword_{i}": i for i in range(10_000)}, target)
+
+    trie = Trie("node").build(list(node))
+    assert isinstance(trie, TrieSequence)
+    assert trie.select == b"keyword_"
+
+    def leaves(trie) -> int:
+        if isinstance(trie, TrieEmpty):
+            return 1
+        if isinstance(trie, TrieSequence):
+            return leaves(trie.child)
+        count = sum(leaves(child.node) for child in trie.children)
+        return count + (trie.otherwise is not None)
+
+    assert leaves(trie) == 10_000